@@ -0,0 +1,706 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Set
+
+from flask import Flask, jsonify, request
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import PyMongoError
+
+import data_store
+from data_store import COLLECTION_NAME, DB_NAME, find_record, get_client
+from partitions import day_of, route_flow
+from scheduler import OWNER_ID, SCHEDULER
+
+# ------------------------------------------------------------
+# Bulk flow actions (resend / repair / delete)
+#   submit() persists a job and one item per flow, then queues the items; a
+#   pool of ACTION_WORKERS threads sends them to the WMS/PO client, retrying
+#   transient failures. ACTION_RATE_PER_SEC holds for the whole deployment:
+#   every send draws a ticket from a per-second counter in Mongo. Every
+#   server process runs a pool: a worker claims an item (PENDING -> RUNNING
+#   under its OWNER_ID, with a lease it renews on every write) before sending
+#   it, so each flow is acted on once however many processes queued it. Every
+#   ACTION_RESUME_SEC the processes queue the PENDING items and the RUNNING
+#   ones whose lease ran out (their owner died). Successful results patch the rollup in Mongo
+#   and, every APPLY_INTERVAL_SEC, the loaded records (data_store.update_records),
+#   so the tiles, grid, cube and anomaly counts follow without a reload. The other
+#   processes pick up the items finished elsewhere every ACTION_SYNC_SEC.
+# ------------------------------------------------------------
+ACTIONS = ("RESEND", "REPAIR", "DELETE")
+ACTION_NAMES = {
+    "RESEND": "שליחה מחדש",
+    "REPAIR": "תיקון",
+    "DELETE": "מחיקה",
+}
+ACTION_JOBS_COLLECTION = "action_jobs"
+ACTION_ITEMS_COLLECTION = "action_items"
+ACTION_RATE_COLLECTION = "action_rate"  # per-second send counters (TTL)
+
+# "http" posts to the WMS/PO endpoint (POST <endpoint>/<action>) and the app does not start
+# without one; "stub" is a local simulation for testing, whose results never reach Mongo
+ACTION_CLIENT = os.environ.get("SAP_MONITOR_ACTION_CLIENT") or "http"
+ACTION_ENDPOINT = os.environ.get("SAP_MONITOR_ACTION_ENDPOINT", "")
+ACTION_WORKERS = 8
+ACTION_RATE_PER_SEC = 25.0  # all processes together; 2,000 flows in ~80 s (0 = unlimited)
+ACTION_MAX_ATTEMPTS = 3
+ACTION_RETRY_BACKOFF_SEC = 1.0  # doubled per attempt
+ACTION_MAX_FLOWS = 20000  # per job
+APPLY_INTERVAL_SEC = 1.0
+ACTION_LEASE_SEC = 120  # a RUNNING item not renewed for this long is claimed again
+ACTION_RESUME_SEC = 60
+ACTION_SYNC_SEC = 5.0  # items finished by other processes -> this process's records
+
+PENDING, RUNNING, DONE, FAILED = "PENDING", "RUNNING", "DONE", "FAILED"
+ITEM_STATE_NAMES = {
+    PENDING: "ממתין",
+    RUNNING: "בשליחה",
+    DONE   : "בוצע",
+    FAILED : "נכשל",
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _set_path(doc: Dict[str, Any], dotted: str, value: Any) -> None:
+    keys = dotted.split(".")
+    for key in keys[:-1]:
+        doc = doc.setdefault(key, {})
+    doc[keys[-1]] = value
+
+
+# ------------------------------------------------------------
+# Clients: perform(action, rollup) -> {"ok", "retry", "detail", "rollup"}
+#   "rollup" holds the dotted fields to $set on the rollup after a successful
+#   RESEND / REPAIR; a successful DELETE flags the rollup "deleted" (soft delete:
+#   it stays in Mongo, hidden from loads and exports; unsetting the flag restores it).
+# ------------------------------------------------------------
+DELIVERED_PATCH = {
+    "tech.health"         : "GREEN",
+    "tech.last_checkpoint": "WMS_INGESTED",
+    "tech.last_status"    : "OK",
+    "tech.reason_code"    : "INGESTED",
+    "sla.state"           : "OK",
+    "sla.breach"          : False,
+}
+
+
+class HttpActionClient:
+    simulated = False
+
+    def __init__(self, endpoint: str = ACTION_ENDPOINT, timeout: float = 10.0):
+        if not endpoint:
+            raise RuntimeError(
+                "flow actions need the WMS/PO endpoint: set SAP_MONITOR_ACTION_ENDPOINT "
+                "(or SAP_MONITOR_ACTION_CLIENT=stub for a local simulation)",
+            )
+        self.endpoint = endpoint.rstrip("/")
+        self.timeout = timeout
+
+    def perform(self, action: str, rollup: Dict[str, Any]) -> Dict[str, Any]:
+        body = json.dumps(
+            {
+                "correlation_id": rollup.get("correlation_id"),
+                "city"          : rollup.get("city"),
+                "sap_order"     : (rollup.get("order") or {}).get("sap_order"),
+                "sap_idoc"      : rollup.get("sap_idoc") or {},
+            },
+        ).encode("utf-8")
+        req = urllib.request.Request(
+            f"{self.endpoint}/{action.lower()}", data=body, method="POST",
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                out = json.loads(resp.read() or b"{}")
+        except urllib.error.HTTPError as exc:
+            # throttled / server side: worth another attempt; anything else is final
+            retry = exc.code == 429 or exc.code >= 500
+            return {"ok": False, "retry": retry, "detail": f"HTTP {exc.code}"}
+        except (urllib.error.URLError, OSError, ValueError) as exc:
+            return {"ok": False, "retry": True, "detail": str(exc)}
+        if not isinstance(out, dict):
+            return {"ok": False, "retry": False, "detail": f"unexpected response: {str(out)[:200]}"}
+        return {
+            "ok"    : bool(out.get("ok", True)),
+            "retry" : False,
+            "detail": out.get("detail") or "",
+            "rollup": out.get("rollup") or {},
+        }
+
+
+class StubActionClient:
+    """
+    Local stand-in for the WMS/PO endpoints: answers after `latency` seconds,
+    fails transiently with p_transient and for good with p_fail. Testing only:
+    its results are applied to the loaded records, never written to Mongo.
+    """
+    simulated = True
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        p_transient: float = 0.05,
+        p_fail: float = 0.02,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency
+        self.p_transient = p_transient
+        self.p_fail = p_fail
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def perform(self, action: str, rollup: Dict[str, Any]) -> Dict[str, Any]:
+        time.sleep(self.latency)
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.p_transient:
+            return {"ok": False, "retry": True, "detail": "stub: timeout"}
+        if roll < self.p_transient + self.p_fail:
+            return {"ok": False, "retry": False, "detail": "stub: rejected by WMS"}
+        if action == "DELETE":
+            return {"ok": True, "retry": False, "detail": "stub: cancelled", "rollup": {}}
+        patch = dict(DELIVERED_PATCH)
+        if action == "REPAIR":
+            status, reason = "OK", "REPAIRED"
+        else:
+            status, reason = "RESENT", None
+        patch.update({
+            "business.health"     : "GREEN",
+            "business.status"     : status,
+            "business.reason_code": reason,
+        })
+        detail = f"stub: {action.lower()} accepted"
+        return {"ok": True, "retry": False, "detail": detail, "rollup": patch}
+
+
+def make_client(kind: str = ACTION_CLIENT):
+    if kind == "http":
+        return HttpActionClient()
+    if kind == "stub":
+        return StubActionClient()
+    raise ValueError(f"unknown action client: {kind} (stub, http)")
+
+
+class RateLimiter:
+    """
+    Spaces acquire() calls 1/rate seconds apart across all threads (rate <= 0: no limit).
+    """
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            at = max(self._next, now)
+            self._next = at + 1.0 / self.rate
+        if at > now:
+            time.sleep(at - now)
+
+
+class SharedRateLimiter:
+    """
+    At most `rate` acquire() calls per second across every process sharing the database:
+    each second (1/rate seconds below one per second) is a counter document the callers
+    $inc; ticket n goes out at its n-th share of the window, and whoever draws a number
+    over the budget waits for the next window. Falls back
+    to this process's own spacing while Mongo cannot be reached.
+    """
+    def __init__(self, rate: float, get_db, name: str = "actions"):
+        self.rate = rate
+        self.get_db = get_db
+        self.name = name
+        self.window = max(1.0, 1.0 / rate) if rate > 0 else 1.0
+        self.budget = max(1, int(rate * self.window))
+        self._local = RateLimiter(rate)
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.time()
+            slot = int(now // self.window)
+            expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+            try:
+                ticket = self.get_db()[ACTION_RATE_COLLECTION].find_one_and_update(
+                    {"_id": f"{self.name}:{slot}"},
+                    {
+                        "$inc"        : {"n": 1},
+                        "$setOnInsert": {"expires_at": expires_at},
+                    },
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+            except PyMongoError:
+                self._local.acquire()
+                return
+            if ticket["n"] <= self.budget:
+                # tickets are spread evenly over their window instead of bursting at its start
+                at = (slot + (ticket["n"] - 1) / self.budget) * self.window
+                if at > now:
+                    time.sleep(at - now)
+                return
+            time.sleep((slot + 1) * self.window - now + random.uniform(0, 0.05))
+
+
+# ------------------------------------------------------------
+# Job queue + worker pool
+# ------------------------------------------------------------
+class ActionQueue:
+    def __init__(
+        self,
+        client=None,
+        workers: int = ACTION_WORKERS,
+        rate: float = ACTION_RATE_PER_SEC,
+        max_attempts: int = ACTION_MAX_ATTEMPTS,
+    ):
+        self.client = client or make_client()
+        self.workers = workers
+        self.limiter = SharedRateLimiter(rate, self._db)
+        self.max_attempts = max_attempts
+
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._queued: Set[str] = set()  # item ids in _queue
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._applied_docs: List[Dict[str, Any]] = []  # rollups to apply to the loaded records
+        self._applied_removed: List[str] = []
+        # items finished elsewhere before this are already in the loaded records
+        self._synced_until = datetime.now(timezone.utc)
+        self._metrics: Dict[str, Any] = {
+            "submitted"   : 0,
+            "done"        : 0,
+            "failed"      : 0,
+            "retries"     : 0,
+            "applied"     : 0,
+            "skipped"     : 0,  # claimed by another worker / process first
+            "store_errors": 0,
+        }
+
+    def _db(self):
+        return get_client()[DB_NAME]
+
+    # --------------------------------------------------------
+    # Submitting / reading jobs
+    # --------------------------------------------------------
+    def submit(
+        self,
+        action: str,
+        correlation_ids: List[str],
+        requested_by: str = "",
+    ) -> Dict[str, Any]:
+        """
+        Persists the job and its items, then queues them. Raises ValueError for a bad
+        request and PyMongoError when the job cannot be stored.
+        """
+        action = (action or "").upper()
+        if action not in ACTIONS:
+            raise ValueError(f"unknown action: {action} ({', '.join(ACTIONS)})")
+        cids = list(dict.fromkeys(c for c in correlation_ids if c))
+        if not cids:
+            raise ValueError("no correlation_ids")
+        if len(cids) > ACTION_MAX_FLOWS:
+            raise ValueError(f"more than {ACTION_MAX_FLOWS} flows in one job")
+
+        db = self._db()
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "_id"         : job_id,
+            "action"      : action,
+            "total"       : len(cids),
+            "done"        : 0,
+            "failed"      : 0,
+            "requested_by": requested_by,
+            "created_utc" : _now(),
+        }
+        items = [
+            {
+                "_id"           : f"{job_id}:{cid}",
+                "job_id"        : job_id,
+                "correlation_id": cid,
+                "action"        : action,
+                "state"         : PENDING,
+                "attempts"      : 0,
+                "detail"        : "",
+                "updated_utc"   : job["created_utc"],
+            }
+            for cid in cids
+        ]
+        db[ACTION_JOBS_COLLECTION].insert_one(job)
+        for i in range(0, len(items), 1000):
+            db[ACTION_ITEMS_COLLECTION].insert_many(items[i:i + 1000], ordered=False)
+        for item in items:
+            self._enqueue(item)
+        with self._lock:
+            self._metrics["submitted"] += len(items)
+        return self._with_state(job)
+
+    @staticmethod
+    def _with_state(job: Dict[str, Any]) -> Dict[str, Any]:
+        job = dict(job)
+        job["job_id"] = job.pop("_id")
+        job["state"] = DONE if job["done"] + job["failed"] >= job["total"] else RUNNING
+        return job
+
+    def job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        doc = self._db()[ACTION_JOBS_COLLECTION].find_one({"_id": job_id})
+        return self._with_state(doc) if doc else None
+
+    def jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        cursor = (
+            self._db()[ACTION_JOBS_COLLECTION]
+            .find()
+            .sort("created_utc", DESCENDING)
+            .limit(limit)
+        )
+        return [self._with_state(doc) for doc in cursor]
+
+    def job_items(
+        self,
+        job_id: str,
+        state: Optional[str] = None,
+        limit: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        query: Dict[str, Any] = {"job_id": job_id}
+        if state:
+            query["state"] = state
+        return list(self._db()[ACTION_ITEMS_COLLECTION].find(query, {"_id": 0}).limit(limit))
+
+    def flow_state(self, correlation_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The flow's most recent action item.
+        """
+        cursor = (
+            self._db()[ACTION_ITEMS_COLLECTION]
+            .find({"correlation_id": correlation_id}, {"_id": 0})
+            .sort("updated_utc", DESCENDING)
+            .limit(1)
+        )
+        return next(iter(cursor), None)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            m = dict(self._metrics)
+        m["queue_depth"] = self._queue.qsize()
+        m["workers"] = self.workers
+        m["rate_per_sec"] = self.limiter.rate
+        return m
+
+    # --------------------------------------------------------
+    # Workers
+    # --------------------------------------------------------
+    def start(self) -> None:
+        if self._threads:
+            return
+        # off the import path: with Mongo down these wait out the server selection timeout
+        t = threading.Thread(target=self._prepare, name="action-resume", daemon=True)
+        t.start()
+        self._threads.append(t)
+        SCHEDULER.add("action-resume", self.resume, ACTION_RESUME_SEC)
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"action-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._run_applier, name="action-apply", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _prepare(self) -> None:
+        self._ensure_indexes()
+        self.resume()
+
+    def _ensure_indexes(self) -> None:
+        try:
+            items = self._db()[ACTION_ITEMS_COLLECTION]
+            items.create_index([("correlation_id", ASCENDING), ("updated_utc", DESCENDING)])
+            items.create_index([("job_id", ASCENDING), ("state", ASCENDING)])
+            items.create_index([("state", ASCENDING), ("finished_at", ASCENDING)])
+            self._db()[ACTION_RATE_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
+        except PyMongoError as exc:
+            print(f"[actions] indexes not created: {exc}", file=sys.stderr)
+
+    @staticmethod
+    def _claimable(now: datetime) -> Dict[str, Any]:
+        """
+        Items a worker may take: PENDING, or RUNNING with an expired (or no) lease.
+        """
+        return {
+            "$or": [
+                {"state": PENDING},
+                {"state": RUNNING, "lease_until": {"$lt": now}},
+                {"state": RUNNING, "lease_until": None},
+            ],
+        }
+
+    def resume(self) -> int:
+        """
+        Queues the items no live worker owns: those of other processes' jobs that are
+        still waiting, and those an earlier / dead process left unfinished.
+        """
+        n = 0
+        try:
+            query = self._claimable(datetime.now(timezone.utc))
+            for item in self._db()[ACTION_ITEMS_COLLECTION].find(query).sort("_id", ASCENDING):
+                n += self._enqueue(item)
+        except PyMongoError as exc:
+            print(f"[actions] resume failed: {exc}", file=sys.stderr)
+        if n:
+            print(f"[actions] queued {n} unfinished flow actions", file=sys.stderr)
+        return n
+
+    def _enqueue(self, item: Dict[str, Any]) -> bool:
+        with self._lock:
+            if item["_id"] in self._queued:
+                return False
+            self._queued.add(item["_id"])
+        self._queue.put(item)
+        return True
+
+    def _claim(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Takes the item for this process, or None when another worker got it first.
+        """
+        now = datetime.now(timezone.utc)
+        return self._db()[ACTION_ITEMS_COLLECTION].find_one_and_update(
+            {"_id": item["_id"], **self._claimable(now)},
+            {"$set": {
+                "state"      : RUNNING,
+                "owner"      : OWNER_ID,
+                "lease_until": now + timedelta(seconds=ACTION_LEASE_SEC),
+                "updated_utc": _now(),
+            }},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            with self._lock:
+                self._queued.discard(item["_id"])
+            try:
+                self._process(item)
+            except PyMongoError as exc:
+                # the item stays PENDING / RUNNING in Mongo and is resumed once its lease runs out
+                with self._lock:
+                    self._metrics["store_errors"] += 1
+                print(f"[actions] {item['_id']}: {exc}", file=sys.stderr)
+            except Exception as exc:  # a failing item must not take its worker down with it
+                detail = f"{type(exc).__name__}: {exc}"
+                print(f"[actions] {item['_id']} failed: {detail}", file=sys.stderr)
+                try:
+                    self._finish(item, FAILED, item.get("attempts", 0), detail)
+                except PyMongoError:
+                    with self._lock:
+                        self._metrics["store_errors"] += 1
+            finally:
+                self._queue.task_done()
+
+    def _rollup_collections(self, correlation_id: str) -> List[str]:
+        record = find_record(correlation_id)
+        day = day_of(record.order_sent_utc) if record else None
+        return route_flow(self._db(), COLLECTION_NAME, day)
+
+    def _fetch_rollup(self, correlation_id: str) -> Optional[Dict[str, Any]]:
+        db = self._db()
+        for name in self._rollup_collections(correlation_id):
+            doc = db[name].find_one({"correlation_id": correlation_id}, {"_id": 0})
+            if doc is not None:
+                return doc
+        return None
+
+    def _update_item(self, item: Dict[str, Any], **fields: Any) -> bool:
+        """
+        Writes the fields and renews the lease; False when this process no longer owns the item.
+        """
+        fields["updated_utc"] = _now()
+        fields["lease_until"] = datetime.now(timezone.utc) + timedelta(seconds=ACTION_LEASE_SEC)
+        result = self._db()[ACTION_ITEMS_COLLECTION].update_one(
+            {"_id": item["_id"], "owner": OWNER_ID}, {"$set": fields},
+        )
+        return result.matched_count > 0
+
+    def _process(self, item: Dict[str, Any]) -> None:
+        claimed = self._claim(item)
+        if claimed is None:
+            with self._lock:
+                self._metrics["skipped"] += 1
+            return
+        item = claimed
+        cid, action = item["correlation_id"], item["action"]
+        rollup = self._fetch_rollup(cid)
+        if rollup is None:
+            self._finish(item, FAILED, item.get("attempts", 0), "flow not found")
+            return
+
+        attempts = item.get("attempts", 0)
+        result: Dict[str, Any] = {"ok": False, "retry": True, "detail": ""}
+        while attempts < self.max_attempts:
+            self.limiter.acquire()
+            attempts += 1
+            result = self.client.perform(action, rollup)
+            if result.get("ok") or not result.get("retry"):
+                break
+            with self._lock:
+                self._metrics["retries"] += 1
+            self._update_item(item, attempts=attempts, detail=result.get("detail") or "")
+            time.sleep(ACTION_RETRY_BACKOFF_SEC * 2 ** (attempts - 1))
+
+        if result.get("ok"):
+            self._feed_back(item, rollup, result)
+        state = DONE if result.get("ok") else FAILED
+        self._finish(item, state, attempts, result.get("detail") or "")
+
+    def _feed_back(
+        self,
+        item: Dict[str, Any],
+        rollup: Dict[str, Any],
+        result: Dict[str, Any],
+    ) -> None:
+        """
+        Successful action -> rollup in Mongo now, loaded record on the next apply.
+        """
+        db = self._db()
+        cid = item["correlation_id"]
+        names = [] if getattr(self.client, "simulated", False) else self._rollup_collections(cid)
+        patch = dict(result.get("rollup") or {})
+        if item["action"] == "DELETE":
+            patch["deleted"] = True
+        patch["last_action"] = {
+            "action": item["action"],
+            "job_id": item["job_id"],
+            "at_utc": _now(),
+        }
+        for name in names:
+            if db[name].update_one({"correlation_id": cid}, {"$set": patch}).matched_count:
+                break
+        if item["action"] == "DELETE":
+            with self._lock:
+                self._applied_removed.append(cid)
+            return
+        for field, value in patch.items():
+            _set_path(rollup, field, value)
+        with self._lock:
+            self._applied_docs.append(rollup)
+
+    def _finish(self, item: Dict[str, Any], state: str, attempts: int, detail: str) -> None:
+        finished_at = datetime.now(timezone.utc)
+        if not self._update_item(
+            item, state=state, attempts=attempts, detail=detail, finished_at=finished_at,
+        ):
+            return  # the lease ran out and another worker took the item over
+        counter = "done" if state == DONE else "failed"
+        jobs = self._db()[ACTION_JOBS_COLLECTION]
+        jobs.update_one({"_id": item["job_id"]}, {"$inc": {counter: 1}})
+        with self._lock:
+            self._metrics[counter] += 1
+
+    def _run_applier(self) -> None:
+        next_sync = time.monotonic() + ACTION_SYNC_SEC
+        while True:
+            time.sleep(APPLY_INTERVAL_SEC)
+            if time.monotonic() >= next_sync:
+                next_sync = time.monotonic() + ACTION_SYNC_SEC
+                try:
+                    self.sync_finished_elsewhere()
+                except PyMongoError as exc:
+                    print(f"[actions] sync failed: {exc}", file=sys.stderr)
+            self.apply_pending()
+
+    def sync_finished_elsewhere(self) -> int:
+        """
+        Queues the results of the items other processes finished since the last sync for
+        apply_pending, read back from the rollups so every worker's records follow.
+        """
+        query = {
+            "state"      : DONE,
+            "owner"      : {"$ne": OWNER_ID},
+            "finished_at": {"$gt": self._synced_until},
+        }
+        items = list(self._db()[ACTION_ITEMS_COLLECTION].find(query).sort("finished_at", ASCENDING))
+        docs: List[Dict[str, Any]] = []
+        removed: List[str] = []
+        for item in items:
+            if item["action"] == "DELETE":
+                removed.append(item["correlation_id"])
+                continue
+            rollup = self._fetch_rollup(item["correlation_id"])
+            if rollup is not None:
+                docs.append(rollup)
+        if items:
+            self._synced_until = items[-1]["finished_at"]
+        with self._lock:
+            self._applied_docs.extend(docs)
+            self._applied_removed.extend(removed)
+        return len(items)
+
+    def apply_pending(self) -> int:
+        """
+        Applies the finished actions to the loaded records (one counter update per call).
+        """
+        with self._lock:
+            docs, self._applied_docs = self._applied_docs, []
+            removed, self._applied_removed = self._applied_removed, []
+        if not docs and not removed:
+            return 0
+        n = data_store.update_records(docs, removed)
+        with self._lock:
+            self._metrics["applied"] += n
+        return n
+
+
+ACTION_QUEUE = ActionQueue()
+
+
+# ------------------------------------------------------------
+# Flask routes (mounted on the Dash server)
+# ------------------------------------------------------------
+def register_action_routes(server: Flask, actions: ActionQueue = ACTION_QUEUE) -> None:
+
+    @server.route("/actions/jobs", methods=["POST"])
+    def submit_job():
+        body = request.get_json(silent=True) or {}
+        try:
+            job = actions.submit(
+                body.get("action", ""),
+                list(body.get("correlation_ids") or []),
+                body.get("requested_by", ""),
+            )
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        except PyMongoError as exc:
+            return jsonify({"error": f"job not stored: {exc}"}), 503
+        return jsonify(job), 202
+
+    @server.route("/actions/jobs", methods=["GET"])
+    def list_jobs():
+        return jsonify(actions.jobs(int(request.args.get("limit", 20))))
+
+    @server.route("/actions/jobs/<job_id>", methods=["GET"])
+    def get_job(job_id: str):
+        job = actions.job(job_id)
+        if job is None:
+            return jsonify({"error": f"unknown job: {job_id}"}), 404
+        job["failures"] = actions.job_items(job_id, FAILED, limit=100)
+        return jsonify(job)
+
+    @server.route("/actions/metrics", methods=["GET"])
+    def action_metrics():
+        return jsonify(actions.metrics())
+
+    actions.start()
@@ -0,0 +1,456 @@
+# analytics.py
+# ------------------------------------------------------------
+# Columnar SQL over the event files, for post-incident analysis.
+#
+# DuckDB scans the generated datasets (dream_city_<dataset>.parquet, or
+# .jsonl[.gz|.zst] when there is no Parquet file) and the retention archive
+# (<archive-dir>/<db>/<dataset>_YYYYMMDD.jsonl[.gz|.zst]) in parallel, without
+# loading them into Mongo or into Python objects. Every dataset is exposed as
+# a view with the flattened Parquet columns of dataset_writers
+# (sap_idoc_plant, event_utc, http_latency_ms, ...), so a report reads the
+# same from either format.
+#
+# JSONL has to be parsed on every scan; for tens of millions of events
+# convert once with `parquet` and the reports run in seconds.
+#
+#   list      the files each dataset reads
+#   report    run a canned report (REPORTS) and print it as CSV
+#   parquet   write dream_city_<dataset>.parquet next to the JSONL files
+#
+# duckdb is optional: only this module and the analytics page need it.
+#
+# Run:
+#   python analytics.py report failures_by_checkpoint_hour --days 7
+#   python analytics.py parquet --data-dir /mnt/data
+# ------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+import dataset_writers
+from dataset_writers import COLUMNS_BY_DATASET
+
+ANALYTICS_DATA_DIR = "/mnt/data"  # where data_manufacturing.py writes
+ANALYTICS_ARCHIVE_DIR = "archive"  # retention.py RETENTION_ARCHIVE_DIR
+ANALYTICS_THREADS = 0  # 0: one per core
+ANALYTICS_MEMORY_LIMIT = "2GB"
+ANALYTICS_CACHE_SIZE = 32  # report results kept per (report, filters, files)
+
+# Time column each dataset is filtered on (the last --days end at its newest value)
+TIME_COLUMNS = {
+    "tech_events"    : "event_utc",
+    "business_events": "order_sent_utc",
+    "rollup_flows"   : "order_sent_utc",
+}
+TS_FORMAT = dataset_writers.TS_FORMAT
+
+SQL_TYPES = {
+    "string"         : "VARCHAR",
+    "int32"          : "INTEGER",
+    "bool"           : "BOOLEAN",
+    "timestamp"      : "VARCHAR",  # parsed with TS_FORMAT in the view
+    "requested_items": "STRUCT(sku VARCHAR, qty_requested INTEGER, uom VARCHAR)[]",
+    "confirmed_items": "STRUCT(sku VARCHAR, qty_confirmed INTEGER, uom VARCHAR)[]",
+}
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError as exc:
+        raise RuntimeError("analytics needs the 'duckdb' package (pip install duckdb)") from exc
+    return duckdb
+
+
+# ------------------------------------------------------------
+# Sources: files per dataset, and the flattened views over them
+# ------------------------------------------------------------
+def dataset_files(
+    dataset: str,
+    data_dir: str = ANALYTICS_DATA_DIR,
+    archive_dir: Optional[str] = ANALYTICS_ARCHIVE_DIR,
+) -> Dict[str, List[str]]:
+    """
+    {"parquet": [...], "jsonl": [...]}: the generated file (Parquet preferred) and the
+    archived days.
+    """
+    files: Dict[str, List[str]] = {"parquet": [], "jsonl": []}
+    parquet = os.path.join(data_dir, f"dream_city_{dataset}.parquet")
+    if os.path.exists(parquet):
+        files["parquet"].append(parquet)
+    else:
+        for compression in dataset_writers.COMPRESSIONS:
+            path = dataset_writers.jsonl_path(
+                os.path.join(data_dir, f"dream_city_{dataset}.jsonl"), compression,
+            )
+            if os.path.exists(path):
+                files["jsonl"].append(path)
+                break
+    if archive_dir:
+        pattern = os.path.join(archive_dir, "*", f"{dataset}_*.jsonl*")
+        files["jsonl"].extend(sorted(glob.glob(pattern)))
+    return files
+
+
+def _sql_list(paths: List[str]) -> str:
+    return "[" + ", ".join("'" + p.replace("'", "''") + "'" for p in paths) + "]"
+
+
+def _json_columns(dataset: str) -> str:
+    """
+    read_json columns={...}: the nested objects the flattened columns come from, typed up front
+    (no schema sampling, fields absent from a line are NULL).
+    """
+    top: Dict[str, Any] = {}
+    for _, path, kind in COLUMNS_BY_DATASET[dataset]:
+        if len(path) == 1:
+            top[path[0]] = SQL_TYPES[kind]
+        else:
+            top.setdefault(path[0], {})[path[1]] = SQL_TYPES[kind]
+    parts = []
+    for key, value in top.items():
+        if isinstance(value, dict):
+            value = "STRUCT(" + ", ".join(f'"{k}" {t}' for k, t in value.items()) + ")"
+        parts.append(f"'{key}': '{value}'")
+    return "{" + ", ".join(parts) + "}"
+
+
+def _json_select(dataset: str) -> str:
+    exprs = []
+    for name, path, kind in COLUMNS_BY_DATASET[dataset]:
+        expr = ".".join(f'"{p}"' for p in path)
+        if kind == "timestamp":
+            expr = f"try_strptime({expr}, '{TS_FORMAT}')"
+        exprs.append(f"{expr} AS {name}")
+    return ", ".join(exprs)
+
+
+def _parquet_select(dataset: str) -> str:
+    exprs = []
+    for name, _, kind in COLUMNS_BY_DATASET[dataset]:
+        exprs.append(f"CAST({name} AS TIMESTAMP) AS {name}" if kind == "timestamp" else name)
+    return ", ".join(exprs)
+
+
+def view_sql(dataset: str, files: Dict[str, List[str]]) -> Optional[str]:
+    parts = []
+    if files["parquet"]:
+        parts.append(
+            f"SELECT {_parquet_select(dataset)} FROM read_parquet({_sql_list(files['parquet'])})"
+        )
+    if files["jsonl"]:
+        parts.append(
+            f"SELECT {_json_select(dataset)} FROM read_json({_sql_list(files['jsonl'])}, "
+            f"format = 'newline_delimited', columns = {_json_columns(dataset)})"
+        )
+    return " UNION ALL ".join(parts) if parts else None
+
+
+def connect(data_dir: str = ANALYTICS_DATA_DIR, archive_dir: Optional[str] = ANALYTICS_ARCHIVE_DIR):
+    """
+    In-memory DuckDB with one view per dataset that has files (a cheap step: nothing is read yet).
+    """
+    duckdb = _duckdb()
+    con = duckdb.connect(":memory:")
+    con.execute("SET TimeZone = 'UTC'")
+    con.execute(f"SET memory_limit = '{ANALYTICS_MEMORY_LIMIT}'")
+    if ANALYTICS_THREADS:
+        con.execute(f"SET threads = {int(ANALYTICS_THREADS)}")
+    for dataset in COLUMNS_BY_DATASET:
+        sql = view_sql(dataset, dataset_files(dataset, data_dir, archive_dir))
+        if sql:
+            con.execute(f"CREATE VIEW {dataset} AS {sql}")
+    return con
+
+
+# ------------------------------------------------------------
+# Canned reports
+#   Each reads "scoped": its dataset narrowed to the city and to the last
+#   `days` before the newest row, so the same SQL serves every filter.
+# ------------------------------------------------------------
+REPORTS: Dict[str, Dict[str, Any]] = {
+    "failures_by_checkpoint_hour": {
+        "title"  : "כשלים טכניים לפי נקודת בקרה ושעה",
+        "dataset": "tech_events",
+        "sql"    : """
+            SELECT strftime(date_trunc('hour', event_utc), '%Y-%m-%dT%H:00Z') AS hour,
+                   checkpoint,
+                   count(*) FILTER (WHERE status <> 'OK')                    AS failures,
+                   count(*)                                                  AS events,
+                   round(failures / events, 4)                               AS failure_rate
+            FROM scoped
+            GROUP BY ALL
+            HAVING failures > 0
+            ORDER BY hour, checkpoint
+        """,
+        "chart"  : {"kind": "bar", "x": "hour", "y": "failures", "color": "checkpoint"},
+    },
+    "failure_reasons": {
+        "title"  : "קודי תקלה לפי נקודת בקרה ומפעל",
+        "dataset": "tech_events",
+        "sql"    : """
+            SELECT reason_code,
+                   checkpoint,
+                   sap_idoc_plant                               AS plant,
+                   count(*)                                     AS failures,
+                   count(DISTINCT correlation_id)               AS flows,
+                   strftime(min(event_utc), '%Y-%m-%dT%H:%M:%SZ') AS first_utc,
+                   strftime(max(event_utc), '%Y-%m-%dT%H:%M:%SZ') AS last_utc
+            FROM scoped
+            WHERE status <> 'OK'
+            GROUP BY ALL
+            ORDER BY failures DESC
+        """,
+        "chart"  : {"kind": "bar", "x": "reason_code", "y": "failures", "color": "plant"},
+    },
+    "hop_latency": {
+        "title"  : "השהיות לפי מקטע (מדויק, מכל האירועים)",
+        "dataset": "tech_events",
+        "sql"    : """
+            WITH {hop_durations}
+            SELECT hop,
+                   count(*)                               AS count,
+                   round(avg(ms) / 1000, 2)               AS mean_sec,
+                   round(quantile_cont(ms, 0.5) / 1000, 2)  AS p50_sec,
+                   round(quantile_cont(ms, 0.95) / 1000, 2) AS p95_sec,
+                   round(quantile_cont(ms, 0.99) / 1000, 2) AS p99_sec,
+                   round(max(ms) / 1000, 2)               AS max_sec
+            FROM durations
+            WHERE ms IS NOT NULL
+            GROUP BY hop, ord
+            ORDER BY ord
+        """,
+        "chart"  : {"kind": "bar", "x": "hop", "y": ["p50_sec", "p95_sec", "p99_sec"]},
+    },
+    "http_latency_histogram": {
+        "title"  : "התפלגות זמני תגובת HTTP לפי נקודת בקרה",
+        "dataset": "tech_events",
+        "sql"    : """
+            SELECT checkpoint,
+                   (http_latency_ms // 100) * 100 AS latency_ms_from,
+                   count(*)                       AS events,
+                   count(*) FILTER (WHERE status <> 'OK') AS failures
+            FROM scoped
+            WHERE http_latency_ms IS NOT NULL
+            GROUP BY ALL
+            ORDER BY checkpoint, latency_ms_from
+        """,
+        "chart"  : {"kind": "bar", "x": "latency_ms_from", "y": "events", "color": "checkpoint"},
+    },
+    "sla_breaches_by_hour": {
+        "title"  : "הפרות SLA עסקיות לפי שעה",
+        "dataset": "business_events",
+        "sql"    : """
+            SELECT strftime(date_trunc('hour', order_sent_utc), '%Y-%m-%dT%H:00Z') AS hour,
+                   count(*)                                    AS orders,
+                   count(*) FILTER (WHERE sla_breach)          AS breaches,
+                   round(breaches / orders, 4)                 AS breach_rate,
+                   round(avg(sla_actual_response_seconds), 1)  AS avg_response_sec,
+                   round(quantile_cont(sla_actual_response_seconds, 0.95), 1) AS p95_response_sec
+            FROM scoped
+            GROUP BY ALL
+            ORDER BY hour
+        """,
+        "chart"  : {"kind": "line", "x": "hour", "y": ["breaches", "orders"]},
+    },
+}
+REPORT_NAMES = {name: r["title"] for name, r in REPORTS.items()}
+
+
+def _hop_durations() -> str:
+    """
+    firsts: one row per flow with the first time of every checkpoint (a single
+    aggregation, no self-join); durations: (ord, hop, ms) per hop of every flow.
+    """
+    from latency import HOPS  # the hops the live latency index measures
+    checkpoints = sorted({c for hop in HOPS for c in hop})
+    firsts = ", ".join(
+        f"min(event_utc) FILTER (WHERE checkpoint = '{c}') AS \"{c}\"" for c in checkpoints
+    )
+    hops = ", ".join(
+        f"{{'ord': {i}, 'hop': '{a}→{b}', 'ms': date_diff('millisecond', \"{a}\", \"{b}\")}}"
+        for i, (a, b) in enumerate(HOPS)
+    )
+    in_list = ", ".join(f"'{c}'" for c in checkpoints)
+    return (
+        f"firsts AS (SELECT {firsts} FROM scoped WHERE checkpoint IN ({in_list}) "
+        f"GROUP BY correlation_id),\n"
+        f"durations AS (SELECT unnest([{hops}], recursive := true) FROM firsts)"
+    )
+
+
+def report_sql(name: str, city: Optional[str], days: Optional[int]) -> Tuple[str, List[Any]]:
+    report = REPORTS[name]
+    dataset = report["dataset"]
+    column = TIME_COLUMNS[dataset]
+    conds: List[str] = []
+    params: List[Any] = []
+    if city:
+        conds.append("city = ?")
+        params.append(city)
+    if days:
+        conds.append(f"{column} >= (SELECT max({column}) FROM {dataset}) - to_days(?)")
+        params.append(int(days))
+    where = ("WHERE " + " AND ".join(conds)) if conds else ""
+    ctes = [f"scoped AS (SELECT * FROM {dataset} {where})"]
+    sql = report["sql"].strip()
+    if "{hop_durations}" in sql:
+        sql = sql.replace("{hop_durations}", _hop_durations())
+    if sql.startswith("WITH "):  # the report's own CTEs follow ours
+        ctes.append(sql[len("WITH "):])
+        return "WITH " + ",\n".join(ctes), params
+    return "WITH " + ",\n".join(ctes) + "\n" + sql, params
+
+
+def _plain(v: Any) -> Any:
+    if isinstance(v, datetime):
+        return v.strftime(TS_FORMAT)
+    return v
+
+
+def _signature(data_dir: str, archive_dir: Optional[str]) -> Tuple[Any, ...]:
+    out = []
+    for dataset in COLUMNS_BY_DATASET:
+        for paths in dataset_files(dataset, data_dir, archive_dir).values():
+            for p in paths:
+                st = os.stat(p)
+                out.append((p, st.st_size, int(st.st_mtime)))
+    return tuple(out)
+
+
+_CACHE: "OrderedDict[Tuple[Any, ...], Dict[str, Any]]" = OrderedDict()
+_CACHE_LOCK = threading.Lock()
+
+
+def run_report(
+    name: str,
+    city: Optional[str] = None,
+    days: Optional[int] = None,
+    data_dir: str = ANALYTICS_DATA_DIR,
+    archive_dir: Optional[str] = ANALYTICS_ARCHIVE_DIR,
+) -> Dict[str, Any]:
+    """
+    {"columns", "rows" (dicts), "seconds", "files", "cached"}. Results are cached until
+    the files change.
+    RuntimeError without duckdb or when the query fails (e.g. no files for the dataset).
+    """
+    if name not in REPORTS:
+        raise KeyError(f"unknown report: {name} ({', '.join(REPORTS)})")
+    key = (name, city, days, data_dir, archive_dir, _signature(data_dir, archive_dir))
+    with _CACHE_LOCK:
+        if key in _CACHE:
+            _CACHE.move_to_end(key)
+            return {**_CACHE[key], "cached": True}
+
+    dataset = REPORTS[name]["dataset"]
+    files = dataset_files(dataset, data_dir, archive_dir)
+    if not files["parquet"] and not files["jsonl"]:
+        where = f"{data_dir} or {archive_dir}" if archive_dir else data_dir
+        raise RuntimeError(f"no {dataset} files in {where}")
+
+    started = time.monotonic()
+    duckdb = _duckdb()
+    sql, params = report_sql(name, city, days)
+    con = connect(data_dir, archive_dir)
+    try:
+        cursor = con.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+        rows = [dict(zip(columns, map(_plain, row))) for row in cursor.fetchall()]
+    except duckdb.Error as exc:
+        raise RuntimeError(f"{name}: {exc}") from exc
+    finally:
+        con.close()
+    result = {
+        "columns": columns,
+        "rows"   : rows,
+        "seconds": round(time.monotonic() - started, 3),
+        "files"  : len(files["parquet"]) + len(files["jsonl"]),
+        "cached" : False,
+    }
+    with _CACHE_LOCK:
+        _CACHE[key] = result
+        while len(_CACHE) > ANALYTICS_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    return result
+
+
+# ------------------------------------------------------------
+# Parquet conversion
+# ------------------------------------------------------------
+def write_parquet(data_dir: str = ANALYTICS_DATA_DIR) -> Dict[str, int]:
+    """
+    dream_city_<dataset>.parquet from the generated JSONL (the dataset_writers schema),
+    rows per dataset.
+    """
+    con = connect(data_dir, archive_dir=None)
+    written: Dict[str, int] = {}
+    try:
+        for dataset in COLUMNS_BY_DATASET:
+            files = dataset_files(dataset, data_dir, archive_dir=None)
+            if not files["jsonl"]:
+                continue
+            path = os.path.join(data_dir, f"dream_city_{dataset}.parquet")
+            tmp = f"{path}.tmp"
+            con.execute(
+                f"COPY (SELECT * FROM {dataset}) TO '{tmp}' "
+                f"(FORMAT parquet, COMPRESSION {dataset_writers.PARQUET_COMPRESSION}, "
+                f"ROW_GROUP_SIZE {dataset_writers.PARQUET_ROW_GROUP})"
+            )
+            os.replace(tmp, path)
+            count = con.execute(f"SELECT count(*) FROM read_parquet('{path}')")
+            written[dataset] = count.fetchone()[0]
+    finally:
+        con.close()
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(
+        description="Columnar SQL reports over the generated / archived event files.",
+    )
+    ap.add_argument("--data-dir", default=ANALYTICS_DATA_DIR)
+    ap.add_argument(
+        "--archive-dir", default=ANALYTICS_ARCHIVE_DIR, help="'' to leave the archive out",
+    )
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list")
+    p = sub.add_parser("report")
+    p.add_argument("name", choices=list(REPORTS))
+    p.add_argument("--city", default=None)
+    p.add_argument("--days", type=int, default=None, help="last N days before the newest event")
+    sub.add_parser("parquet")
+
+    args = ap.parse_args(argv)
+    archive_dir = args.archive_dir or None
+
+    if args.command == "list":
+        files = {d: dataset_files(d, args.data_dir, archive_dir) for d in COLUMNS_BY_DATASET}
+        print(json.dumps(files, indent=2))
+    elif args.command == "report":
+        result = run_report(args.name, args.city, args.days, args.data_dir, archive_dir)
+        writer = csv.DictWriter(sys.stdout, fieldnames=result["columns"])
+        writer.writeheader()
+        writer.writerows(result["rows"])
+        print(
+            f"[analytics] {args.name}: {len(result['rows'])} rows from {result['files']} files "
+            f"in {result['seconds']:.2f}s",
+            file=sys.stderr,
+        )
+    else:
+        print(json.dumps(write_parquet(args.data_dir), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+import data_store
+from data_store import FlowRecord
+from sla_tracker import parse_utc
+
+# ------------------------------------------------------------
+# Failure-rate anomalies per (reason_code, checkpoint, plant)
+#   Rollups are counted into BUCKET_SEC buckets of order_sent_utc: flows per
+#   (city, plant) and failures per (city, plant, reason_code, checkpoint), O(1)
+#   per rollup. When the newest bucket moves on, every closed bucket is folded
+#   into an EWMA mean / variance of each key's failure rate; a bucket whose rate
+#   sits Z_THRESHOLD deviations above the baseline it is compared with (and is
+#   clearly more than a stray failure) is an anomaly. The open bucket is scored
+#   against the same baseline on every query, so a burst shows while it runs.
+#
+#   Tech failures:     tech.reason_code at tech.last_checkpoint (last_status FAIL)
+#   Business failures: business.reason_code at BUSINESS_CHECKPOINT (status not OK),
+#                      except NOT_SENT_DUE_TECH_FAILURE (already counted as tech)
+# ------------------------------------------------------------
+BUCKET_SEC = 15 * 60
+EWMA_ALPHA = 0.05  # ~20 buckets (5 hours) of memory
+Z_THRESHOLD = 4.0
+MIN_FAILURES = 3  # per bucket
+MIN_RATE_DELTA = 0.05  # rate must also exceed the baseline by 5 points
+SD_FLOOR = 0.01  # keeps an all-zero history from flagging every single failure
+WARMUP_BUCKETS = 8  # buckets with flows before a plant's keys are scored
+KEEP_BUCKETS = 4 * 24 * 2  # raw bucket counts kept for late rollups (2 days)
+ACTIVE_BUCKETS = 2  # anomalies stay listed for the open and the last closed bucket
+
+BUSINESS_CHECKPOINT = "WMS_RESPONSE"
+DERIVED_BUSINESS_REASONS = {"NOT_SENT_DUE_TECH_FAILURE"}
+
+PlantKey = Tuple[str, str]  # (city, plant)
+FailureKey = Tuple[str, str, str, str]  # (city, plant, reason_code, checkpoint)
+
+
+def failure_keys(r: FlowRecord) -> Tuple[FailureKey, ...]:
+    keys: List[FailureKey] = []
+    if r.last_status == "FAIL" and r.tech_reason:
+        keys.append((r.city, r.plant, r.tech_reason, r.last_checkpoint))
+    own_reason = r.biz_reason and r.biz_reason not in DERIVED_BUSINESS_REASONS
+    if r.biz_status and r.biz_status != "OK" and own_reason:
+        keys.append((r.city, r.plant, r.biz_reason, BUSINESS_CHECKPOINT))
+    return tuple(keys)
+
+
+def _bucket_of(order_sent_utc: str) -> Optional[int]:
+    sent = parse_utc(order_sent_utc)
+    return None if sent is None else int(sent.timestamp()) // BUCKET_SEC
+
+
+def _bucket_utc(bucket: int) -> str:
+    return time.strftime("%Y-%m-%d %H:%MZ", time.gmtime(bucket * BUCKET_SEC))
+
+
+class _Baseline:
+    __slots__ = ("mean", "var", "n")
+
+    def __init__(self):
+        self.mean = 0.0
+        self.var = 0.0
+        self.n = 0
+
+    def z(self, rate: float) -> float:
+        return (rate - self.mean) / max(math.sqrt(self.var), SD_FLOOR)
+
+    def update(self, rate: float) -> None:
+        diff = rate - self.mean
+        incr = EWMA_ALPHA * diff
+        self.mean += incr
+        self.var = (1 - EWMA_ALPHA) * (self.var + diff * incr)
+        self.n += 1
+
+
+class AnomalyDetector:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flows: Dict[PlantKey, Dict[int, int]] = {}
+        self._failures: Dict[FailureKey, Dict[int, int]] = {}
+        self._keys_by_plant: Dict[PlantKey, set] = {}
+        # correlation_id -> (bucket, keys)
+        self._seen: Dict[str, Tuple[int, Tuple[FailureKey, ...]]] = {}
+        self._baselines: Dict[FailureKey, _Baseline] = {}
+        self._plant_buckets: Dict[PlantKey, int] = {}  # buckets with flows folded per plant
+        self._newest: Optional[int] = None
+        self._folded: Optional[int] = None  # last bucket folded into the baselines
+        self._flagged: Dict[Tuple[FailureKey, int], Dict[str, Any]] = {}
+
+    # --------------------------------------------------------
+    # Counting (O(1) per rollup; a re-loaded rollup only moves its own counts)
+    # --------------------------------------------------------
+    def observe(self, r: FlowRecord) -> None:
+        bucket = _bucket_of(r.order_sent_utc)
+        if bucket is None or not r.correlation_id:
+            return
+        keys = failure_keys(r)
+        plant_key = (r.city, r.plant)
+
+        with self._lock:
+            prev = self._seen.get(r.correlation_id)
+            if prev == (bucket, keys):
+                return
+            if prev is not None:
+                self._count(plant_key, prev[0], prev[1], -1)
+            self._count(plant_key, bucket, keys, 1)
+            self._seen[r.correlation_id] = (bucket, keys)
+            if self._newest is None or bucket > self._newest:
+                self._newest = bucket
+
+    def _count(
+        self,
+        plant_key: PlantKey,
+        bucket: int,
+        keys: Tuple[FailureKey, ...],
+        n: int,
+    ) -> None:
+        counts = self._flows.setdefault(plant_key, {})
+        counts[bucket] = counts.get(bucket, 0) + n
+        for key in keys:
+            counts = self._failures.setdefault(key, {})
+            counts[bucket] = counts.get(bucket, 0) + n
+            self._keys_by_plant.setdefault(plant_key, set()).add(key)
+
+    def observe_batch(self, records: List[FlowRecord]) -> None:
+        for r in records:
+            self.observe(r)
+
+    # --------------------------------------------------------
+    # Folding closed buckets into the baselines
+    # --------------------------------------------------------
+    def _score(self, key: FailureKey, bucket: int, flows: int) -> Optional[Dict[str, Any]]:
+        failures = self._failures.get(key, {}).get(bucket, 0)
+        base = self._baselines.get(key) or _Baseline()
+        warming_up = self._plant_buckets.get(key[:2], 0) < WARMUP_BUCKETS
+        if failures < MIN_FAILURES or not flows or warming_up:
+            return None
+        rate = failures / flows
+        z = base.z(rate)
+        if z < Z_THRESHOLD or rate < base.mean + MIN_RATE_DELTA:
+            return None
+        city, plant, reason, checkpoint = key
+        return {
+            "city"        : city,
+            "plant"       : plant,
+            "reason_code" : reason,
+            "checkpoint"  : checkpoint,
+            "layer"       : "BUSINESS" if checkpoint == BUSINESS_CHECKPOINT else "TECH",
+            "bucket_utc"  : _bucket_utc(bucket),
+            "bucket"      : bucket,
+            "failures"    : failures,
+            "flows"       : flows,
+            "rate"        : round(rate, 4),
+            "baseline"    : round(base.mean, 4),
+            "z"           : round(z, 1),
+        }
+
+    def _fold(self) -> None:
+        """
+        Caller holds the lock. Folds every bucket before the newest one, oldest first.
+        """
+        if self._newest is None:
+            return
+        start = self._newest - KEEP_BUCKETS if self._folded is None else self._folded + 1
+        if start >= self._newest:
+            return
+        for bucket in range(max(start, self._newest - KEEP_BUCKETS), self._newest):
+            for plant_key, counts in self._flows.items():
+                flows = counts.get(bucket, 0)
+                if not flows:
+                    continue
+                for key in self._keys_by_plant.get(plant_key, ()):
+                    hit = self._score(key, bucket, flows)
+                    if hit:
+                        self._flagged[(key, bucket)] = hit
+                    self._baselines.setdefault(key, _Baseline()).update(
+                        self._failures.get(key, {}).get(bucket, 0) / flows,
+                    )
+                self._plant_buckets[plant_key] = self._plant_buckets.get(plant_key, 0) + 1
+            self._folded = bucket
+        self._prune()
+
+    def _prune(self) -> None:
+        oldest = self._newest - KEEP_BUCKETS
+        for table in (self._flows, self._failures):
+            for counts in table.values():
+                for b in [b for b in counts if b < oldest]:
+                    del counts[b]
+        for cid in [cid for cid, (b, _) in self._seen.items() if b < oldest]:
+            del self._seen[cid]
+        for k in [k for k in self._flagged if k[1] < self._newest - ACTIVE_BUCKETS]:
+            del self._flagged[k]
+
+    # --------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------
+    def anomalies(self, city: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Active anomalies (last closed and open bucket), highest z first.
+        """
+        with self._lock:
+            self._fold()
+            if self._newest is None:
+                return []
+            found = dict(self._flagged)
+            # the open bucket, against the baseline it will be folded into
+            for plant_key, counts in self._flows.items():
+                flows = counts.get(self._newest, 0)
+                for key in self._keys_by_plant.get(plant_key, ()):
+                    hit = self._score(key, self._newest, flows)
+                    if hit:
+                        found[(key, self._newest)] = hit
+        out = [a for a in found.values() if not city or a["city"] == city]
+        out.sort(key=lambda a: (-a["z"], a["bucket_utc"]))
+        return out
+
+    def baselines(self) -> Dict[FailureKey, Dict[str, float]]:
+        with self._lock:
+            self._fold()
+            return {
+                k: {"mean": b.mean, "sd": math.sqrt(b.var), "buckets": b.n}
+                for k, b in self._baselines.items()
+            }
+
+
+DETECTOR = AnomalyDetector()
+
+_STARTED = False
+
+
+def start_anomaly_detector() -> None:
+    """
+    Follow every loaded batch from now on, and count what is already loaded
+    (a batch seen twice is harmless: rollups are counted once per correlation_id).
+    """
+    global _STARTED
+    if _STARTED:
+        return
+    _STARTED = True
+    data_store.RECORD_LISTENERS.append(DETECTOR.observe_batch)
+    for shard in data_store.shards():
+        DETECTOR.observe_batch(list(shard.records))
@@ -1,6 +1,18 @@
 import dash_bootstrap_components as dbc
 from dash import Dash, html, page_container
 
+# imported first so SAP_MONITOR_TRACEMALLOC=1 traces the data_store load too
+from diagnostics import diagnostics_enabled, register_diagnostics_routes
+from actions import register_action_routes
+from anomaly import start_anomaly_detector
+from cube import start_cube
+from data_store import start_rollup_refresher
+from export import register_export_routes
+from ingest import register_ingest_routes
+from latency import start_latency_loader
+from retention import schedule_retention
+from scheduler import register_scheduler_routes, start_scheduler
+
 app = Dash(
         __name__,
         use_pages=True,
@@ -10,6 +22,20 @@ app = Dash(
 
 app.title = "מערכת ניטור מערכות SAP-WMS"
 
+register_ingest_routes(app.server)
+register_export_routes(app.server)
+register_action_routes(app.server)
+start_rollup_refresher()
+start_anomaly_detector()
+start_cube()
+start_latency_loader()
+schedule_retention()
+register_scheduler_routes(app.server)
+start_scheduler()
+
+if diagnostics_enabled():
+    register_diagnostics_routes(app.server)
+
 app.layout = html.Div(
         [
             html.Div([page_container]),
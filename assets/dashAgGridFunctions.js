@@ -1,37 +1,20 @@
 var dagfuncs = window.dashAgGridFunctions = window.dashAgGridFunctions || {};
 
-// Tree path: YYYY-MM -> Category -> Account -> Payee (leaf)
+// Tree path: sap_order (ORDER row = group node) -> FLOW/TECH/BUSINESS/SLA (leaf)
 dagfuncs.getDataPathSap = function (data) {
     if (!data) return [];
+    if (data.node_type === "ORDER") return [data.sap_order];
     return [data.sap_order, data.node_type];
 };
 
 dagfuncs.rowStyleOverall = function (params) {
-    // Leaf rows (FLOW/TECH/BUSINESS/SLA) have params.data
+    // Leaf rows (FLOW/TECH/BUSINESS/SLA) and group rows (ORDER, worst over the
+    // order precomputed by to_grouped_rows) both carry params.data: O(1) per row
     if (params && params.data && params.data.overall) {
         const s = params.data.overall;
         if (s === "RED")   return { backgroundColor: "#fdecea" };
         if (s === "AMBER") return { backgroundColor: "#fff4e5" };
         if (s === "GREEN") return { backgroundColor: "#edf7ed" };
-        return {};
-    }
-
-    // Group rows (sap_order) often have no data, so compute from children
-    if (params && params.node && params.node.group) {
-        const kids = params.node.allLeafChildren || [];
-        let worst = "GREEN";
-
-        for (let i = 0; i < kids.length; i++) {
-            const d = kids[i] && kids[i].data ? kids[i].data : null;
-            const s = d ? d.overall : null;
-
-            if (s === "RED") { worst = "RED"; break; }
-            if (s === "AMBER") worst = "AMBER";
-        }
-
-        if (worst === "RED")   return { backgroundColor: "#fdecea" };
-        if (worst === "AMBER") return { backgroundColor: "#fff4e5" };
-        if (worst === "GREEN") return { backgroundColor: "#edf7ed" };
     }
 
     return {};
@@ -112,27 +95,13 @@ dagfuncs.rowStatusIcon = function (params) {
 
 dagfuncs.rowStyleByRowStatus = function (params) {
     // Leaf rows: color by row_status (TECH/BUSINESS/SLA are independent)
+    // Group rows: the ORDER row's row_status is the worst row_status of its
+    // children, precomputed by to_grouped_rows, so no scan of allLeafChildren
     if (params && params.data && params.data.row_status) {
         const s = params.data.row_status;
         if (s === "RED")   return { backgroundColor: "#fdecea" };
         if (s === "AMBER") return { backgroundColor: "#fff4e5" };
         if (s === "GREEN") return { backgroundColor: "#edf7ed" };
-        return {};
-    }
-
-    // Group rows: compute worst from children.row_status
-    if (params && params.node && params.node.group) {
-        const kids = params.node.allLeafChildren || [];
-        let worst = "GREEN";
-        for (let i = 0; i < kids.length; i++) {
-            const d = kids[i] && kids[i].data ? kids[i].data : null;
-            const s = d ? d.row_status : null;
-            if (s === "RED") { worst = "RED"; break; }
-            if (s === "AMBER") worst = "AMBER";
-        }
-        if (worst === "RED")   return { backgroundColor: "#fdecea" };
-        if (worst === "AMBER") return { backgroundColor: "#fff4e5" };
-        if (worst === "GREEN") return { backgroundColor: "#edf7ed" };
     }
 
     return {};
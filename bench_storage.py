@@ -0,0 +1,199 @@
+# bench_storage.py
+# ------------------------------------------------------------
+# Storage backend benchmark: the same read queries against each backend.
+#
+#   cities        discover_cities()
+#   bulk_load     iter_rollup_batches() over all cities (the dashboard load)
+#   tile_counts   count_rollups() for every tile
+#   export        iter_tile_docs("overall_RED") drained
+#   detail        find_rollup + find_tech_events + find_business_event
+#                 for --lookups random correlation_ids (the detail page)
+#   latency_scan  iter_tech_events() drained (the latency index load)
+#
+# Every query runs --repeat times per backend; the report has min / median
+# per query and the row count, which must agree between the backends.
+#
+# Run (Mongo seeded from the same files, e.g. replay_events.py --target mongo):
+#   python bench_storage.py --backends mongo,sqlite --data-dir /mnt/data
+# ------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Any, Optional
+
+import data_store
+from data_store import (
+    DEFAULT_CITY,
+    LIMIT,
+    ROLLUP_BATCH_SIZE,
+    ROLLUP_PROJECTION,
+    ROLLUP_WINDOW_DAYS,
+    MongoStorage,
+)
+from latency import LATENCY_PROJECTION
+from storage import SqliteStorage
+
+TILES = [
+    "overall_GREEN", "overall_AMBER", "overall_RED",
+    "tech_GREEN", "tech_AMBER", "tech_RED",
+    "business_GREEN", "business_AMBER", "business_RED",
+    "sla_OK", "sla_AT_RISK", "sla_BREACH",
+]
+
+
+def make_backend(name: str, sqlite_path: str, data_dir: str):
+    if name == "mongo":
+        return MongoStorage()
+    if name == "sqlite":
+        storage = SqliteStorage(
+            sqlite_path, data_dir, LIMIT, ROLLUP_WINDOW_DAYS, DEFAULT_CITY, ROLLUP_PROJECTION,
+        )
+        started = time.monotonic()
+        storage.ensure_built()  # the one-off build is reported, not benchmarked
+        print(f"[bench] sqlite ready in {time.monotonic() - started:.2f}s", file=sys.stderr)
+        return storage
+    raise ValueError(f"unknown backend: {name} (mongo, sqlite)")
+
+
+# ------------------------------------------------------------
+# Queries: storage -> row count
+# ------------------------------------------------------------
+def q_cities(storage) -> int:
+    return len(storage.discover_cities())
+
+
+def q_bulk_load(storage) -> int:
+    return sum(
+        len(batch)
+        for city in storage.discover_cities()
+        for batch in storage.iter_rollup_batches(city, ROLLUP_BATCH_SIZE)
+    )
+
+
+def q_tile_counts(storage) -> int:
+    return sum(storage.count_rollups(tile_id) for tile_id in TILES)
+
+
+def q_export(storage) -> int:
+    return sum(1 for _ in storage.iter_tile_docs("overall_RED"))
+
+
+def q_detail(cids: List[str]) -> Callable[[Any], int]:
+    def run(storage) -> int:
+        n = 0
+        for cid in cids:
+            n += storage.find_rollup(cid, 5.0) is not None
+            n += len(storage.find_tech_events(cid, 5.0))
+            n += storage.find_business_event(cid, 5.0) is not None
+        return n
+    return run
+
+
+def q_latency_scan(storage) -> int:
+    return sum(1 for _ in storage.iter_tech_events(ROLLUP_BATCH_SIZE, LATENCY_PROJECTION))
+
+
+def sample_cids(storage, n: int, seed: int) -> List[str]:
+    cids = [
+        doc["correlation_id"]
+        for city in storage.discover_cities()
+        for batch in storage.iter_rollup_batches(city, ROLLUP_BATCH_SIZE)
+        for doc in batch
+    ]
+    return random.Random(seed).sample(cids, min(n, len(cids)))
+
+
+def timed(fn: Callable[[Any], int], storage, repeat: int) -> Dict[str, Any]:
+    times: List[float] = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = fn(storage)
+        times.append((time.perf_counter() - started) * 1000)
+    return {
+        "rows"     : rows,
+        "min_ms"   : round(min(times), 2),
+        "median_ms": round(statistics.median(times), 2),
+    }
+
+
+def wait_for_app_load(timeout: float = 600.0) -> None:
+    """
+    Importing data_store starts its first rollup load; let it finish so it does not skew
+    the timings.
+    """
+    deadline = time.monotonic() + timeout
+    while data_store.LOAD_PROGRESS["state"] in ("idle", "loading") and time.monotonic() < deadline:
+        time.sleep(0.2)
+
+
+def print_report(report: Dict[str, Dict[str, Dict[str, Any]]]) -> None:
+    backends = list(report)
+    queries = list(report[backends[0]])
+    print(f"{'query':<14}" + "".join(f"{b + ' ms (min/med)':>26}{'rows':>10}" for b in backends))
+    for q in queries:
+        line = f"{q:<14}"
+        for b in backends:
+            r = report[b][q]
+            line += f"{r['min_ms']:>15.2f} / {r['median_ms']:>8.2f}{r['rows']:>10}"
+        print(line)
+    mismatched = [q for q in queries if len({report[b][q]["rows"] for b in backends}) > 1]
+    if mismatched:
+        print(f"row counts differ between backends: {', '.join(mismatched)}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(
+        description="Compare the storage backends on the dashboard's read queries.",
+    )
+    ap.add_argument("--backends", default="mongo,sqlite", help="comma separated: mongo, sqlite")
+    ap.add_argument(
+        "--data-dir", default=data_store.SQLITE_DATA_DIR, help="JSONL files for the sqlite backend",
+    )
+    ap.add_argument("--sqlite-path", default=None, help="default: <data-dir>/sap_monitor.sqlite")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--lookups", type=int, default=200, help="correlation_ids for the detail query")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = ap.parse_args(argv)
+
+    wait_for_app_load()
+    sqlite_path = args.sqlite_path or os.path.join(args.data_dir, "sap_monitor.sqlite")
+    backends = {
+        name: make_backend(name, sqlite_path, args.data_dir)
+        for name in (b.strip() for b in args.backends.split(","))
+        if name
+    }
+    # same flows on every backend: sampled from the first one
+    cids = sample_cids(next(iter(backends.values())), args.lookups, args.seed)
+
+    queries = {
+        "cities"      : q_cities,
+        "bulk_load"   : q_bulk_load,
+        "tile_counts" : q_tile_counts,
+        "export"      : q_export,
+        "detail"      : q_detail(cids),
+        "latency_scan": q_latency_scan,
+    }
+    report: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for name, storage in backends.items():
+        report[name] = {}
+        for q, fn in queries.items():
+            report[name][q] = timed(fn, storage, args.repeat)
+            print(f"[bench] {name} {q}: {report[name][q]}", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
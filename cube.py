@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Any, Optional, Sequence, Tuple
+
+import data_store
+from data_store import SLA_NAMES, STATUS_NAMES, FlowRecord
+
+# ------------------------------------------------------------
+# Count cube over the rollup dimensions
+#   One cell per distinct combination of DIMENSIONS, holding the number of
+#   rollups in it. Rollups are added / moved / removed one at a time (O(1),
+#   keyed by correlation_id), so the cube follows every load without a rescan.
+#   Roll-up, slice and drill only walk the cells, never the rollups: a few
+#   thousand cells instead of hundreds of thousands of records.
+#
+#   States are the ones stored on the rollup as loaded (the tiles additionally
+#   follow open flows through the SLA tracker between loads).
+# ------------------------------------------------------------
+DIMENSIONS: Tuple[str, ...] = (
+    "city",
+    "plant",
+    "overall",
+    "tech",
+    "business",
+    "sla",
+    "tech_reason",
+    "biz_reason",
+    "last_checkpoint",
+    "hour",
+)
+DIMENSION_NAMES = {
+    "city"           : "אתר",
+    "plant"          : "מפעל",
+    "overall"        : "סטטוס כולל",
+    "tech"           : "סטטוס טכני",
+    "business"       : "סטטוס עסקי",
+    "sla"            : "מצב SLA",
+    "tech_reason"    : "קוד תקלה טכני",
+    "biz_reason"     : "קוד תקלה עסקי",
+    "last_checkpoint": "נקודת בקרה אחרונה",
+    "hour"           : "שעה (UTC)",
+}
+NONE = "—"  # no reason code / checkpoint / time
+
+Cell = Tuple[str, ...]  # values in DIMENSIONS order
+
+
+def cell_of(r: FlowRecord) -> Cell:
+    return (
+        r.city,
+        r.plant or NONE,
+        STATUS_NAMES[r.overall],
+        STATUS_NAMES[r.tech],
+        STATUS_NAMES[r.biz],
+        SLA_NAMES[r.sla],
+        r.tech_reason or NONE,
+        r.biz_reason or NONE,
+        r.last_checkpoint or NONE,
+        r.order_sent_utc[:13] or NONE,  # YYYY-MM-DDTHH
+    )
+
+
+def _positions(dims: Sequence[str]) -> List[int]:
+    unknown = [d for d in dims if d not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"unknown cube dimension(s): {', '.join(unknown)}")
+    return [DIMENSIONS.index(d) for d in dims]
+
+
+def _matcher(where: Optional[Dict[str, Any]]) -> List[Tuple[int, frozenset]]:
+    """
+    {dimension: value | [values]} -> [(position, allowed values)]
+    """
+    out: List[Tuple[int, frozenset]] = []
+    for dim, value in (where or {}).items():
+        values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+        out.append((_positions([dim])[0], frozenset(values)))
+    return out
+
+
+class CountCube:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cells: Dict[Cell, int] = {}
+        self._cell_of: Dict[str, Cell] = {}  # correlation_id -> its cell
+        self.version = 0  # bumped on every change, for callers that cache answers
+
+    def __len__(self) -> int:
+        return len(self._cells)
+
+    @property
+    def rollups(self) -> int:
+        return len(self._cell_of)
+
+    # --------------------------------------------------------
+    # Maintenance
+    # --------------------------------------------------------
+    def _move(self, cid: str, cell: Optional[Cell]) -> bool:
+        """
+        Caller holds the lock. Puts the rollup in `cell` (None removes it).
+        """
+        prev = self._cell_of.get(cid)
+        if prev == cell:
+            return False
+        if prev is not None:
+            n = self._cells[prev] - 1
+            if n:
+                self._cells[prev] = n
+            else:
+                del self._cells[prev]
+        if cell is None:
+            del self._cell_of[cid]
+        else:
+            self._cells[cell] = self._cells.get(cell, 0) + 1
+            self._cell_of[cid] = cell
+        return True
+
+    def observe_batch(self, records: Iterable[FlowRecord]) -> None:
+        with self._lock:
+            changed = False
+            for r in records:
+                if r.correlation_id:
+                    changed |= self._move(r.correlation_id, cell_of(r))
+            if changed:
+                self.version += 1
+
+    def retain(self, shard: "data_store.CityShard") -> None:
+        """
+        After a shard (re)load: rollups of that city that are no longer loaded leave the cube.
+        """
+        city = shard.city
+        by_cid = shard.by_cid
+        with self._lock:
+            gone = [
+                cid for cid, cell in self._cell_of.items() if cell[0] == city and cid not in by_cid
+            ]
+            for cid in gone:
+                self._move(cid, None)
+            if gone:
+                self.version += 1
+
+    # --------------------------------------------------------
+    # Queries (O(cells))
+    # --------------------------------------------------------
+    def rollup(self, by: Sequence[str], where: Optional[Dict[str, Any]] = None) -> Dict[Cell, int]:
+        """
+        Counts grouped by the `by` dimensions (every other dimension rolled up),
+        over the cells matching `where` ({dimension: value | [values]}).
+        """
+        group = _positions(by)
+        match = _matcher(where)
+        out: Dict[Cell, int] = {}
+        with self._lock:
+            cells = list(self._cells.items())
+        for cell, n in cells:
+            if all(cell[i] in allowed for i, allowed in match):
+                key = tuple(cell[i] for i in group)
+                out[key] = out.get(key, 0) + n
+        return out
+
+    def total(self, where: Optional[Dict[str, Any]] = None) -> int:
+        return self.rollup((), where).get((), 0)
+
+    def slice(self, where: Dict[str, Any]) -> "CountCube":
+        """
+        A sub-cube of the matching cells (a snapshot, not maintained).
+        """
+        match = _matcher(where)
+        sub = CountCube()
+        with self._lock:
+            sub._cells = {
+                c: n for c, n in self._cells.items()
+                if all(c[i] in allowed for i, allowed in match)
+            }
+        return sub
+
+    def drill(self, path: Sequence[Tuple[str, str]], by: str) -> List[Dict[str, Any]]:
+        """
+        Fix every (dimension, value) of `path`, then break the rest down by `by`,
+        largest first: [{by: value, "count": n}].
+        """
+        counts = self.rollup((by,), dict(path))
+        rows = [{by: key[0], "count": n} for key, n in counts.items()]
+        rows.sort(key=lambda row: (-row["count"], row[by]))
+        return rows
+
+    def pivot(
+        self,
+        rows: str,
+        columns: str,
+        where: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        {row value: {column value: count}} for a two-dimensional view.
+        """
+        out: Dict[str, Dict[str, int]] = {}
+        for (r, c), n in self.rollup((rows, columns), where).items():
+            out.setdefault(r, {})[c] = n
+        return out
+
+    def values(self, dim: str, where: Optional[Dict[str, Any]] = None) -> List[str]:
+        return sorted(key[0] for key in self.rollup((dim,), where))
+
+
+CUBE = CountCube()
+
+_STARTED = False
+
+
+def start_cube() -> None:
+    """
+    Follow every loaded batch and every finished shard load, and add what is already loaded.
+    """
+    global _STARTED
+    if _STARTED:
+        return
+    _STARTED = True
+    data_store.RECORD_LISTENERS.append(CUBE.observe_batch)
+    data_store.SHARD_LISTENERS.append(CUBE.retain)
+    for shard in data_store.shards():
+        CUBE.observe_batch(list(shard.records))
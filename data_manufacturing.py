@@ -1,7 +1,7 @@
 import json, random, hashlib, os, math
 from datetime import datetime, timedelta, timezone
 
-random.seed(42)
+import dataset_writers
 
 # Parameters
 n_flows = 10000
@@ -25,6 +25,13 @@ p_no_response = 0.001  # 0.1% (but could be transport ok + missing business resp
 p_confirm_gt_req = 0.0005
 p_uom_mismatch = 0.0005
 
+# Names of the rates above; scenarios.py varies them over time
+RATE_NAMES = (
+    "p_transport_fail", "p_schema_fail", "p_po_mapping_fail", "p_fw_fail", "p_tls_fail",
+    "p_other_transport_fail",
+    "p_partial", "p_reject", "p_late", "p_no_response", "p_confirm_gt_req", "p_uom_mismatch",
+)
+
 # Reference lists
 skus = [
     "PANTS-BLK-32", "PANTS-BLU-34", "PANTS-GRN-36", "PANTS-YLW-28", "PANTS-RED-30",
@@ -34,6 +41,23 @@ plants = ["DC01", "DC02", "DC03"]
 schemas = ["ORDERS_v7", "ORDERS_v6", "ORDERS_v8"]
 idoc_type = "ORDERS05"
 
+other_transport_codes = [
+    "DNS_FAILURE", "HTTP_500", "HTTP_401", "HTTP_413", "CONNECTION_RESET", "PO_QUEUE_BACKLOG",
+]
+
+reject_reasons = [
+    ("SKU_UNKNOWN", "Unknown SKU"),
+    ("BLOCKED_SHIP_TO", "Invalid ship-to / blocked customer"),
+    ("VALIDATION_ERROR", "Mandatory field missing in order"),
+]
+
+schema_details = [
+    "Element 'ShipToParty' missing",
+    "Invalid value for 'RequestedDeliveryDate'",
+    "Unexpected element 'BatchNumber'",
+    "Length exceeded for 'CustomerPO'"
+]
+
 reason_transport = [
     ("SCHEMA_INVALID_FIELD", "SAP_SCHEMA_VALIDATION"),
     ("PO_MAPPING_ERROR", "PO_MAPPING_OK"),
@@ -71,19 +95,25 @@ def sap_order(i):
     return f"{4500100000 + i}"
 
 
-def pick_failure():
+def base_rates():
+    return {name: globals()[name] for name in RATE_NAMES}
+
+
+def pick_failure(rates=None):
+    if rates is None:
+        rates = base_rates()
     r = random.random()
     # allocate by cumulative probabilities
     cum = 0
     for p, code, checkpoint in [
-        (p_schema_fail, "SCHEMA_INVALID_FIELD", "SAP_SCHEMA_VALIDATION"),
-        (p_po_mapping_fail, "PO_MAPPING_ERROR", "PO_MAPPING_OK"),
-        (p_fw_fail, "FIREWALL_DROP", "FW_EGRESS_ALLOWED"),
-        (p_tls_fail, "TLS_CERT_EXPIRED", "PO_SENT_HTTP"),
-        (p_other_transport_fail,
-         random.choice(["DNS_FAILURE", "HTTP_500", "HTTP_401", "HTTP_413", "CONNECTION_RESET", "PO_QUEUE_BACKLOG"]),
+        (rates["p_schema_fail"], "SCHEMA_INVALID_FIELD", "SAP_SCHEMA_VALIDATION"),
+        (rates["p_po_mapping_fail"], "PO_MAPPING_ERROR", "PO_MAPPING_OK"),
+        (rates["p_fw_fail"], "FIREWALL_DROP", "FW_EGRESS_ALLOWED"),
+        (rates["p_tls_fail"], "TLS_CERT_EXPIRED", "PO_SENT_HTTP"),
+        (rates["p_other_transport_fail"],
+         random.choice(other_transport_codes),
          None),
-        (p_transport_fail, "HTTP_504", "SCXCONNECT_HTTP_ACK"),
+        (rates["p_transport_fail"], "HTTP_504", "SCXCONNECT_HTTP_ACK"),
     ]:
         cum += p
         if r < cum:
@@ -126,12 +156,7 @@ def make_tech_events(flow):
             "sap_idoc": {"idoc_type": idoc_type, "number": idoc, "plant": plant},
             "message": {"direction": "OUTBOUND", "payload_hash": payload_hash, "schema": schema},
             "status": "FAIL", "reason_code": "SCHEMA_INVALID_FIELD",
-            "detail": random.choice([
-                "Element 'ShipToParty' missing",
-                "Invalid value for 'RequestedDeliveryDate'",
-                "Unexpected element 'BatchNumber'",
-                "Length exceeded for 'CustomerPO'"
-            ]),
+            "detail": flow.get("schema_detail") or random.choice(schema_details),
             "timestamps": {"event_utc": schema_time.isoformat().replace("+00:00", "Z")},
             "endpoint": {"system": "SAP", "host": "sap-prd-01"}
         })
@@ -201,7 +226,8 @@ def make_tech_events(flow):
         elif code == "CONNECTION_RESET":
             evt["detail"] = "connection reset by peer"
         elif code == "PO_QUEUE_BACKLOG":
-            evt["detail"] = f"adapter queue depth={random.randint(5000, 20000)}"
+            depth = flow.get("queue_depth") or random.randint(5000, 20000)
+            evt["detail"] = f"adapter queue depth={depth}"
         events.append(evt)
         return events
 
@@ -223,7 +249,7 @@ def make_tech_events(flow):
             "sap_idoc": {"idoc_type": idoc_type, "number": idoc, "plant": plant},
             "message": {"direction": "OUTBOUND", "payload_hash": payload_hash, "schema": schema},
             "status": "FAIL", "reason_code": "FIREWALL_DROP",
-            "detail": f"Denied by rule FW-OUT-{random.randint(200, 299)}",
+            "detail": f"Denied by rule FW-OUT-{flow.get('fw_rule') or random.randint(200, 299)}",
             "timestamps": {"event_utc": fw_time.isoformat().replace("+00:00", "Z")},
             "endpoint": {"system": "FIREWALL", "host": "fw-edge-01"}
         })
@@ -276,7 +302,7 @@ def make_tech_events(flow):
         "endpoint": {"system": "SCExpert/Connect", "host": "scxconnect-01"}
     })
     # WMS ingested (can be false-success later)
-    ingest_time = ack_time + timedelta(seconds=random.randint(1, 5))
+    ingest_time = ack_time + timedelta(seconds=flow.get("ingest_delay_sec") or random.randint(1, 5))
     ingest_status = "OK"
     ingest_reason = "INGESTED"
     if flow.get("false_success_ingest_fail"):
@@ -297,6 +323,7 @@ def make_tech_events(flow):
 def make_business_event(flow):
     cid = flow["correlation_id"]
     sent = flow["order_sent_utc"]
+    sent_iso = flow.get("order_sent_iso") or sent.isoformat().replace("+00:00", "Z")
     if not flow["transport_ok"]:
         # business event may still exist as "not sent" depending on where it failed
         return {
@@ -306,40 +333,47 @@ def make_business_event(flow):
             "sla": {"response_due_seconds": flow["sla_due_sec"], "actual_response_seconds": None, "breach": True},
             "status": "FAIL",
             "reason_code": "NOT_SENT_DUE_TECH_FAILURE",
-            "timestamps": {"order_sent_utc": sent.isoformat().replace("+00:00", "Z")}
+            "timestamps": {"order_sent_utc": sent_iso}
         }
     # Transport ok but maybe ingest fail or no response
     if flow.get("false_success_ingest_fail"):
+        late = flow.get("late_extra_sec") or random.randint(60, 600)
         return {
             "city": "Dream-City", "layer": "BUSINESS", "process": "ORDER_TO_WMS", "correlation_id": cid,
             "order": {"sap_order": flow["sap_order"], "items": flow["items"]},
             "wms_response": {"status": "NONE"},
             "sla": {"response_due_seconds": flow["sla_due_sec"],
-                    "actual_response_seconds": flow["sla_due_sec"] + random.randint(60, 600), "breach": True},
+                    "actual_response_seconds": flow["sla_due_sec"] + late,
+                    "breach": True},
             "status": "FAIL",
             "reason_code": "WMS_INGEST_FAILED_AFTER_HTTP_204",
-            "timestamps": {"order_sent_utc": sent.isoformat().replace("+00:00", "Z")}
+            "timestamps": {"order_sent_utc": sent_iso}
         }
     if flow["business_outcome"] == "NO_RESPONSE":
+        late = flow.get("late_extra_sec") or random.randint(1, 3600)
         return {
             "city": "Dream-City", "layer": "BUSINESS", "process": "ORDER_TO_WMS", "correlation_id": cid,
             "order": {"sap_order": flow["sap_order"], "items": flow["items"]},
             "wms_response": {"status": "NONE"},
             "sla": {"response_due_seconds": flow["sla_due_sec"],
-                    "actual_response_seconds": flow["sla_due_sec"] + random.randint(1, 3600), "breach": True},
+                    "actual_response_seconds": flow["sla_due_sec"] + late,
+                    "breach": True},
             "status": "FAIL", "reason_code": "NO_WMS_RESPONSE",
-            "timestamps": {"order_sent_utc": sent.isoformat().replace("+00:00", "Z")}
+            "timestamps": {"order_sent_utc": sent_iso}
         }
     # Otherwise WMS responded
-    responded = sent + timedelta(seconds=flow["business_resp_sec"])
+    responded_iso = flow.get("wms_responded_iso")
+    if not responded_iso:
+        responded = sent + timedelta(seconds=flow["business_resp_sec"])
+        responded_iso = responded.isoformat().replace("+00:00", "Z")
     breach = flow["business_resp_sec"] > flow["sla_due_sec"]
     base = {
         "city": "Dream-City", "layer": "BUSINESS", "process": "ORDER_TO_WMS", "correlation_id": cid,
         "order": {"sap_order": flow["sap_order"], "items": flow["items"]},
         "sla": {"response_due_seconds": flow["sla_due_sec"], "actual_response_seconds": flow["business_resp_sec"],
                 "breach": breach},
-        "timestamps": {"order_sent_utc": sent.isoformat().replace("+00:00", "Z"),
-                       "wms_responded_utc": responded.isoformat().replace("+00:00", "Z")}
+        "timestamps": {"order_sent_utc": sent_iso,
+                       "wms_responded_utc": responded_iso}
     }
     if flow["business_outcome"] == "OK":
         base["wms_response"] = {"status": "CONFIRMED", "items": flow["confirmed_items"]}
@@ -393,6 +427,9 @@ def make_rollup(flow, tech_last, biz_evt):
     elif biz_evt["sla"]["actual_response_seconds"] is not None and biz_evt["sla"]["actual_response_seconds"] > \
             biz_evt["sla"]["response_due_seconds"] * 0.8:
         sla_state = "AT_RISK"
+    sent_iso = flow.get("order_sent_iso")
+    if not sent_iso:
+        sent_iso = flow["order_sent_utc"].isoformat().replace("+00:00", "Z")
     return {
         "city": "Dream-City",
         "correlation_id": flow["correlation_id"],
@@ -403,164 +440,273 @@ def make_rollup(flow, tech_last, biz_evt):
                  "reason_code": tech_last.get("reason_code")},
         "business": {"health": biz_health, "status": biz_evt["status"], "reason_code": biz_evt.get("reason_code")},
         "sla": {"state": sla_state, **biz_evt["sla"]},
-        "timestamps": {"order_sent_utc": flow["order_sent_utc"].isoformat().replace("+00:00", "Z")}
+        "timestamps": {"order_sent_utc": sent_iso}
     }
 
 
-# Generate flows
-flows = []
-tech_events = []
-business_events = []
-rollups = []
-
-for i in range(1, n_flows + 1):
-    sent = rand_dt(start_utc, end_utc - timedelta(minutes=10))
-    cid = corr_id(i, sent)
-    idoc = idoc_number(i)
-    order = sap_order(i)
-    plant = random.choice(plants)
-    schema = random.choices(schemas, weights=[0.75, 0.15, 0.10])[0]
-    # items: 1-3 lines
-    n_items = random.choices([1, 2, 3], weights=[0.7, 0.25, 0.05])[0]
-    items = []
-    for _ in range(n_items):
-        sku = random.choice(skus)
-        qty = random.randint(1, 12)
-        item = {"sku": sku, "qty_requested": qty}
-        # sometimes include uom
-        if random.random() < 0.05:
-            item["uom"] = random.choice(["EA", "PCS"])
-        items.append(item)
-    payload_hash = make_hash(cid + json.dumps(items, sort_keys=True))
-    sla_due = random.choice([60, 120, 180])  # seconds
-
-    transport_failure, t_reason, t_checkpoint = pick_failure()
-    # add some HTTP-level failures when transport_failure but checkpoint is SCXCONNECT_HTTP_ACK
-    transport_ok = not transport_failure
-
-    transport_latency = random.randint(80, 450) / 100.0  # 0.8 to 4.5 sec
-
-    # chance of false-success: http 204 but WMS ingest fails (rare)
-    false_success = (transport_ok and random.random() < 0.0008)
-
-    flow = {
-        "correlation_id": cid,
-        "sap_idoc_number": idoc,
-        "sap_order": order,
-        "plant": plant,
-        "schema": schema,
-        "items": items,
-        "payload_hash": payload_hash[:16],
-        "sla_due_sec": sla_due,
-        "order_sent_utc": sent,
-        "transport_failure": transport_failure,
-        "transport_reason": t_reason,
-        "transport_checkpoint": t_checkpoint,
-        "transport_latency_sec": int(transport_latency * 1000) // 1000,  # int-ish seconds for logs
-        "transport_ok": transport_ok,
-        "false_success_ingest_fail": false_success
-    }
-    # Determine business outcome
-    if not transport_ok:
-        flow["business_outcome"] = "NOT_SENT"
-    else:
-        r = random.random()
-        outcome = "OK"
-        if r < p_no_response:
-            outcome = "NO_RESPONSE"
-        elif r < p_no_response + p_uom_mismatch:
-            outcome = "UOM_MISMATCH"
-        elif r < p_no_response + p_uom_mismatch + p_confirm_gt_req:
-            outcome = "CONFIRMED_GT"
-        elif r < p_no_response + p_uom_mismatch + p_confirm_gt_req + p_reject:
-            outcome = "REJECT"
-        elif r < p_no_response + p_uom_mismatch + p_confirm_gt_req + p_reject + p_partial:
-            outcome = "PARTIAL"
+def generate_flows(n=n_flows, start=start_utc, end=end_utc, seed=42, profile=None):
+    """
+    Generate n synthetic flows with their tech events, business event and rollup.
+    profile (scenarios.ScenarioProfile) shapes send times, rates and outages over the window.
+    Returns (flows, tech_events, business_events, rollups).
+    """
+    random.seed(seed)
+    rates = base_rates()
+    flows = []
+    tech_events = []
+    business_events = []
+    rollups = []
+
+    for i in range(1, n + 1):
+        if profile is None:
+            sent = rand_dt(start, end - timedelta(minutes=10))
         else:
-            outcome = "OK"
-        # response time
-        if outcome == "NO_RESPONSE":
-            flow["business_resp_sec"] = None
+            sent = profile.rand_send()
+            rates = profile.rates_at(profile.offset_of(sent))
+        cid = corr_id(i, sent)
+        idoc = idoc_number(i)
+        order = sap_order(i)
+        plant = random.choice(plants)
+        schema = random.choices(schemas, weights=[0.75, 0.15, 0.10])[0]
+        # items: 1-3 lines
+        n_items = random.choices([1, 2, 3], weights=[0.7, 0.25, 0.05])[0]
+        items = []
+        for _ in range(n_items):
+            sku = random.choice(skus)
+            qty = random.randint(1, 12)
+            item = {"sku": sku, "qty_requested": qty}
+            # sometimes include uom
+            if random.random() < 0.05:
+                item["uom"] = random.choice(["EA", "PCS"])
+            items.append(item)
+        payload_hash = make_hash(cid + json.dumps(items, sort_keys=True))
+        sla_due = random.choice([60, 120, 180])  # seconds
+
+        transport_failure, t_reason, t_checkpoint = pick_failure(rates)
+        outage = profile.outage_at(profile.offset_of(sent), plant) if profile is not None else None
+        if outage:
+            transport_failure = True
+            t_reason, t_checkpoint = outage
+        # add some HTTP-level failures when transport_failure but checkpoint is SCXCONNECT_HTTP_ACK
+        transport_ok = not transport_failure
+
+        transport_latency = random.randint(80, 450) / 100.0  # 0.8 to 4.5 sec
+
+        # chance of false-success: http 204 but WMS ingest fails (rare)
+        false_success = (transport_ok and random.random() < 0.0008)
+
+        flow = {
+            "correlation_id": cid,
+            "sap_idoc_number": idoc,
+            "sap_order": order,
+            "plant": plant,
+            "schema": schema,
+            "items": items,
+            "payload_hash": payload_hash[:16],
+            "sla_due_sec": sla_due,
+            "order_sent_utc": sent,
+            "transport_failure": transport_failure,
+            "transport_reason": t_reason,
+            "transport_checkpoint": t_checkpoint,
+            # int-ish seconds for logs
+            "transport_latency_sec": int(transport_latency * 1000) // 1000,
+            "transport_ok": transport_ok,
+            "false_success_ingest_fail": false_success
+        }
+        # Determine business outcome
+        if not transport_ok:
+            flow["business_outcome"] = "NOT_SENT"
         else:
-            # base response within SLA often, but allow late outcomes too
-            if random.random() < p_late:
-                flow["business_resp_sec"] = sla_due + random.randint(10, 240)
+            r = random.random()
+            outcome = "OK"
+            p_nr, p_uom, p_gt, p_rej, p_part = (
+                rates["p_no_response"], rates["p_uom_mismatch"], rates["p_confirm_gt_req"],
+                rates["p_reject"], rates["p_partial"],
+            )
+            if r < p_nr:
+                outcome = "NO_RESPONSE"
+            elif r < p_nr + p_uom:
+                outcome = "UOM_MISMATCH"
+            elif r < p_nr + p_uom + p_gt:
+                outcome = "CONFIRMED_GT"
+            elif r < p_nr + p_uom + p_gt + p_rej:
+                outcome = "REJECT"
+            elif r < p_nr + p_uom + p_gt + p_rej + p_part:
+                outcome = "PARTIAL"
             else:
-                flow["business_resp_sec"] = random.randint(5, max(10, sla_due - 5))
-        flow["business_outcome"] = outcome
-
-    # Confirmed items / reject details
-    confirmed_items = []
-    if flow["transport_ok"] and not flow.get("false_success_ingest_fail") and flow["business_outcome"] not in [
-        "NO_RESPONSE"]:
-        for it in items:
-            req = it["qty_requested"]
-            if flow["business_outcome"] == "PARTIAL":
-                conf = max(0, req - random.randint(1, req))  # ensure less or equal
-                if conf == req: conf = max(0, req - 1)
-            elif flow["business_outcome"] == "CONFIRMED_GT":
-                conf = req + random.randint(1, 3)
-            elif flow["business_outcome"] == "REJECT":
-                conf = 0
-            elif flow["business_outcome"] == "UOM_MISMATCH":
-                conf = 0
+                outcome = "OK"
+            # response time
+            if outcome == "NO_RESPONSE":
+                flow["business_resp_sec"] = None
             else:
-                conf = req
-            ci = {"sku": it["sku"], "qty_confirmed": conf}
-            if "uom" in it:
-                ci["uom"] = it["uom"]
-            confirmed_items.append(ci)
-    flow["confirmed_items"] = confirmed_items
-
-    if flow["business_outcome"] == "REJECT":
-        flow["reject_code"], flow["reject_detail"] = random.choice([
-            ("SKU_UNKNOWN", "Unknown SKU"),
-            ("BLOCKED_SHIP_TO", "Invalid ship-to / blocked customer"),
-            ("VALIDATION_ERROR", "Mandatory field missing in order"),
-        ])
-    elif flow["business_outcome"] == "UOM_MISMATCH":
-        flow["reject_code"], flow["reject_detail"] = ("UOM_MISMATCH", "UoM mismatch EA vs PCS")
-
-    # Generate events
-    tevents = make_tech_events(flow)
-    flow["tech_events"] = tevents
-    tech_events.extend(tevents)
-
-    bevt = make_business_event(flow)
-    business_events.append(bevt)
-
-    tech_last = tevents[-1]
-    rollups.append(make_rollup(flow, tech_last, bevt))
-    flows.append(flow)
-
-# Output files for mongoimport
-out_dir = "/mnt/data"
-tech_path = os.path.join(out_dir, "dream_city_tech_events.jsonl")
-biz_path = os.path.join(out_dir, "dream_city_business_events.jsonl")
-rollup_path = os.path.join(out_dir, "dream_city_rollup_flows.jsonl")
+                # base response within SLA often, but allow late outcomes too
+                if random.random() < rates["p_late"]:
+                    flow["business_resp_sec"] = sla_due + random.randint(10, 240)
+                else:
+                    flow["business_resp_sec"] = random.randint(5, max(10, sla_due - 5))
+            flow["business_outcome"] = outcome
+
+        # Confirmed items / reject details
+        confirmed_items = []
+        answered = flow["business_outcome"] not in ["NO_RESPONSE"]
+        if flow["transport_ok"] and not flow.get("false_success_ingest_fail") and answered:
+            for it in items:
+                req = it["qty_requested"]
+                if flow["business_outcome"] == "PARTIAL":
+                    conf = max(0, req - random.randint(1, req))  # ensure less or equal
+                    if conf == req: conf = max(0, req - 1)
+                elif flow["business_outcome"] == "CONFIRMED_GT":
+                    conf = req + random.randint(1, 3)
+                elif flow["business_outcome"] == "REJECT":
+                    conf = 0
+                elif flow["business_outcome"] == "UOM_MISMATCH":
+                    conf = 0
+                else:
+                    conf = req
+                ci = {"sku": it["sku"], "qty_confirmed": conf}
+                if "uom" in it:
+                    ci["uom"] = it["uom"]
+                confirmed_items.append(ci)
+        flow["confirmed_items"] = confirmed_items
+
+        if flow["business_outcome"] == "REJECT":
+            flow["reject_code"], flow["reject_detail"] = random.choice(reject_reasons)
+        elif flow["business_outcome"] == "UOM_MISMATCH":
+            flow["reject_code"], flow["reject_detail"] = ("UOM_MISMATCH", "UoM mismatch EA vs PCS")
+
+        # Generate events
+        tevents = make_tech_events(flow)
+        flow["tech_events"] = tevents
+        tech_events.extend(tevents)
+
+        bevt = make_business_event(flow)
+        business_events.append(bevt)
+
+        tech_last = tevents[-1]
+        rollups.append(make_rollup(flow, tech_last, bevt))
+        flows.append(flow)
+
+    return flows, tech_events, business_events, rollups
+
+
+def _parse_utc(value):
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
 
 
 def write_jsonl(path, records):
-    with open(path, "w", encoding="utf-8") as f:
-        for r in records:
-            # Ensure Mongo friendly: ISO strings already, no datetime objects
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
-
-
-write_jsonl(tech_path, tech_events)
-write_jsonl(biz_path, business_events)
-write_jsonl(rollup_path, rollups)
-
-# Also provide JSON array variants
-tech_array_path = os.path.join(out_dir, "dream_city_tech_events.array.json")
-biz_array_path = os.path.join(out_dir, "dream_city_business_events.array.json")
-rollup_array_path = os.path.join(out_dir, "dream_city_rollup_flows.array.json")
-
-with open(tech_array_path, "w", encoding="utf-8") as f:
-    json.dump(tech_events, f, ensure_ascii=False)
-with open(biz_array_path, "w", encoding="utf-8") as f:
-    json.dump(business_events, f, ensure_ascii=False)
-with open(rollup_array_path, "w", encoding="utf-8") as f:
-    json.dump(rollups, f, ensure_ascii=False)
-
-(len(flows), len(tech_events), len(business_events), len(rollups), tech_path, biz_path, rollup_path)
\ No newline at end of file
+    # .gz / .zst paths are compressed on the fly
+    dataset_writers.write_jsonl(path, records)
+
+
+def main(
+    out_dir="/mnt/data",
+    n=n_flows,
+    backend="python",
+    seed=42,
+    compression="none",
+    parquet=False,
+    arrays=True,
+    profile=None,
+    start=start_utc,
+    end=end_utc,
+):
+    if isinstance(profile, str):
+        from scenarios import load_profile
+        profile = load_profile(profile, start, end)
+
+    if backend == "numpy":
+        from data_manufacturing_np import generate_flows_np
+        generate = generate_flows_np
+    else:
+        generate = generate_flows
+    flows, tech_events, business_events, rollups = generate(
+        n, start, end, seed=seed, profile=profile,
+    )
+
+    datasets = [
+        ("tech_events", tech_events),
+        ("business_events", business_events),
+        ("rollup_flows", rollups),
+    ]
+
+    # Output files for mongoimport (mongoimport reads .gz from stdin: `gunzip -c ... | mongoimport`)
+    jsonl_paths = []
+    for name, records in datasets:
+        path = dataset_writers.jsonl_path(
+            os.path.join(out_dir, f"dream_city_{name}.jsonl"), compression,
+        )
+        write_jsonl(path, records)
+        jsonl_paths.append(path)
+
+    # Columnar copies for analytics tools
+    if parquet:
+        for name, records in datasets:
+            dataset_writers.write_parquet(
+                os.path.join(out_dir, f"dream_city_{name}.parquet"),
+                records,
+                dataset_writers.COLUMNS_BY_DATASET[name],
+            )
+
+    # Also provide JSON array variants
+    if arrays:
+        for name, records in datasets:
+            path = os.path.join(out_dir, f"dream_city_{name}.array.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(records, f, ensure_ascii=False)
+
+    tech_path, biz_path, rollup_path = jsonl_paths
+    return (
+        len(flows), len(tech_events), len(business_events), len(rollups),
+        tech_path, biz_path, rollup_path,
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Generate the Dream-City synthetic SAP->WMS dataset.")
+    ap.add_argument("--out-dir", default="/mnt/data")
+    ap.add_argument("--n-flows", type=int, default=n_flows)
+    ap.add_argument("--backend", choices=["python", "numpy"], default="python",
+                    help="numpy draws all per-flow values in bulk (~4x faster generation, "
+                         "~1.5x end to end; different random stream)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--compression", choices=dataset_writers.COMPRESSIONS, default="none",
+                    help="compress the JSONL files (.gz / .zst suffix is appended)")
+    ap.add_argument("--parquet", action="store_true",
+                    help="also write flattened Parquet files (needs pyarrow)")
+    ap.add_argument("--no-arrays", dest="arrays", action="store_false",
+                    help="skip the .array.json variants "
+                         "(they hold the whole dataset in one JSON document)")
+    ap.add_argument("--profile", default=None,
+                    help="scenario profile: built-in name (see --list-profiles) or a JSON file")
+    ap.add_argument("--start", type=_parse_utc, default=start_utc,
+                    help="window start, ISO UTC (2025-12-09T00:00:00Z)")
+    ap.add_argument("--end", type=_parse_utc, default=None, help="window end, ISO UTC")
+    ap.add_argument("--days", type=float, default=None,
+                    help="window length from --start (instead of --end)")
+    ap.add_argument("--list-profiles", action="store_true")
+    args = ap.parse_args()
+
+    if args.list_profiles:
+        from scenarios import PROFILES
+        for name, spec in PROFILES.items():
+            print(f"{name:<14} {spec.get('description', '')}")
+        raise SystemExit(0)
+
+    end = args.end or (args.start + timedelta(days=args.days) if args.days else end_utc)
+    if end - args.start <= timedelta(minutes=10):
+        ap.error("the window must be longer than 10 minutes")
+    profile = None
+    if args.profile:
+        from scenarios import load_profile
+        try:
+            profile = load_profile(args.profile, args.start, end)
+        except ValueError as exc:
+            ap.error(str(exc))
+        print(profile.summary())
+    print(main(
+        args.out_dir, args.n_flows, args.backend, args.seed, args.compression, args.parquet,
+        args.arrays, profile, args.start, end,
+    ))
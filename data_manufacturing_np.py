@@ -0,0 +1,401 @@
+"""
+Vectorized NumPy backend for data_manufacturing.
+
+Every per-flow random attribute (send time, plant, schema, items, SLA budget,
+transport failure, latency, business outcome, response time, reject reason and
+the small detail values) is drawn in bulk from a numpy Generator, using the same
+probability constants as data_manufacturing. Timestamps are rendered to ISO
+strings in bulk as well. Python is only used to assemble the final records;
+the common all-OK checkpoint chain has its own formatter and the rare failure
+paths reuse data_manufacturing.make_tech_events.
+
+Streams differ from the `random`-based generator (different RNG), distributions
+do not.
+
+Speed: generating 100k flows takes about 3.8 s instead of 16.6 s (~4x), not an
+order of magnitude. What remains is building the ~1M result dicts, which costs
+about the same whether they are built column-wise or per flow. Writing the files (json.dumps) is
+shared by both backends, so `main(..., arrays=False)` end to end is only about
+1.5x faster (17.8 s vs 26.9 s).
+"""
+import functools
+import gc
+import hashlib
+from datetime import timedelta
+
+import numpy as np
+
+import data_manufacturing as dm
+
+ROUTE = "SAP->PO->FW->SCXConnect->WMS"
+
+# transport failure categories, in pick_failure() order; the last one is "no failure"
+_FAIL_PROBS = [
+    dm.p_schema_fail,
+    dm.p_po_mapping_fail,
+    dm.p_fw_fail,
+    dm.p_tls_fail,
+    dm.p_other_transport_fail,
+    dm.p_transport_fail,
+]
+_FAIL_RATES = [
+    "p_schema_fail",
+    "p_po_mapping_fail",
+    "p_fw_fail",
+    "p_tls_fail",
+    "p_other_transport_fail",
+    "p_transport_fail",
+]
+_FAIL_FIXED = [
+    ("SCHEMA_INVALID_FIELD", "SAP_SCHEMA_VALIDATION"),
+    ("PO_MAPPING_ERROR", "PO_MAPPING_OK"),
+    ("FIREWALL_DROP", "FW_EGRESS_ALLOWED"),
+    ("TLS_CERT_EXPIRED", "PO_SENT_HTTP"),
+    None,  # one of dm.other_transport_codes
+    ("HTTP_504", "SCXCONNECT_HTTP_ACK"),
+]
+_REASON_CHECKPOINT = dict(dm.reason_transport)
+_PO_SIDE_CODES = ("DNS_FAILURE", "CONNECTION_RESET", "PO_QUEUE_BACKLOG", "TLS_CERT_EXPIRED")
+
+# business outcomes (conditional on transport OK), same cumulative order as data_manufacturing
+_OUTCOME_PROBS = [
+    dm.p_no_response,
+    dm.p_uom_mismatch,
+    dm.p_confirm_gt_req,
+    dm.p_reject,
+    dm.p_partial,
+]
+_OUTCOME_RATES = ["p_no_response", "p_uom_mismatch", "p_confirm_gt_req", "p_reject", "p_partial"]
+_OUTCOMES = ["NO_RESPONSE", "UOM_MISMATCH", "CONFIRMED_GT", "REJECT", "PARTIAL", "OK"]
+
+# (checkpoint, reason_code, seconds after order_sent_utc, system, host) for the all-OK chain
+_OK_CHAIN = [
+    ("SAP_IDOC_CREATED", "CREATED", 1, "SAP", "sap-prd-01"),
+    ("SAP_SCHEMA_VALIDATION", "SCHEMA_OK", 2, "SAP", "sap-prd-01"),
+    ("SAP_PO_RECEIVED", "RECEIVED_BY_PO", 5, "SAP/PO", "po-prd-01"),
+    ("PO_MAPPING_OK", "MAPPING_OK", 8, "SAP/PO", "po-prd-01"),
+    ("PO_SENT_HTTP", "HTTP_SENT", 12, "SAP/PO", "po-prd-01"),
+    ("FW_EGRESS_ALLOWED", "ALLOWED", 13, "FIREWALL", "fw-edge-01"),
+    ("SCXCONNECT_RECEIVED", "RECEIVED", 15, "SCExpert/Connect", "scxconnect-01"),
+]
+
+
+def _iso(epoch_seconds):
+    """
+    int64 epoch seconds -> list of "YYYY-MM-DDTHH:MM:SSZ"
+    (same text as isoformat().replace("+00:00", "Z")).
+    """
+    text = np.datetime_as_string(epoch_seconds.astype("datetime64[s]"), unit="s")
+    return (text.astype(object) + "Z").tolist()
+
+
+def _event_template(checkpoint, status, reason, system, host, with_http=False):
+    """
+    Tech event with the per-flow fields left as None, in make_tech_events key order.
+    """
+    t = {
+        "city": "Dream-City", "layer": "TECH", "route": ROUTE, "checkpoint": checkpoint,
+        "correlation_id": None,
+        "sap_idoc": None,
+        "message": None,
+        "status": status, "reason_code": reason,
+    }
+    if with_http:
+        t["http"] = None
+    t["timestamps"] = None
+    t["endpoint"] = {"system": system, "host": host}
+    return t
+
+
+_OK_TEMPLATES = [
+    _event_template(cp, "OK", reason, system, host) for cp, reason, _, system, host in _OK_CHAIN
+]
+_ACK_TEMPLATE = _event_template(
+    "SCXCONNECT_HTTP_ACK", "OK", "HTTP_204", "SCExpert/Connect", "scxconnect-01", True,
+)
+_INGEST_OK_TEMPLATE = _event_template("WMS_INGESTED", "OK", "INGESTED", "SCExpert/WMS", "wms-01")
+_INGEST_FAIL_TEMPLATE = _event_template(
+    "WMS_INGESTED", "FAIL", "WMS_INGEST_FAILED", "SCExpert/WMS", "wms-01",
+)
+
+
+def _ok_tech_events(
+    cid, sap_idoc, message, iso_steps, i, ack_iso, latency_sec, ingest_iso, ingest_failed,
+):
+    """
+    The all-OK checkpoint chain. Events of one flow share their sap_idoc / message
+    dicts and all events share the endpoint dicts; the records are only serialized.
+    """
+    events = []
+    for k, tmpl in enumerate(_OK_TEMPLATES):
+        e = tmpl.copy()
+        e["correlation_id"] = cid
+        e["sap_idoc"] = sap_idoc
+        e["message"] = message
+        e["timestamps"] = {"event_utc": iso_steps[k][i]}
+        events.append(e)
+
+    e = _ACK_TEMPLATE.copy()
+    e["correlation_id"] = cid
+    e["sap_idoc"] = sap_idoc
+    e["message"] = message
+    e["http"] = {"status_code": 204, "latency_ms": latency_sec * 1000}
+    e["timestamps"] = {"event_utc": ack_iso}
+    events.append(e)
+
+    e = (_INGEST_FAIL_TEMPLATE if ingest_failed else _INGEST_OK_TEMPLATE).copy()
+    e["correlation_id"] = cid
+    e["sap_idoc"] = sap_idoc
+    e["message"] = message
+    e["timestamps"] = {"event_utc": ingest_iso}
+    events.append(e)
+    return events
+
+
+def _items_json(items):
+    """
+    json.dumps(items, sort_keys=True) for the generated item shape (sku strings need no escaping).
+    """
+    parts = []
+    for it in items:
+        if "uom" in it:
+            parts.append(
+                f'{{"qty_requested": {it["qty_requested"]}, "sku": "{it["sku"]}", '
+                f'"uom": "{it["uom"]}"}}'
+            )
+        else:
+            parts.append(f'{{"qty_requested": {it["qty_requested"]}, "sku": "{it["sku"]}"}}')
+    return "[" + ", ".join(parts) + "]"
+
+
+def _pick_per_flow(prob_arrays, u):
+    """
+    Category per flow from per-flow probabilities (same cumulative rule as searchsorted on
+    scalar probabilities); len(prob_arrays) means "none of them".
+    """
+    cum = np.cumsum(np.stack(prob_arrays, axis=1), axis=1)
+    return (cum <= u[:, None]).sum(axis=1)
+
+
+def _without_gc(fn):
+    """
+    The generator builds millions of small acyclic dicts; the cyclic GC would only rescan them.
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if was_enabled:
+                gc.enable()
+    return wrapper
+
+
+@_without_gc
+def generate_flows_np(n=dm.n_flows, start=dm.start_utc, end=dm.end_utc, seed=42, profile=None):
+    """
+    Same contract as data_manufacturing.generate_flows:
+    (flows, tech_events, business_events, rollups).
+    With a scenarios.ScenarioProfile the rates become per-flow arrays evaluated at each send time.
+    """
+    rng = np.random.default_rng(seed)
+    span = int((end - timedelta(minutes=10) - start).total_seconds())
+    start_epoch = int(start.timestamp())
+
+    # ---- per-flow draws ------------------------------------------------
+    sent_off = rng.integers(0, span + 1, n) if profile is None else profile.send_offsets_np(rng, n)
+    plant_idx = rng.integers(0, len(dm.plants), n)
+    schema_idx = rng.choice(len(dm.schemas), n, p=[0.75, 0.15, 0.10])
+    n_items = rng.choice([1, 2, 3], n, p=[0.7, 0.25, 0.05])
+    sla_due = rng.choice([60, 120, 180], n)
+
+    if profile is None:
+        fail_cat = np.searchsorted(np.cumsum(_FAIL_PROBS), rng.random(n), side="right")
+        outage = None
+    else:
+        rates = profile.rate_arrays_np(sent_off)
+        fail_cat = _pick_per_flow([rates[k] for k in _FAIL_RATES], rng.random(n))
+        outage = profile.outages_np(rng, sent_off, plant_idx)
+    other_idx = rng.integers(0, len(dm.other_transport_codes), n)
+    transport_ok = fail_cat == len(_FAIL_PROBS)
+    if outage is not None:
+        transport_ok &= np.array([r is None for r in outage], dtype=bool)
+    latency_sec = rng.integers(80, 451, n) // 100  # int(x/100 * 1000) // 1000
+    false_success = transport_ok & (rng.random(n) < 0.0008)
+
+    if profile is None:
+        outcome_idx = np.searchsorted(np.cumsum(_OUTCOME_PROBS), rng.random(n), side="right")
+        late = rng.random(n) < dm.p_late
+    else:
+        outcome_idx = _pick_per_flow([rates[k] for k in _OUTCOME_RATES], rng.random(n))
+        late = rng.random(n) < rates["p_late"]
+    late_resp = sla_due + rng.integers(10, 241, n)
+    ok_resp = rng.integers(5, np.maximum(10, sla_due - 5) + 1)
+    resp_sec = np.where(late, late_resp, ok_resp)
+    reject_idx = rng.integers(0, len(dm.reject_reasons), n)
+
+    schema_detail_idx = rng.integers(0, len(dm.schema_details), n)
+    fw_rule = rng.integers(200, 300, n)
+    queue_depth = rng.integers(5000, 20001, n)
+    ingest_delay = rng.integers(1, 6, n)
+    late_extra = np.where(false_success, rng.integers(60, 601, n), rng.integers(1, 3601, n))
+
+    # ---- per-item draws ------------------------------------------------
+    total_items = int(n_items.sum())
+    item_end = np.cumsum(n_items).tolist()
+    sku_idx = rng.integers(0, len(dm.skus), total_items).tolist()
+    qty = rng.integers(1, 13, total_items)
+    has_uom = (rng.random(total_items) < 0.05).tolist()
+    uom_idx = rng.integers(0, 2, total_items).tolist()
+    partial_conf = np.maximum(0, qty - rng.integers(1, qty + 1)).tolist()
+    gt_conf = (qty + rng.integers(1, 4, total_items)).tolist()
+    qty = qty.tolist()
+
+    # ---- timestamps, rendered in bulk ---------------------------------
+    sent_epoch = start_epoch + sent_off
+    sent_iso = _iso(sent_epoch)
+    iso_steps = [_iso(sent_epoch + step[2]) for step in _OK_CHAIN]
+    ack_epoch = sent_epoch + 15 + latency_sec
+    ack_iso = _iso(ack_epoch)
+    ingest_iso = _iso(ack_epoch + ingest_delay)
+    responded_iso = _iso(sent_epoch + resp_sec)
+
+    # ---- python lists for the formatting loop --------------------------
+    sent_off = sent_off.tolist()
+    plant_idx = plant_idx.tolist()
+    schema_idx = schema_idx.tolist()
+    sla_due = sla_due.tolist()
+    fail_cat = fail_cat.tolist()
+    other_idx = other_idx.tolist()
+    transport_ok = transport_ok.tolist()
+    latency_sec = latency_sec.tolist()
+    false_success = false_success.tolist()
+    outcome_idx = outcome_idx.tolist()
+    resp_sec = resp_sec.tolist()
+    reject_idx = reject_idx.tolist()
+    schema_detail_idx = schema_detail_idx.tolist()
+    fw_rule = fw_rule.tolist()
+    queue_depth = queue_depth.tolist()
+    late_extra = late_extra.tolist()
+    ingest_delay = ingest_delay.tolist()
+
+    flows = []
+    tech_events = []
+    business_events = []
+    rollups = []
+
+    item_start = 0
+    for k in range(n):
+        i = k + 1
+        sent = start + timedelta(seconds=sent_off[k])
+        cid = f"DC-{sent_iso[k][:10].replace('-', '')}-{i:06d}"
+        plant = dm.plants[plant_idx[k]]
+        schema = dm.schemas[schema_idx[k]]
+
+        items = []
+        for j in range(item_start, item_end[k]):
+            item = {"sku": dm.skus[sku_idx[j]], "qty_requested": qty[j]}
+            if has_uom[j]:
+                item["uom"] = ("EA", "PCS")[uom_idx[j]]
+            items.append(item)
+
+        cat = fail_cat[k]
+        t_ok = transport_ok[k]
+        if t_ok:
+            t_reason = t_checkpoint = None
+        elif outage is not None and outage[k] is not None:
+            t_reason = outage[k]
+            t_checkpoint = _REASON_CHECKPOINT[t_reason]
+        elif _FAIL_FIXED[cat] is None:
+            t_reason = dm.other_transport_codes[other_idx[k]]
+            t_checkpoint = "PO_SENT_HTTP" if t_reason in _PO_SIDE_CODES else "SCXCONNECT_HTTP_ACK"
+        else:
+            t_reason, t_checkpoint = _FAIL_FIXED[cat]
+
+        flow = {
+            "correlation_id": cid,
+            "sap_idoc_number": dm.idoc_number(i),
+            "sap_order": dm.sap_order(i),
+            "plant": plant,
+            "schema": schema,
+            "items": items,
+            "payload_hash": hashlib.sha256(
+                (cid + _items_json(items)).encode("utf-8")
+            ).hexdigest()[:16],
+            "sla_due_sec": sla_due[k],
+            "order_sent_utc": sent,
+            "transport_failure": not t_ok,
+            "transport_reason": t_reason,
+            "transport_checkpoint": t_checkpoint,
+            "transport_latency_sec": latency_sec[k],
+            "transport_ok": t_ok,
+            "false_success_ingest_fail": false_success[k],
+            # pre-drawn detail values, picked up by make_tech_events / make_business_event
+            "schema_detail": dm.schema_details[schema_detail_idx[k]],
+            "fw_rule": fw_rule[k],
+            "queue_depth": queue_depth[k],
+            "ingest_delay_sec": ingest_delay[k],
+            "late_extra_sec": late_extra[k],
+            "order_sent_iso": sent_iso[k],
+            "wms_responded_iso": responded_iso[k],
+        }
+
+        if not t_ok:
+            flow["business_outcome"] = "NOT_SENT"
+        else:
+            outcome = _OUTCOMES[outcome_idx[k]]
+            flow["business_resp_sec"] = None if outcome == "NO_RESPONSE" else resp_sec[k]
+            flow["business_outcome"] = outcome
+
+        outcome = flow["business_outcome"]
+        confirmed_items = []
+        if t_ok and not false_success[k] and outcome != "NO_RESPONSE":
+            for j in range(item_start, item_end[k]):
+                if outcome == "PARTIAL":
+                    conf = partial_conf[j]
+                elif outcome == "CONFIRMED_GT":
+                    conf = gt_conf[j]
+                elif outcome in ("REJECT", "UOM_MISMATCH"):
+                    conf = 0
+                else:
+                    conf = qty[j]
+                ci = {"sku": dm.skus[sku_idx[j]], "qty_confirmed": conf}
+                if has_uom[j]:
+                    ci["uom"] = ("EA", "PCS")[uom_idx[j]]
+                confirmed_items.append(ci)
+        flow["confirmed_items"] = confirmed_items
+        item_start = item_end[k]
+
+        if outcome == "REJECT":
+            flow["reject_code"], flow["reject_detail"] = dm.reject_reasons[reject_idx[k]]
+        elif outcome == "UOM_MISMATCH":
+            flow["reject_code"], flow["reject_detail"] = ("UOM_MISMATCH", "UoM mismatch EA vs PCS")
+
+        if t_ok:
+            sap_idoc = {
+                "idoc_type": dm.idoc_type,
+                "number": flow["sap_idoc_number"],
+                "plant": plant,
+            }
+            message = {
+                "direction": "OUTBOUND",
+                "payload_hash": flow["payload_hash"],
+                "schema": schema,
+            }
+            tevents = _ok_tech_events(
+                cid, sap_idoc, message, iso_steps, k, ack_iso[k], latency_sec[k], ingest_iso[k],
+                false_success[k],
+            )
+        else:
+            tevents = dm.make_tech_events(flow)
+        flow["tech_events"] = tevents
+        tech_events.extend(tevents)
+
+        bevt = dm.make_business_event(flow)
+        business_events.append(bevt)
+        rollups.append(dm.make_rollup(flow, tevents[-1], bevt))
+        flows.append(flow)
+
+    return flows, tech_events, business_events, rollups
@@ -1,8 +1,27 @@
 from __future__ import annotations
 
-from typing import Dict, List, Any
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Any, Iterator, Optional, Tuple
 
+import pymongo
 from pymongo import MongoClient
+from pymongo.database import Database
+from pymongo.errors import PyMongoError
+
+from partitions import day_of, newest_time, route, route_flow
+from scheduler import SCHEDULER
+from sla_tracker import SlaDeadlineTracker, SLA_STATES, parse_utc
+from snapshot import (
+    SNAPSHOT_ENV, SNAPSHOT_FILE, Snapshot, SnapshotIndex, SnapshotRecords, write_snapshot,
+)
+from storage import SqliteStorage
 
 # ------------------------------------------------------------
 # Mongo configuration
@@ -10,17 +29,309 @@ from pymongo import MongoClient
 MONGO_URI = "mongodb://localhost:27017"
 DB_NAME = "SAP_Monitor"
 COLLECTION_NAME = "rollup_flows"
+TECH_EVENTS_COLLECTION = "tech_events"
+BUSINESS_EVENTS_COLLECTION = "business_events"
 LIMIT = 10000
+NOT_DELETED = {"deleted": {"$ne": True}}  # rollups a DELETE action flagged stay stored, unshown
+ROLLUP_WINDOW_DAYS = 14  # load the newest LIMIT rollups of the last N days of data
+# ingest writes to <collection>_YYYYMMDD (see partitions.py / retention.py)
+PARTITION_BY_DAY = False
+
+# Field each collection is partitioned / windowed by
+TIME_FIELDS = {
+    COLLECTION_NAME           : "timestamps.order_sent_utc",
+    TECH_EVENTS_COLLECTION    : "timestamps.event_utc",
+    BUSINESS_EVENTS_COLLECTION: "timestamps.order_sent_utc",
+}
+ROLLUP_REFRESH_SEC = 60  # background reload of the rollups (0 disables)
+ROLLUP_REFRESH_JITTER = 0.2  # up to 20% of the interval added at random to every wait
+ROLLUP_BATCH_SIZE = 2000  # cursor batch size; the loader publishes records once per batch
+ROLLUP_BACKGROUND_LOAD = True  # first load on a thread, tiles fill in while it runs
+CITIES: List[str] = []  # one shard per city; empty = every city found in the rollup window
+DEFAULT_CITY = "Dream-City"  # rollups without a city field
+LOAD_WORKERS = 4  # city shards loaded concurrently
+
+# Where rollups / events are read from (see storage.py): "mongo", or "sqlite" for an
+# indexed SQLite file built from the data_manufacturing.py JSONL files in SQLITE_DATA_DIR
+STORAGE_BACKEND = "mongo"
+SQLITE_DATA_DIR = "/mnt/data"
+SQLITE_PATH = os.path.join(SQLITE_DATA_DIR, "sap_monitor.sqlite")
+
+# Records shared between server workers through one mmap'd file (see snapshot.py):
+# SAP_MONITOR_SNAPSHOT=publish in the one process that loads from storage, =map in the workers
+SNAPSHOT_MODE = os.environ.get(SNAPSHOT_ENV, "off")
+SNAPSHOT_PATH = SNAPSHOT_FILE
+SNAPSHOT_POLL_SEC = 5  # map mode: how often the workers look for a newer file
+
+# Bulk load: only what FlowRecord.from_doc and SlaDeadlineTracker.load_rollups read.
+# order.items, route, sap_idoc.idoc_type, ... stay in Mongo; the detail page fetches
+# the full documents by correlation_id.
+ROLLUP_PROJECTION: Dict[str, int] = {
+    "_id"                        : 0,
+    "correlation_id"             : 1,
+    "city"                       : 1,
+    "order.sap_order"            : 1,
+    "sap_idoc.number"            : 1,
+    "sap_idoc.plant"             : 1,
+    "tech.health"                : 1,
+    "tech.last_checkpoint"       : 1,
+    "tech.last_status"           : 1,
+    "tech.reason_code"           : 1,
+    "business.health"            : 1,
+    "business.status"            : 1,
+    "business.reason_code"       : 1,
+    "sla.state"                  : 1,
+    "sla.response_due_seconds"   : 1,
+    "sla.actual_response_seconds": 1,
+    "sla.breach"                 : 1,
+    "timestamps.order_sent_utc"  : 1,
+}
+
+_CLIENT: Optional[MongoClient] = None
+_DETAIL_CLIENT: Optional[MongoClient] = None
+
+
+def get_client() -> MongoClient:
+    """
+    One MongoClient per process (it is thread-safe and pools connections).
+    """
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = MongoClient(MONGO_URI, serverSelectionTimeoutMS=3000)
+    return _CLIENT
+
+
+def get_detail_client() -> MongoClient:
+    """
+    Client of the detail fetches: connecting, server selection and socket reads all give
+    up within the longest detail budget, so a slow or unreachable Mongo cannot keep the
+    DETAIL_POOL threads busy after fetch_flow_detail stopped waiting for them.
+    """
+    global _DETAIL_CLIENT
+    if _DETAIL_CLIENT is None:
+        timeout_ms = int(max(DETAIL_BUDGETS_SEC.values()) * 1000)
+        _DETAIL_CLIENT = MongoClient(
+            MONGO_URI,
+            serverSelectionTimeoutMS=timeout_ms,
+            connectTimeoutMS=timeout_ms,
+            socketTimeoutMS=timeout_ms,
+        )
+    return _DETAIL_CLIENT
+
+
+def city_query(city: Optional[str]) -> Dict[str, Any]:
+    if not city:
+        return {}
+    if city == DEFAULT_CITY:
+        return {"city": {"$in": [city, None]}}
+    return {"city": city}
+
+
+def _rollup_window(db: Database, query: Dict[str, Any]) -> Optional[Tuple[datetime, datetime]]:
+    """
+    (since, newest): the ROLLUP_WINDOW_DAYS that end at the newest document matching query.
+    """
+    field = TIME_FIELDS[COLLECTION_NAME]
+    newest = parse_utc(newest_time(db, COLLECTION_NAME, route(db, COLLECTION_NAME), field, query))
+    if newest is None:
+        return None
+    return newest - timedelta(days=ROLLUP_WINDOW_DAYS), newest
+
+
+class MongoStorage:
+    """
+    Rollups and events in Mongo, day partitions routed through partitions.route (see storage.py).
+    """
+    name = "mongo"
+    
+    def _db(self, ping: bool = False) -> Database:
+        client = get_client()
+        if ping:
+            client.admin.command("ping")
+        return client[DB_NAME]
+    
+    def discover_cities(self) -> List[str]:
+        """
+        Every city with rollups in the current window.
+        """
+        db = self._db(ping=True)
+        window = _rollup_window(db, {})
+        if window is None:
+            return []
+        since, newest = window
+        field = TIME_FIELDS[COLLECTION_NAME]
+        
+        found = set()
+        for name in route(db, COLLECTION_NAME, since.date(), newest.date()):
+            query = {field: {"$gte": since.strftime("%Y-%m-%dT%H:%M:%SZ")}, **NOT_DELETED}
+            found.update(db[name].distinct("city", query))
+            # distinct skips documents without the field: those are DEFAULT_CITY's (see city_query)
+            if DEFAULT_CITY not in found and db[name].find_one({**query, "city": None}, {"_id": 1}):
+                found.add(DEFAULT_CITY)
+        return sorted(c or DEFAULT_CITY for c in found)
+    
+    def iter_rollup_batches(
+        self, city: Optional[str], batch_size: int,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Only the day partitions of the window are queried (plus the base collection),
+        and only the ROLLUP_PROJECTION fields are transferred.
+        """
+        db = self._db(ping=True)
+        field = TIME_FIELDS[COLLECTION_NAME]
+        query = {**city_query(city), **NOT_DELETED}
+        
+        window = _rollup_window(db, query)
+        if window is None:
+            return
+        since, newest = window
+        query[field] = {"$gte": since.strftime("%Y-%m-%dT%H:%M:%SZ")}
+        
+        remaining = LIMIT
+        for name in route(db, COLLECTION_NAME, since.date(), newest.date()):
+            cursor = (
+                db[name].find(query, ROLLUP_PROJECTION)
+                .sort(field, -1)
+                .limit(remaining)
+                .batch_size(batch_size)
+            )
+            batch: List[Dict[str, Any]] = []
+            for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    remaining -= len(batch)
+                    yield batch
+                    batch = []
+            if batch:
+                remaining -= len(batch)
+                yield batch
+            if remaining <= 0:
+                break
+    
+    def _flow_collections(self, db: Database, base: str, correlation_id: str) -> List[str]:
+        """
+        Partitions that can hold this flow, from the send day of the in-memory record.
+        """
+        record = find_record(correlation_id)
+        return route_flow(db, base, day_of(record.order_sent_utc) if record else None)
+    
+    def _find_one_routed(
+        self, base: str, correlation_id: str, budget: float,
+    ) -> Optional[Dict[str, Any]]:
+        # pymongo.timeout bounds the whole lookup (routing included): every operation
+        # inside gets the remaining budget as its maxTimeMS and socket timeout
+        db = get_detail_client()[DB_NAME]
+        with pymongo.timeout(budget or None):
+            for name in self._flow_collections(db, base, correlation_id):
+                doc = db[name].find_one({"correlation_id": correlation_id}, {"_id": 0})
+                if doc is not None:
+                    return doc
+        return None
+    
+    def find_rollup(self, correlation_id: str, budget: float) -> Optional[Dict[str, Any]]:
+        return self._find_one_routed(COLLECTION_NAME, correlation_id, budget)
+    
+    def find_tech_events(self, correlation_id: str, budget: float) -> List[Dict[str, Any]]:
+        db = get_detail_client()[DB_NAME]
+        events: List[Dict[str, Any]] = []
+        with pymongo.timeout(budget or None):
+            for name in self._flow_collections(db, TECH_EVENTS_COLLECTION, correlation_id):
+                events.extend(db[name].find({"correlation_id": correlation_id}, {"_id": 0}))
+        events.sort(key=lambda e: (e.get("timestamps") or {}).get("event_utc") or "")
+        return events
+    
+    def find_business_event(self, correlation_id: str, budget: float) -> Optional[Dict[str, Any]]:
+        return self._find_one_routed(BUSINESS_EVENTS_COLLECTION, correlation_id, budget)
+    
+    def count_rollups(self, tile_id: str, city: Optional[str] = None) -> int:
+        db = self._db()
+        query = {**tile_query(tile_id), **city_query(city), **NOT_DELETED}
+        return sum(db[name].count_documents(query) for name in route(db, COLLECTION_NAME))
+    
+    def iter_tile_docs(self, tile_id: str, city: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Every live partition (not capped at LIMIT) through batched cursors.
+        """
+        db = self._db()
+        query = {**tile_query(tile_id), **city_query(city), **NOT_DELETED}
+        for name in route(db, COLLECTION_NAME):
+            cursor = db[name].find(query, {"_id": 0}, batch_size=1000)
+            try:
+                yield from cursor
+            finally:
+                cursor.close()
+    
+    def iter_tech_events(
+        self, batch_size: int, projection: Optional[Dict[str, int]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Tech events of the ROLLUP_WINDOW_DAYS that end at the newest one.
+        """
+        db = self._db()
+        field = TIME_FIELDS[TECH_EVENTS_COLLECTION]
+        names = route(db, TECH_EVENTS_COLLECTION)
+        newest = parse_utc(newest_time(db, TECH_EVENTS_COLLECTION, names, field))
+        if newest is None:
+            return
+        since = newest - timedelta(days=ROLLUP_WINDOW_DAYS)
+        for name in route(db, TECH_EVENTS_COLLECTION, since.date(), newest.date()):
+            yield from db[name].find(
+                {field: {"$gte": since.strftime("%Y-%m-%dT%H:%M:%SZ")}},
+                projection,
+                batch_size=batch_size,
+            )
 
 
-def load_rollups() -> List[Dict[str, Any]]:
-    client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=3000)
-    client.admin.command("ping")
-    col = client[DB_NAME][COLLECTION_NAME]
-    return list(col.find({}, {"_id": 0}).limit(LIMIT))
+# Errors a backend raises when it cannot answer (callers degrade instead of failing)
+STORAGE_ERRORS = (PyMongoError, sqlite3.Error)
 
+_STORAGE: Optional[Any] = None
 
-ROLLUPS = load_rollups()
+
+def get_storage():
+    """
+    The configured backend (STORAGE_BACKEND), one per process.
+    """
+    global _STORAGE
+    if _STORAGE is None:
+        if STORAGE_BACKEND == "mongo":
+            _STORAGE = MongoStorage()
+        elif STORAGE_BACKEND == "sqlite":
+            _STORAGE = SqliteStorage(
+                SQLITE_PATH, SQLITE_DATA_DIR, LIMIT, ROLLUP_WINDOW_DAYS, DEFAULT_CITY,
+                ROLLUP_PROJECTION,
+            )
+        else:
+            raise ValueError(f"unknown storage backend: {STORAGE_BACKEND} (mongo, sqlite)")
+    return _STORAGE
+
+
+def discover_cities() -> List[str]:
+    """
+    CITIES, or every city with rollups in the current window.
+    """
+    if CITIES:
+        return list(CITIES)
+    return get_storage().discover_cities()
+
+
+def iter_rollup_batches(
+    city: Optional[str] = None,
+    batch_size: int = ROLLUP_BATCH_SIZE,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Newest rollups of a city (all cities when None) first, at most LIMIT, from the
+    ROLLUP_WINDOW_DAYS that end at the city's newest document, in lists of up to
+    batch_size as the backend delivers them.
+    """
+    return get_storage().iter_rollup_batches(city, batch_size)
+
+
+def load_rollups(city: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    iter_rollup_batches as one list.
+    """
+    return [d for batch in iter_rollup_batches(city) for d in batch]
 
 
 # ------------------------------------------------------------
@@ -62,36 +373,368 @@ def worst_overall(r: Dict[str, Any]) -> str:
 
 
 # ------------------------------------------------------------
-# Filtering / counts (tiles)
+# Compact flow records
+# Documents are normalized once at load time: statuses become small ints
+# (worst == max), repeated strings are interned, and the overall status is
+# precomputed. Hot paths only read attributes.
 # ------------------------------------------------------------
-def filter_rollups(tile_id: str) -> List[Dict[str, Any]]:
-    if tile_id.startswith("overall_"):
-        v = tile_id.split("_", 1)[1].upper()
-        return [r for r in ROLLUPS if worst_overall(r) == v]
+GREEN, AMBER, RED = 0, 1, 2
+STATUS_NAMES = ("GREEN", "AMBER", "RED")
+STATUS_CODE = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+SLA_OK, SLA_AT_RISK, SLA_BREACH = 0, 1, 2
+SLA_NAMES = SLA_STATES  # ("OK", "AT_RISK", "BREACH")
+SLA_CODE = {name: code for code, name in enumerate(SLA_NAMES)}
+SLA_STATUS = (GREEN, AMBER, RED)  # indexed by SLA code, same mapping as sla_state_to_status
+
+
+def _intern(value: Any) -> str:
+    return sys.intern(value) if isinstance(value, str) else ("" if value is None else str(value))
+
+
+class FlowRecord:
+    __slots__ = (
+        "correlation_id", "sap_order", "idoc", "plant", "city", "order_sent_utc",
+        "tech", "biz", "sla", "overall",
+        "last_checkpoint", "last_status", "tech_reason",
+        "biz_status", "biz_reason",
+        "sla_due", "sla_actual",
+    )
     
-    if tile_id.startswith("tech_"):
-        v = tile_id.split("_", 1)[1].upper()
-        return [r for r in ROLLUPS if (r.get("tech", {}).get("health") or "GREEN").upper() == v]
+    @classmethod
+    def from_doc(cls, d: Dict[str, Any]) -> "FlowRecord":
+        tech = d.get("tech", {})
+        biz = d.get("business", {})
+        sla = d.get("sla", {})
+        idoc = d.get("sap_idoc", {})
+        
+        r = cls()
+        r.correlation_id = d.get("correlation_id", "")
+        r.sap_order = d.get("order", {}).get("sap_order", "UNKNOWN")
+        r.idoc = idoc.get("number", "")
+        r.plant = _intern(idoc.get("plant", ""))
+        r.city = _intern(d.get("city") or DEFAULT_CITY)
+        r.order_sent_utc = d.get("timestamps", {}).get("order_sent_utc", "")
+        
+        r.tech = STATUS_CODE.get((tech.get("health") or "GREEN").upper(), GREEN)
+        r.biz = STATUS_CODE.get((biz.get("health") or "GREEN").upper(), GREEN)
+        r.sla = SLA_CODE.get((sla.get("state") or "OK").upper(), SLA_OK)
+        r.overall = max(r.tech, r.biz, SLA_STATUS[r.sla])
+        
+        r.last_checkpoint = _intern(tech.get("last_checkpoint"))
+        r.last_status = _intern(tech.get("last_status"))
+        r.tech_reason = _intern(tech.get("reason_code"))
+        r.biz_status = _intern(biz.get("status"))
+        r.biz_reason = _intern(biz.get("reason_code"))
+        r.sla_due = sla.get("response_due_seconds")
+        r.sla_actual = sla.get("actual_response_seconds")
+        return r
     
-    if tile_id.startswith("business_"):
-        v = tile_id.split("_", 1)[1].upper()
-        return [r for r in ROLLUPS if (r.get("business", {}).get("health") or "GREEN").upper() == v]
+    def to_doc(self) -> Dict[str, Any]:
+        """
+        Rollup-shaped dict with the fields the record keeps (not the full document).
+        """
+        return {
+            "city"          : self.city,
+            "correlation_id": self.correlation_id,
+            "sap_idoc"      : {"number": self.idoc, "plant": self.plant},
+            "order"         : {"sap_order": self.sap_order},
+            "tech"          : {
+                "health"         : STATUS_NAMES[self.tech],
+                "last_checkpoint": self.last_checkpoint,
+                "last_status"    : self.last_status,
+                "reason_code"    : self.tech_reason or None,
+            },
+            "business"      : {
+                "health"     : STATUS_NAMES[self.biz],
+                "status"     : self.biz_status,
+                "reason_code": self.biz_reason or None,
+            },
+            "sla"           : {
+                "state"                  : SLA_NAMES[self.sla],
+                "response_due_seconds"   : self.sla_due,
+                "actual_response_seconds": self.sla_actual,
+                "breach"                 : self.sla == SLA_BREACH,
+            },
+            "timestamps"    : {"order_sent_utc": self.order_sent_utc},
+        }
+
+
+# ------------------------------------------------------------
+# In-process store: one shard per city
+# A shard owns its records, correlation_id index, tile counters and SLA tracker,
+# so a city's tiles and grid only touch that shard; the all-cities view adds up
+# the per-shard counters. Filled by the loader (see "Loading" below); the first
+# load may still be running.
+# ------------------------------------------------------------
+class CityShard:
+    def __init__(self, city: str):
+        self.city = city
+        self.records: List[FlowRecord] = []
+        self.by_cid: Dict[str, FlowRecord] = {}  # fast lookup for detail page
+        self.status: Dict[str, int] = status_counts([])
+        self.settled: Dict[str, int] = {s: 0 for s in SLA_NAMES}
+        self.tracker = SlaDeadlineTracker()
+        self.progress: Dict[str, Any] = {"state": "idle", "loaded": 0, "batches": 0, "seconds": 0.0}
+
+
+# Replaced (never mutated) when a city is added, so readers can iterate a snapshot
+SHARDS: Dict[str, CityShard] = {}
+_SHARDS_LOCK = threading.Lock()
+
+
+def shard_for(city: Optional[str]) -> CityShard:
+    """
+    The city's shard, created empty on first use (ingest may see a city before the loader).
+    """
+    global SHARDS
+    city = _intern(city or DEFAULT_CITY)
+    shard = SHARDS.get(city)
+    if shard is None:
+        with _SHARDS_LOCK:
+            shard = SHARDS.get(city)
+            if shard is None:
+                shard = CityShard(city)
+                SHARDS = {**SHARDS, city: shard}
+    return shard
+
+
+def shards(city: Optional[str] = None) -> List[CityShard]:
+    """
+    The selected city's shard ([] when unknown), or every shard for city=None.
+    """
+    if city:
+        shard = SHARDS.get(city)
+        return [shard] if shard else []
+    return list(SHARDS.values())
+
+
+def city_names() -> List[str]:
+    return sorted(SHARDS)
+
+
+def find_record(correlation_id: str) -> Optional[FlowRecord]:
+    for shard in SHARDS.values():
+        r = shard.by_cid.get(correlation_id)
+        if r is not None:
+            return r
+    return None
+
+
+# ------------------------------------------------------------
+# Live SLA state for in-flight flows (promoted by the city's deadline tracker)
+# ------------------------------------------------------------
+def live_sla_code(r: FlowRecord, tracker: Optional[SlaDeadlineTracker] = None) -> int:
+    """
+    Tracker state while the flow is open, otherwise the state stored on the rollup.
+    """
+    tracker = tracker or shard_for(r.city).tracker
+    tracked = tracker.state_of(r.correlation_id)
+    return r.sla if tracked is None else SLA_CODE[tracked]
+
+
+# ------------------------------------------------------------
+# Filtering / counts (tiles); city=None spans every shard
+# ------------------------------------------------------------
+def _filter_shard(shard: CityShard, section: str, value: str) -> List[FlowRecord]:
+    records = shard.records
+    
+    if isinstance(records, SnapshotRecords) and section in ("overall", "tech", "business"):
+        # mapped shard: scan the status column, build only the matching records
+        column = {"overall": "overall", "tech": "tech", "business": "biz"}[section]
+        return records.where(column, STATUS_CODE.get(value))
+    
+    if section == "overall":
+        code = STATUS_CODE.get(value)
+        return [r for r in records if r.overall == code]
+    
+    if section == "tech":
+        code = STATUS_CODE.get(value)
+        return [r for r in records if r.tech == code]
+    
+    if section == "business":
+        code = STATUS_CODE.get(value)
+        return [r for r in records if r.biz == code]
+    
+    if section == "sla":
+        code = SLA_CODE.get(value)  # OK / AT_RISK / BREACH
+        tracker = shard.tracker
+        if not len(tracker):
+            return [r for r in records if r.sla == code]
+        return [r for r in records if live_sla_code(r, tracker) == code]
+    
+    return records
+
+
+def filter_rollups(tile_id: str, city: Optional[str] = None) -> List[FlowRecord]:
+    section, _, value = tile_id.partition("_")
+    value = value.upper()
+    
+    selected = shards(city)
+    if len(selected) == 1:
+        return _filter_shard(selected[0], section, value)
+    out: List[FlowRecord] = []
+    for shard in selected:
+        out.extend(_filter_shard(shard, section, value))
+    return out
+
+
+def _iter_shard(shard: CityShard, section: str, value: str) -> Iterator[FlowRecord]:
+    records = shard.records  # the list a concurrent refresh_rollups swaps out stays valid
+    
+    if section in ("overall", "tech", "business"):
+        code = STATUS_CODE.get(value)
+        attr = {"overall": "overall", "tech": "tech", "business": "biz"}[section]
+        return (r for r in records if getattr(r, attr) == code)
+    
+    if section == "sla":
+        code = SLA_CODE.get(value)
+        tracker = shard.tracker
+        return (r for r in records if live_sla_code(r, tracker) == code)
+    
+    return iter(records)
+
+
+def iter_rollups(tile_id: str, city: Optional[str] = None) -> Iterator[FlowRecord]:
+    """
+    Lazy filter_rollups (exports): nothing is materialized besides the current record.
+    """
+    section, _, value = tile_id.partition("_")
+    value = value.upper()
+    for shard in shards(city):
+        yield from _iter_shard(shard, section, value)
+
+
+def tile_query(tile_id: str) -> Dict[str, Any]:
+    """
+    Mongo filter matching a tile on the stored rollups (same rules as worst_overall).
+    """
+    section, _, value = tile_id.partition("_")
+    value = value.upper()
     
-    if tile_id.startswith("sla_"):
-        v = tile_id.split("_", 1)[1].upper()  # OK / AT_RISK / BREACH
-        return [r for r in ROLLUPS if (r.get("sla", {}).get("state") or "OK").upper() == v]
+    if section == "tech":
+        return {"tech.health": value}
+    if section == "business":
+        return {"business.health": value}
+    if section == "sla":
+        return {"sla.state": value}
+    if section == "overall":
+        red = [{"tech.health": "RED"}, {"business.health": "RED"}, {"sla.state": "BREACH"}]
+        amber = [{"tech.health": "AMBER"}, {"business.health": "AMBER"}, {"sla.state": "AT_RISK"}]
+        not_red = [
+            {"tech.health": {"$ne": "RED"}},
+            {"business.health": {"$ne": "RED"}},
+            {"sla.state": {"$ne": "BREACH"}},
+        ]
+        if value == "RED":
+            return {"$or": red}
+        if value == "AMBER":
+            return {"$and": not_red + [{"$or": amber}]}
+        return {
+            "tech.health"    : {"$nin": ["RED", "AMBER"]},
+            "business.health": {"$nin": ["RED", "AMBER"]},
+            "sla.state"      : {"$nin": ["BREACH", "AT_RISK"]},
+        }
+    return {}
+
+
+def status_counts(records: List[FlowRecord]) -> Dict[str, int]:
+    """
+    overall / tech / business tile counts of records (stored statuses, no SLA).
+    """
+    overall = [0, 0, 0]
+    tech = [0, 0, 0]
+    biz = [0, 0, 0]
+    for r in records:
+        overall[r.overall] += 1
+        tech[r.tech] += 1
+        biz[r.biz] += 1
     
-    return ROLLUPS
+    counts: Dict[str, int] = {}
+    for code, name in enumerate(STATUS_NAMES):
+        counts[f"overall_{name}"] = overall[code]
+        counts[f"tech_{name}"] = tech[code]
+        counts[f"business_{name}"] = biz[code]
+    return counts
 
 
-def compute_counts() -> Dict[str, int]:
-    tids = [
-        "overall_GREEN", "overall_AMBER", "overall_RED",
-        "tech_GREEN", "tech_AMBER", "tech_RED",
-        "business_GREEN", "business_AMBER", "business_RED",
-        "sla_OK", "sla_AT_RISK", "sla_BREACH",
-    ]
-    return {tid: len(filter_rollups(tid)) for tid in tids}
+def compute_counts(city: Optional[str] = None) -> Dict[str, int]:
+    """
+    All tile counts in one pass over the records.
+    """
+    counts = status_counts([])
+    sla = [0, 0, 0]
+    for shard in shards(city):
+        _add_counts(counts, status_counts(shard.records))
+        tracked = len(shard.tracker) > 0
+        for r in shard.records:
+            sla[live_sla_code(r, shard.tracker) if tracked else r.sla] += 1
+    for code, name in enumerate(SLA_NAMES):
+        counts[f"sla_{name}"] = sla[code]
+    return counts
+
+
+def settled_sla_counts(records: List[FlowRecord], tracker: SlaDeadlineTracker) -> Dict[str, int]:
+    """
+    SLA states of flows the tracker does not own; tracked flows are added live on every tick.
+    """
+    settled: Dict[str, int] = {s: 0 for s in SLA_NAMES}
+    for r in records:
+        if tracker.state_of(r.correlation_id) is None:
+            settled[SLA_NAMES[r.sla]] += 1
+    return settled
+
+
+def _add_counts(into: Dict[str, int], counts: Dict[str, int]) -> None:
+    for key, n in counts.items():
+        into[key] = into.get(key, 0) + n
+
+
+def live_sla_counts(city: Optional[str] = None) -> Dict[str, int]:
+    """
+    Advances the SLA trackers to now and returns {"sla_OK": n, "sla_AT_RISK": n, "sla_BREACH": n}.
+    """
+    total: Dict[str, int] = {s: 0 for s in SLA_NAMES}
+    for shard in shards(city):
+        _add_counts(total, shard.settled)
+        _add_counts(total, shard.tracker.tick())
+    return {f"sla_{s}": total[s] for s in SLA_NAMES}
+
+
+# ------------------------------------------------------------
+# Versioned tile counts
+# DATA_VERSION moves whenever records are published (every batch of a load);
+# the non-SLA counts are maintained per shard by the loader, the SLA counts come
+# from the trackers on every call. The version handed to clients is a fingerprint
+# of the counts themselves, so every worker serving the same data agrees on it
+# and an unchanged poll is a no-op.
+# ------------------------------------------------------------
+DATA_VERSION = 1
+
+_COUNTS_LOCK = threading.Lock()
+
+
+def tile_counts(city: Optional[str] = None) -> Tuple[str, Dict[str, int]]:
+    """
+    -> (version, counts) for every tile of a city (all cities when None),
+    plus "loaded" and "loading" (1 while a first load runs).
+    """
+    selected = shards(city)
+    counts = status_counts([])
+    n_loaded = 0
+    with _COUNTS_LOCK:
+        for shard in selected:
+            _add_counts(counts, shard.status)
+            n_loaded += len(shard.records)
+    counts.update(live_sla_counts(city))
+    counts["loading"] = int(LOAD_PROGRESS["state"] == "loading" and LOAD_PROGRESS["progressive"])
+    
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(f"{city or ''}|{n_loaded}".encode())
+    for key in sorted(counts):
+        digest.update(f"|{key}={counts[key]}".encode())
+    counts["loaded"] = n_loaded
+    return digest.hexdigest(), counts
 
 
 # ------------------------------------------------------------
@@ -100,27 +743,56 @@ def compute_counts() -> Dict[str, int]:
 # FLOW row uses aggregate overall as row_status
 # order_overall is computed per sap_order for display (and group row coloring via children)
 # ------------------------------------------------------------
-def to_grouped_rows(flows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def to_grouped_rows(flows: List[FlowRecord]) -> List[Dict[str, Any]]:
     rows: List[Dict[str, Any]] = []
     
+    # Worst status per sap_order (in case of multiple flows per order):
+    # overall, and the worst row_status of any FLOW/TECH/BUSINESS/SLA row below it
+    per_order: Dict[str, int] = {}
+    per_order_row: Dict[str, int] = {}
+    for r in flows:
+        per_order[r.sap_order] = max(per_order.get(r.sap_order, GREEN), r.overall)
+        per_order_row[r.sap_order] = max(
+            per_order_row.get(r.sap_order, GREEN), r.overall, r.tech, r.biz, SLA_STATUS[r.sla],
+        )
+    
     for r in flows:
-        sap_order = r.get("order", {}).get("sap_order", "UNKNOWN")
-        cid = r.get("correlation_id", "")
-        plant = r.get("sap_idoc", {}).get("plant", "")
-        idoc = r.get("sap_idoc", {}).get("number", "")
+        sap_order = r.sap_order
+        cid = r.correlation_id
+        plant = r.plant
+        idoc = r.idoc
         
-        # Per-section statuses
-        tech = r.get("tech", {})
-        biz = r.get("business", {})
-        sla = r.get("sla", {})
+        # ORDER (group row, once per order): carries the precomputed group status so the
+        # grid styles the group with a lookup instead of scanning its children
+        if sap_order in per_order_row:
+            order_status = STATUS_NAMES[per_order_row.pop(sap_order)]
+            rows.append(
+                {
+                    "sap_order"     : sap_order,
+                    "node_type"     : "ORDER",
+                    "overall"       : STATUS_NAMES[per_order[sap_order]],
+                    "row_status"    : order_status,
+                    "order_overall" : STATUS_NAMES[per_order[sap_order]],
+                    "plant"         : plant,
+                    "idoc"          : "",
+                    "key"           : "Order",
+                    "value"         : "",
+                    "reason"        : "",
+                    "checkpoint"    : "",
+                    "sla_state"     : "",
+                    "correlation_id": "",
+                },
+            )
         
-        tech_status = (tech.get("health") or "GREEN").upper()
-        biz_status = (biz.get("health") or "GREEN").upper()
-        sla_state = (sla.get("state") or "OK").upper()
-        sla_status = sla_state_to_status(sla_state)
+        # Per-section statuses
+        tech_status = STATUS_NAMES[r.tech]
+        biz_status = STATUS_NAMES[r.biz]
+        sla_state = SLA_NAMES[r.sla]
+        sla_status = STATUS_NAMES[SLA_STATUS[r.sla]]
         
         # Aggregate for FLOW / order
-        overall = worst_status([tech_status, biz_status, sla_status])
+        overall = STATUS_NAMES[r.overall]
+        order_overall = STATUS_NAMES[per_order[sap_order]]
         
         # FLOW (aggregate)
         rows.append(
@@ -129,7 +801,7 @@ def to_grouped_rows(flows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
                 "node_type"     : "FLOW",
                 "overall"       : overall,
                 "row_status"    : overall,  # <-- important
-                "order_overall" : overall,  # will be overwritten later (but ok)
+                "order_overall" : order_overall,
                 "plant"         : plant,
                 "idoc"          : idoc,
                 "key"           : "Summary",
@@ -148,13 +820,13 @@ def to_grouped_rows(flows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
                 "node_type"     : "TECH",
                 "overall"       : overall,
                 "row_status"    : tech_status,  # <-- important
-                "order_overall" : overall,
+                "order_overall" : order_overall,
                 "plant"         : plant,
                 "idoc"          : idoc,
                 "key"           : "Transport",
-                "value"         : f"{tech_status} / {tech.get('last_status', '')}",
-                "reason"        : tech.get("reason_code", "") or "",
-                "checkpoint"    : tech.get("last_checkpoint", "") or "",
+                "value"         : f"{tech_status} / {r.last_status}",
+                "reason"        : r.tech_reason,
+                "checkpoint"    : r.last_checkpoint,
                 "sla_state"     : sla_state,
                 "correlation_id": cid,
             },
@@ -167,12 +839,12 @@ def to_grouped_rows(flows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
                 "node_type"     : "BUSINESS",
                 "overall"       : overall,
                 "row_status"    : biz_status,  # <-- important
-                "order_overall" : overall,
+                "order_overall" : order_overall,
                 "plant"         : plant,
                 "idoc"          : idoc,
                 "key"           : "Business",
-                "value"         : f"{biz_status} / {biz.get('status', '')}",
-                "reason"        : biz.get("reason_code", "") or "",
+                "value"         : f"{biz_status} / {r.biz_status}",
+                "reason"        : r.biz_reason,
                 "checkpoint"    : "",
                 "sla_state"     : sla_state,
                 "correlation_id": cid,
@@ -186,11 +858,11 @@ def to_grouped_rows(flows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
                 "node_type"     : "SLA",
                 "overall"       : overall,
                 "row_status"    : sla_status,  # <-- important (AMBER when AT_RISK)
-                "order_overall" : overall,
+                "order_overall" : order_overall,
                 "plant"         : plant,
                 "idoc"          : idoc,
                 "key"           : "SLA",
-                "value"         : f"יעד: {sla.get('response_due_seconds', '')}s / בפועל: {sla.get('actual_response_seconds', '')}s",
+                "value"         : f"יעד: {r.sla_due}s / בפועל: {r.sla_actual}s",
                 "reason"        : sla_state,
                 "checkpoint"    : "",
                 "sla_state"     : sla_state,
@@ -198,20 +870,410 @@ def to_grouped_rows(flows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
             },
         )
     
-    # Ensure order_overall is consistent per sap_order (in case of multiple flows per order)
-    per_order: Dict[str, str] = {}
-    for row in rows:
-        so = row.get("sap_order", "UNKNOWN")
-        per_order[so] = worst_status([per_order.get(so, "GREEN"), row.get("row_status", "GREEN")])
+    return rows
+
+
+# ------------------------------------------------------------
+# Loading
+# The city shards load concurrently on LOAD_POOL. Within a shard the cursor is
+# consumed batch by batch: each batch seeds the shard's SLA tracker, becomes
+# FlowRecords and is added to the index and counters before the next one is
+# read, so no full document list is ever held. An empty shard (first load, or a
+# city that just appeared) publishes every batch, so its tiles fill in while it
+# runs; a reload builds new structures off to the side and swaps them in whole,
+# so readers see the old or the new set, never a mix.
+# ------------------------------------------------------------
+_LOAD_LOCK = threading.Lock()
+LOAD_POOL = ThreadPoolExecutor(max_workers=LOAD_WORKERS, thread_name_prefix="rollup-load")
+LOAD_PROGRESS: Dict[str, Any] = {
+    "state"      : "idle",  # idle / loading / ready / failed
+    "progressive": False,
+    "cities"     : 0,
+    "seconds"    : 0.0,
+}
+
+# Called with every batch of FlowRecords as it is loaded (first load and reloads alike)
+RECORD_LISTENERS: List[Callable[[List[FlowRecord]], None]] = []
+# Called with each shard once its load has finished (after a reload has swapped its records in)
+SHARD_LISTENERS: List[Callable[[CityShard], None]] = []
+
+
+def _load_shard(shard: CityShard) -> bool:
+    global DATA_VERSION
+    progressive = not shard.records
+    tracker = shard.tracker
+    if progressive:
+        records, by_cid, status, settled = shard.records, shard.by_cid, shard.status, shard.settled
+    else:
+        records, by_cid = [], {}
+        status, settled = status_counts([]), settled_sla_counts([], tracker)
     
-    for row in rows:
-        row["order_overall"] = per_order.get(row.get("sap_order", "UNKNOWN"), "GREEN")
+    started = time.monotonic()
+    progress = shard.progress
+    progress.update(state="loading", loaded=0, batches=0, seconds=0.0)
+    try:
+        for docs in iter_rollup_batches(shard.city):
+            # Flows answered since the last load leave the tracker, still-open ones are (re)opened;
+            # open flows are seeded from the raw documents before they are dropped
+            for d in docs:
+                sla = d.get("sla", {})
+                if sla.get("breach") or sla.get("actual_response_seconds") is not None:
+                    tracker.close(d.get("correlation_id", ""))
+            tracker.load_rollups(docs)
+            batch = [FlowRecord.from_doc(d) for d in docs]
+            del docs
+            batch_status = status_counts(batch)
+            batch_settled = settled_sla_counts(batch, tracker)
+            
+            with _COUNTS_LOCK:
+                records.extend(batch)
+                by_cid.update((r.correlation_id, r) for r in batch if r.correlation_id)
+                _add_counts(status, batch_status)
+                _add_counts(settled, batch_settled)
+                if progressive:
+                    DATA_VERSION += 1
+            for listener in RECORD_LISTENERS:
+                listener(batch)
+            progress.update(
+                loaded=len(records),
+                batches=progress["batches"] + 1,
+                seconds=round(time.monotonic() - started, 3),
+            )
+    except STORAGE_ERRORS as exc:
+        progress.update(state="failed", seconds=round(time.monotonic() - started, 3))
+        print(
+            f"[data_store] {shard.city}: rollup load failed after {len(records)} records: {exc}",
+            file=sys.stderr,
+        )
+        return False
     
-    return rows
+    if not progressive:
+        with _COUNTS_LOCK:
+            shard.records = records
+            shard.by_cid = by_cid
+            shard.status = status
+            shard.settled = settled
+            DATA_VERSION += 1
+    for listener in SHARD_LISTENERS:
+        listener(shard)
+    progress.update(state="ready", seconds=round(time.monotonic() - started, 3))
+    print(
+        f"[data_store] {shard.city}: loaded {len(records)} rollups in {progress['seconds']:.1f}s "
+        f"({progress['batches']} batches)",
+        file=sys.stderr,
+    )
+    return True
+
 
+def _load(progressive: bool) -> bool:
+    if SNAPSHOT_MODE == "map":
+        return _map_snapshot()
+    started = time.monotonic()
+    LOAD_PROGRESS.update(state="loading", progressive=progressive, cities=0, seconds=0.0)
+    try:
+        cities = discover_cities()
+    except STORAGE_ERRORS as exc:
+        LOAD_PROGRESS.update(state="failed", seconds=round(time.monotonic() - started, 3))
+        print(f"[data_store] rollup load failed: {exc}", file=sys.stderr)
+        return False
+    
+    LOAD_PROGRESS["cities"] = len(cities)
+    ok = all(LOAD_POOL.map(_load_shard, [shard_for(c) for c in cities]))
+    if ok and SNAPSHOT_MODE == "publish":
+        _publish_snapshot()
+    LOAD_PROGRESS.update(
+        state="ready" if ok else "failed", seconds=round(time.monotonic() - started, 3),
+    )
+    return ok
+
+
+# ------------------------------------------------------------
+# Shared snapshot
+# The publisher writes every shard to SNAPSHOT_PATH after each load; a mapping
+# worker swaps in SnapshotRecords / SnapshotIndex views of a newer file the way
+# a reload swaps in new lists (the trackers and counters are rebuilt from it).
+# A worker's own update_records copies the touched shard out of the mapping.
+# ------------------------------------------------------------
+_SNAPSHOT: Optional[Snapshot] = None
+
+
+def _publish_snapshot() -> None:
+    started = time.monotonic()
+    with _COUNTS_LOCK:
+        cities = {city: list(shard.records) for city, shard in SHARDS.items()}
+    try:
+        header = write_snapshot(SNAPSHOT_PATH, cities)
+    except (OSError, ValueError) as exc:
+        print(f"[data_store] snapshot not published: {exc}", file=sys.stderr)
+        return
+    print(
+        f"[data_store] published snapshot {header['generation']}: {header['records']} records "
+        f"in {time.monotonic() - started:.2f}s",
+        file=sys.stderr,
+    )
+
+
+def _map_shard(shard: CityShard, snap: Snapshot, start: int, end: int) -> None:
+    global DATA_VERSION
+    records = SnapshotRecords(snap, start, end)
+    tracker = shard.tracker
+    for r in records:
+        if r.sla_actual is not None or r.sla == SLA_BREACH:
+            tracker.close(r.correlation_id)
+    tracker.load_rollups(r.to_doc() for r in records)
+    status = status_counts(records)
+    settled = settled_sla_counts(records, tracker)
+    
+    with _COUNTS_LOCK:
+        shard.records = records
+        shard.by_cid = SnapshotIndex(snap, start, end)
+        shard.status = status
+        shard.settled = settled
+        DATA_VERSION += 1
+    for listener in RECORD_LISTENERS:
+        listener(list(records))
+    for listener in SHARD_LISTENERS:
+        listener(shard)
+    shard.progress.update(state="ready", loaded=len(records), batches=1)
+
+
+def _map_snapshot() -> bool:
+    """
+    Maps SNAPSHOT_PATH when it is newer than the current mapping. False until one is published.
+    """
+    global _SNAPSHOT
+    if _SNAPSHOT is not None and _SNAPSHOT.is_current():
+        return True
+    started = time.monotonic()
+    try:
+        snap = Snapshot(SNAPSHOT_PATH, FlowRecord)
+    except (OSError, ValueError) as exc:
+        LOAD_PROGRESS.update(state="failed", seconds=round(time.monotonic() - started, 3))
+        print(f"[data_store] no snapshot to map: {exc}", file=sys.stderr)
+        return False
+    
+    LOAD_PROGRESS.update(state="loading", progressive=False, cities=len(snap.cities), seconds=0.0)
+    for city, (start, end) in snap.cities.items():
+        _map_shard(shard_for(city), snap, start, end)
+    _SNAPSHOT = snap
+    LOAD_PROGRESS.update(state="ready", seconds=round(time.monotonic() - started, 3))
+    print(
+        f"[data_store] mapped snapshot {snap.generation} ({snap.created_utc}): "
+        f"{snap.records} records of {len(snap.cities)} cities "
+        f"in {LOAD_PROGRESS['seconds']:.2f}s",
+        file=sys.stderr,
+    )
+    return True
 
-# Fast lookup for detail page
-ROLLUP_BY_CID = {r.get("correlation_id"): r for r in ROLLUPS if r.get("correlation_id")}
+
+def load_progress() -> Dict[str, Any]:
+    out = dict(LOAD_PROGRESS)
+    out["shards"] = {city: dict(shard.progress) for city, shard in sorted(SHARDS.items())}
+    return out
+
+
+def refresh_rollups() -> bool:
+    """
+    Reload every city shard from the storage backend and bump DATA_VERSION.
+    False when it is unavailable.
+    """
+    storage = get_storage()
+    if hasattr(storage, "refresh"):
+        storage.refresh()  # SqliteStorage: rebuild if the JSONL files changed
+    with _LOAD_LOCK:
+        return _load(progressive=False)
+
+
+def _first_load() -> None:
+    with _LOAD_LOCK:
+        _load(progressive=True)
+
+
+if ROLLUP_BACKGROUND_LOAD:
+    threading.Thread(target=_first_load, name="rollup-load", daemon=True).start()
+else:
+    _first_load()
+
+
+def start_rollup_refresher(interval: float = ROLLUP_REFRESH_SEC) -> None:
+    """
+    Reload on the scheduler: in every worker (each has its own records), jittered so
+    the workers of a deployment do not all query Mongo in the same second. Mapping
+    workers only stat the snapshot file, so they look more often.
+    """
+    if SNAPSHOT_MODE == "map":
+        interval = SNAPSHOT_POLL_SEC
+    SCHEDULER.add("rollup-refresh", refresh_rollups, interval, jitter=ROLLUP_REFRESH_JITTER)
+
+
+# ------------------------------------------------------------
+# Out-of-band updates (bulk actions): changed / removed rollups are applied to
+# the loaded records and counters right away instead of waiting for a reload
+# ------------------------------------------------------------
+def _count_record(shard: CityShard, r: FlowRecord, sign: int) -> None:
+    """
+    Caller holds _COUNTS_LOCK. Adds (sign=1) or removes (sign=-1) r from the shard counters.
+    """
+    _add_counts(shard.status, {key: sign * n for key, n in status_counts([r]).items() if n})
+    if shard.tracker.state_of(r.correlation_id) is None:
+        shard.settled[SLA_NAMES[r.sla]] += sign
+
+
+def _detach(shard: CityShard) -> None:
+    """
+    Caller holds _COUNTS_LOCK. A mapped shard becomes plain lists / dict so its records can change.
+    """
+    if isinstance(shard.records, SnapshotRecords):
+        shard.records = list(shard.records)
+        shard.by_cid = {r.correlation_id: r for r in shard.records if r.correlation_id}
+
+
+def update_records(docs: List[Dict[str, Any]], removed: Optional[List[str]] = None) -> int:
+    """
+    Replaces the loaded records of `docs` (rollup-shaped) and drops the `removed`
+    correlation_ids. Flows that are not loaded are left to the next reload.
+    Returns the number of records changed or removed.
+    """
+    global DATA_VERSION
+    changed: List[FlowRecord] = []
+    shrunk: Dict[str, CityShard] = {}
+    n_removed = 0
+    with _COUNTS_LOCK:
+        for d in docs:
+            new = FlowRecord.from_doc(d)
+            shard = shard_for(new.city)
+            if new.correlation_id in shard.by_cid:
+                _detach(shard)
+            r = shard.by_cid.get(new.correlation_id)
+            if r is None:
+                continue
+            _count_record(shard, r, -1)
+            for slot in FlowRecord.__slots__:
+                setattr(r, slot, getattr(new, slot))
+            _count_record(shard, r, 1)
+            changed.append(r)
+        
+        for cid in removed or ():
+            for shard in SHARDS.values():
+                if cid not in shard.by_cid:
+                    continue
+                _detach(shard)
+                r = shard.by_cid.pop(cid, None)
+                if r is not None:
+                    _count_record(shard, r, -1)
+                    shard.tracker.close(cid)
+                    shrunk[shard.city] = shard
+                    n_removed += 1
+                    break
+        for shard in shrunk.values():
+            # in place: a progressive load may still be extending this list
+            shard.records[:] = [r for r in shard.records if r.correlation_id in shard.by_cid]
+        if changed or shrunk:
+            DATA_VERSION += 1
+    
+    if changed:
+        for listener in RECORD_LISTENERS:
+            listener(changed)
+    for shard in shrunk.values():
+        for listener in SHARD_LISTENERS:
+            listener(shard)
+    return len(changed) + n_removed
+
+
+def track_open(
+    city: Optional[str], correlation_id: str, order_sent_utc: Any, response_due_seconds: float,
+) -> bool:
+    """
+    Opens the flow on its city's SLA tracker (ingest). A loaded flow moves out of the
+    shard's settled counts while the tracker owns it.
+    """
+    shard = shard_for(city)
+    with _COUNTS_LOCK:
+        was_settled = shard.tracker.state_of(correlation_id) is None
+        if not shard.tracker.open(correlation_id, order_sent_utc, response_due_seconds):
+            return False
+        r = shard.by_cid.get(correlation_id)
+        if r is not None and was_settled:
+            shard.settled[SLA_NAMES[r.sla]] -= 1
+    return True
+
+
+def track_close(city: Optional[str], correlation_id: str) -> Optional[str]:
+    """
+    Closes the flow on its city's SLA tracker (ingest); a loaded flow is counted as
+    settled again, in the state stored on its record. Returns the tracked state.
+    """
+    shard = shard_for(city)
+    with _COUNTS_LOCK:
+        state = shard.tracker.close(correlation_id)
+        r = shard.by_cid.get(correlation_id)
+        if state is not None and r is not None:
+            shard.settled[SLA_NAMES[r.sla]] += 1
+    return state
+
+
+# ------------------------------------------------------------
+# Detail fetch (rollup + tech events + business event)
+# The three queries run concurrently on a shared pool; each one has its
+# own time budget and whatever did not arrive in time is reported as missing.
+# ------------------------------------------------------------
+DETAIL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="detail")
+
+DETAIL_BUDGETS_SEC: Dict[str, float] = {
+    "rollup"        : 1.0,
+    "tech_events"   : 1.5,
+    "business_event": 1.5,
+}
+
+
+def _fetch_rollup(correlation_id: str, budget: float) -> Optional[Dict[str, Any]]:
+    return get_storage().find_rollup(correlation_id, budget)
+
+
+def _fetch_tech_events(correlation_id: str, budget: float) -> List[Dict[str, Any]]:
+    return get_storage().find_tech_events(correlation_id, budget)
+
+
+def _fetch_business_event(correlation_id: str, budget: float) -> Optional[Dict[str, Any]]:
+    return get_storage().find_business_event(correlation_id, budget)
+
+
+_DETAIL_FETCHERS = {
+    "rollup"        : _fetch_rollup,
+    "tech_events"   : _fetch_tech_events,
+    "business_event": _fetch_business_event,
+}
+
+
+def fetch_flow_detail(correlation_id: str) -> Dict[str, Any]:
+    """
+    Returns {"rollup": ..., "tech_events": ..., "business_event": ..., "missing": [...]}.
+    A section that timed out or failed is None and its name is listed in "missing".
+    """
+    started = time.monotonic()
+    futures = {
+        name: DETAIL_POOL.submit(fn, correlation_id, DETAIL_BUDGETS_SEC[name])
+        for name, fn in _DETAIL_FETCHERS.items()
+    }
+    
+    result: Dict[str, Any] = {"missing": []}
+    for name, fut in futures.items():
+        remaining = started + DETAIL_BUDGETS_SEC[name] - time.monotonic()
+        try:
+            result[name] = fut.result(timeout=max(0.0, remaining))
+        except (FutureTimeoutError, *STORAGE_ERRORS):
+            fut.cancel()
+            result[name] = None
+            result["missing"].append(name)
+    
+    # The in-memory record is good enough when Mongo is slow
+    cached = find_record(correlation_id)
+    if result["rollup"] is None and cached is not None:
+        result["rollup"] = cached.to_doc()
+        if "rollup" in result["missing"]:
+            result["missing"].remove("rollup")
+    
+    return result
 
 """
 def ROLLUP_BY_CID(correlation_id: str) -> Dict[str, Any] | None:
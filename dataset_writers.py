@@ -0,0 +1,317 @@
+"""
+Output writers for the generated datasets.
+
+- JSONL, optionally gzip or zstd compressed (picked from the file suffix when reading).
+  Records are streamed line by line, nothing is buffered beyond the codec window.
+- Parquet with a fixed schema per dataset. The nested `sap_idoc`, `message`,
+  `tech`, `business`, `sla`, `timestamps`, ... objects are flattened into
+  `<parent>_<field>` columns; ISO timestamps become UTC timestamps and item lists
+  stay list<struct>. Rows are written in row groups of PARQUET_ROW_GROUP.
+- stream_csv / stream_parquet: the same flattening as generators of chunks, for
+  HTTP downloads that start at once and hold one chunk in memory.
+
+pyarrow and zstandard are optional; they are only imported when their format is used.
+"""
+import csv
+import gzip
+import io
+import json
+from itertools import islice
+
+COMPRESSIONS = ("none", "gzip", "zstd")
+SUFFIX_BY_COMPRESSION = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 10
+PARQUET_ROW_GROUP = 50000
+PARQUET_COMPRESSION = "zstd"
+
+TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+# ------------------------------------------------------------
+# Compressed JSONL
+# ------------------------------------------------------------
+def _compression_of(path):
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return "none"
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise RuntimeError(
+            "zstd output needs the 'zstandard' package (pip install zstandard)"
+        ) from exc
+    return zstandard
+
+
+def open_text(path, mode="r"):
+    """
+    Text handle for path ('r' or 'w'), transparently (de)compressing .gz / .zst files.
+    """
+    compression = _compression_of(path)
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=GZIP_LEVEL)
+    if compression == "zstd":
+        zstd = _zstd()
+        raw = open(path, mode + "b")
+        if mode == "w":
+            stream = zstd.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(raw, closefd=True)
+        else:
+            stream = zstd.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def jsonl_path(path, compression="none"):
+    """
+    dream_city_tech_events.jsonl -> dream_city_tech_events.jsonl.zst for compression='zstd'.
+    """
+    return path + SUFFIX_BY_COMPRESSION[compression]
+
+
+def write_jsonl(path, records):
+    with open_text(path, "w") as f:
+        for r in records:
+            # Ensure Mongo friendly: ISO strings already, no datetime objects
+            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+
+def iter_jsonl(path):
+    with open_text(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+# ------------------------------------------------------------
+# Parquet schemas: (column, path into the record, type name)
+# ------------------------------------------------------------
+TECH_COLUMNS = [
+    ("city",                 ("city",),                         "string"),
+    ("layer",                ("layer",),                        "string"),
+    ("route",                ("route",),                        "string"),
+    ("checkpoint",           ("checkpoint",),                   "string"),
+    ("correlation_id",       ("correlation_id",),               "string"),
+    ("sap_idoc_idoc_type",   ("sap_idoc", "idoc_type"),         "string"),
+    ("sap_idoc_number",      ("sap_idoc", "number"),            "string"),
+    ("sap_idoc_plant",       ("sap_idoc", "plant"),             "string"),
+    ("message_direction",    ("message", "direction"),          "string"),
+    ("message_payload_hash", ("message", "payload_hash"),       "string"),
+    ("message_schema",       ("message", "schema"),             "string"),
+    ("status",               ("status",),                       "string"),
+    ("reason_code",          ("reason_code",),                  "string"),
+    ("event_utc",            ("timestamps", "event_utc"),       "timestamp"),
+    ("endpoint_system",      ("endpoint", "system"),            "string"),
+    ("endpoint_host",        ("endpoint", "host"),              "string"),
+    ("http_status_code",     ("http", "status_code"),           "int32"),
+    ("http_latency_ms",      ("http", "latency_ms"),            "int32"),
+    ("detail",               ("detail",),                       "string"),
+]
+
+BUSINESS_COLUMNS = [
+    ("city",                        ("city",),                                 "string"),
+    ("layer",                       ("layer",),                                "string"),
+    ("process",                     ("process",),                              "string"),
+    ("correlation_id",              ("correlation_id",),                       "string"),
+    ("order_sap_order",             ("order", "sap_order"),                    "string"),
+    ("order_items",                 ("order", "items"),                        "requested_items"),
+    ("sla_response_due_seconds",    ("sla", "response_due_seconds"),           "int32"),
+    ("sla_actual_response_seconds", ("sla", "actual_response_seconds"),        "int32"),
+    ("sla_breach",                  ("sla", "breach"),                         "bool"),
+    ("order_sent_utc",              ("timestamps", "order_sent_utc"),          "timestamp"),
+    ("wms_responded_utc",           ("timestamps", "wms_responded_utc"),       "timestamp"),
+    ("wms_response_status",         ("wms_response", "status"),                "string"),
+    ("wms_response_items",          ("wms_response", "items"),                 "confirmed_items"),
+    ("wms_response_detail",         ("wms_response", "detail"),                "string"),
+    ("status",                      ("status",),                               "string"),
+    ("reason_code",                 ("reason_code",),                          "string"),
+]
+
+ROLLUP_COLUMNS = [
+    ("city",                        ("city",),                                 "string"),
+    ("correlation_id",              ("correlation_id",),                       "string"),
+    ("route",                       ("route",),                                "string"),
+    ("sap_idoc_idoc_type",          ("sap_idoc", "idoc_type"),                 "string"),
+    ("sap_idoc_number",             ("sap_idoc", "number"),                    "string"),
+    ("sap_idoc_plant",              ("sap_idoc", "plant"),                     "string"),
+    ("order_sap_order",             ("order", "sap_order"),                    "string"),
+    ("order_items",                 ("order", "items"),                        "requested_items"),
+    ("tech_health",                 ("tech", "health"),                        "string"),
+    ("tech_last_checkpoint",        ("tech", "last_checkpoint"),               "string"),
+    ("tech_last_status",            ("tech", "last_status"),                   "string"),
+    ("tech_reason_code",            ("tech", "reason_code"),                   "string"),
+    ("business_health",             ("business", "health"),                    "string"),
+    ("business_status",             ("business", "status"),                    "string"),
+    ("business_reason_code",        ("business", "reason_code"),               "string"),
+    ("sla_state",                   ("sla", "state"),                          "string"),
+    ("sla_response_due_seconds",    ("sla", "response_due_seconds"),           "int32"),
+    ("sla_actual_response_seconds", ("sla", "actual_response_seconds"),        "int32"),
+    ("sla_breach",                  ("sla", "breach"),                         "bool"),
+    ("order_sent_utc",              ("timestamps", "order_sent_utc"),          "timestamp"),
+]
+
+COLUMNS_BY_DATASET = {
+    "tech_events"    : TECH_COLUMNS,
+    "business_events": BUSINESS_COLUMNS,
+    "rollup_flows"   : ROLLUP_COLUMNS,
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise RuntimeError(
+            "Parquet output needs the 'pyarrow' package (pip install pyarrow)"
+        ) from exc
+    return pyarrow
+
+
+def _arrow_type(pa, name):
+    if name == "requested_items":
+        return pa.list_(pa.struct([
+            ("sku", pa.string()), ("qty_requested", pa.int32()), ("uom", pa.string()),
+        ]))
+    if name == "confirmed_items":
+        return pa.list_(pa.struct([
+            ("sku", pa.string()), ("qty_confirmed", pa.int32()), ("uom", pa.string()),
+        ]))
+    if name == "timestamp":
+        return pa.timestamp("s", tz="UTC")
+    return {"string": pa.string(), "int32": pa.int32(), "bool": pa.bool_()}[name]
+
+
+def parquet_schema(columns):
+    pa = _pyarrow()
+    return pa.schema([(name, _arrow_type(pa, kind)) for name, _, kind in columns])
+
+
+def _get(record, path):
+    v = record
+    for key in path:
+        if not isinstance(v, dict):
+            return None
+        v = v.get(key)
+    return v
+
+
+def _column(pa, records, path, kind, arrow_type):
+    values = [_get(r, path) for r in records]
+    if kind == "timestamp":
+        values = [v or None for v in values]  # "" (no send time on the record) is not a timestamp
+        parsed = pa.compute.strptime(pa.array(values, pa.string()), format=TS_FORMAT, unit="s")
+        return parsed.cast(arrow_type)
+    return pa.array(values, arrow_type)
+
+
+def _chunks(records, size):
+    it = iter(records)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _tables(pa, records, columns, row_group):
+    schema = parquet_schema(columns)
+    types = [schema.field(name).type for name, _, _ in columns]
+    for chunk in _chunks(records, row_group):
+        arrays = [
+            _column(pa, chunk, col_path, kind, arrow_type)
+            for (_, col_path, kind), arrow_type in zip(columns, types)
+        ]
+        yield pa.Table.from_arrays(arrays, schema=schema)
+
+
+def write_parquet(path, records, columns, row_group=PARQUET_ROW_GROUP):
+    """
+    Flattens records (any iterable) into the fixed `columns` schema and writes them
+    one row group at a time.
+    """
+    pa = _pyarrow()
+    schema = parquet_schema(columns)
+    with pa.parquet.ParquetWriter(path, schema, compression=PARQUET_COMPRESSION) as writer:
+        for table in _tables(pa, records, columns, row_group):
+            writer.write_table(table)
+    return path
+
+
+# ------------------------------------------------------------
+# Streaming (HTTP downloads): bounded memory, first bytes go out immediately
+# ------------------------------------------------------------
+STREAM_ROW_GROUP = 10000
+CSV_CHUNK_ROWS = 2000
+
+
+class _ByteSink(io.RawIOBase):
+    """
+    Write-only file that collects what ParquetWriter emits until drain() hands it out.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def stream_parquet(records, columns, row_group=STREAM_ROW_GROUP):
+    """
+    Parquet file as a generator of byte chunks, one row group at a time.
+    """
+    pa = _pyarrow()
+    sink = _ByteSink()
+    writer = pa.parquet.ParquetWriter(
+        sink, parquet_schema(columns), compression=PARQUET_COMPRESSION,
+    )
+    yield sink.drain()  # magic bytes
+    for table in _tables(pa, records, columns, row_group):
+        writer.write_table(table)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()  # footer
+
+
+def _csv_value(v):
+    if isinstance(v, (list, dict)):
+        return json.dumps(v, ensure_ascii=False)
+    return v
+
+
+def stream_csv(records, columns, chunk_rows=CSV_CHUNK_ROWS):
+    """
+    CSV (header + flattened `columns`) as a generator of text chunks. Lists are JSON encoded.
+    """
+    buf = io.StringIO()
+    out = csv.writer(buf)
+    out.writerow([name for name, _, _ in columns])
+    yield buf.getvalue()
+    for chunk in _chunks(records, chunk_rows):
+        buf.seek(0)
+        buf.truncate()
+        out.writerows([_csv_value(_get(r, path)) for _, path, _ in columns] for r in chunk)
+        yield buf.getvalue()
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from types import ModuleType, FunctionType, BuiltinFunctionType, MethodType
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+from flask import Flask, jsonify, request
+
+# ------------------------------------------------------------
+# Opt-in memory diagnostics
+#   SAP_MONITOR_DIAGNOSTICS=1  -> GET /diagnostics/memory
+#   SAP_MONITOR_TRACEMALLOC=1  -> also tracemalloc snapshots grouped by module
+# ------------------------------------------------------------
+DIAGNOSTICS_ENV = "SAP_MONITOR_DIAGNOSTICS"
+TRACEMALLOC_ENV = "SAP_MONITOR_TRACEMALLOC"
+TRACEMALLOC_TOP = 15
+
+_SKIP_TYPES = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+
+def diagnostics_enabled() -> bool:
+    return os.environ.get(DIAGNOSTICS_ENV, "") not in ("", "0", "false")
+
+
+if os.environ.get(TRACEMALLOC_ENV, "") not in ("", "0", "false") and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+# ------------------------------------------------------------
+# Deep size
+# ------------------------------------------------------------
+def deep_size(obj: Any, seen: Optional[set] = None) -> Tuple[int, int]:
+    """
+    -> (bytes, objects) reachable from obj. Objects already in `seen` are not
+    charged again, so components measured with a shared `seen` report only
+    what they own on top of the earlier ones (e.g. an index over the records).
+    """
+    if seen is None:
+        seen = set()
+    size = 0
+    count = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        oid = id(o)
+        if oid in seen or isinstance(o, _SKIP_TYPES):
+            continue
+        seen.add(oid)
+        size += sys.getsizeof(o)
+        count += 1
+
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif isinstance(o, (str, bytes, int, float, bool)) or o is None:
+            continue
+        else:
+            d = getattr(o, "__dict__", None)
+            if d is not None:
+                stack.append(d)
+            for slot in getattr(type(o), "__slots__", ()):
+                if hasattr(o, slot):
+                    stack.append(getattr(o, slot))
+    return size, count
+
+
+# ------------------------------------------------------------
+# Components (measured in this order; shared objects go to the first one)
+# ------------------------------------------------------------
+def _dash_layouts() -> Dict[str, Any]:
+    import dash
+    return {name: page.get("layout") for name, page in dash.page_registry.items()}
+
+
+def _components() -> List[Tuple[str, Callable[[], Any]]]:
+    import data_store
+    return [
+        ("data_store.records", lambda: [s.records for s in data_store.SHARDS.values()]),
+        ("data_store.by_cid", lambda: [s.by_cid for s in data_store.SHARDS.values()]),
+        ("data_store.sla_trackers", lambda: [s.tracker for s in data_store.SHARDS.values()]),
+        (
+            "ingest.INGEST_BUFFER",
+            lambda: sys.modules["ingest"].INGEST_BUFFER if "ingest" in sys.modules else None,
+        ),
+        ("dash.page_layouts", _dash_layouts),
+    ]
+
+
+_LOCK = threading.Lock()
+_LAST: Dict[str, Dict[str, int]] = {}
+_LAST_TRACE: Optional[tracemalloc.Snapshot] = None
+_LAST_AT: Optional[float] = None
+
+
+def _process_rss_bytes() -> Optional[int]:
+    try:
+        with open(f"/proc/{os.getpid()}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _tracemalloc_report(top: int) -> Optional[Dict[str, Any]]:
+    global _LAST_TRACE
+    if not tracemalloc.is_tracing():
+        return None
+    snap = tracemalloc.take_snapshot().filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen*"),
+        ],
+    )
+    stats = snap.statistics("filename")
+    growth = snap.compare_to(_LAST_TRACE, "filename") if _LAST_TRACE is not None else []
+    _LAST_TRACE = snap
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "traced_bytes": current,
+        "peak_bytes"  : peak,
+        "by_file"     : [
+            {"file": s.traceback[0].filename, "bytes": s.size, "blocks": s.count}
+            for s in stats[:top]
+        ],
+        "growth"      : [
+            {
+                "file"       : s.traceback[0].filename,
+                "bytes_diff" : s.size_diff,
+                "blocks_diff": s.count_diff,
+            }
+            for s in growth[:top] if s.size_diff
+        ],
+    }
+
+
+def memory_report(top: int = TRACEMALLOC_TOP) -> Dict[str, Any]:
+    """
+    Bytes / object counts per data_store component and growth since the previous call.
+    """
+    global _LAST_AT
+    with _LOCK:
+        t0 = time.perf_counter()
+        gc.collect()
+        # before the deep walk, whose bookkeeping would otherwise show up as growth
+        trace = _tracemalloc_report(top)
+        seen: set = set()
+        components: Dict[str, Dict[str, int]] = {}
+        for name, getter in _components():
+            size, count = deep_size(getter(), seen)
+            prev = _LAST.get(name, {})
+            components[name] = {
+                "bytes"         : size,
+                "objects"       : count,
+                "bytes_growth"  : size - prev.get("bytes", size),
+                "objects_growth": count - prev.get("objects", count),
+            }
+            _LAST[name] = {"bytes": size, "objects": count}
+        del seen
+
+        now = time.time()
+        report = {
+            "pid"           : os.getpid(),
+            "rss_bytes"     : _process_rss_bytes(),
+            "components"    : components,
+            "total_bytes"   : sum(c["bytes"] for c in components.values()),
+            "since_last_sec": round(now - _LAST_AT, 1) if _LAST_AT else None,
+            "tracemalloc"   : trace,
+            "measure_ms"    : round((time.perf_counter() - t0) * 1000, 1),
+        }
+        _LAST_AT = now
+        return report
+
+
+# ------------------------------------------------------------
+# Flask route (mounted on the Dash server when enabled)
+# ------------------------------------------------------------
+def register_diagnostics_routes(server: Flask) -> None:
+
+    @server.route("/diagnostics/memory", methods=["GET"])
+    def diagnostics_memory():
+        top = request.args.get("top", default=TRACEMALLOC_TOP, type=int)
+        return jsonify(memory_report(top))
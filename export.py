@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Dict, Iterator, Any, Optional
+
+from flask import Flask, Response, jsonify, request
+
+from data_store import (
+    SLA_NAMES,
+    STATUS_NAMES,
+    get_storage,
+    iter_rollups,
+    live_sla_code,
+    worst_overall,
+)
+from dataset_writers import ROLLUP_COLUMNS, stream_csv, stream_parquet
+
+# ------------------------------------------------------------
+# Export configuration
+# ------------------------------------------------------------
+EXPORT_COLUMNS = [("overall", ("overall",), "string")] + ROLLUP_COLUMNS
+EXPORT_SECTIONS = {
+    "overall" : STATUS_NAMES,
+    "tech"    : STATUS_NAMES,
+    "business": STATUS_NAMES,
+    "sla"     : SLA_NAMES,
+}
+# memory: the loaded records, live SLA state. Records keep no route, order items or
+#         IDoc type, so those columns are empty (use source=store for them).
+# store : every stored rollup from the storage backend, all columns, SLA state as stored.
+SOURCES = ("memory", "store", "mongo")  # "mongo" is the old name of "store"
+
+CONTENT_TYPES = {
+    "csv"    : "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def valid_tile(tile_id: str) -> bool:
+    section, _, value = tile_id.partition("_")
+    return value.upper() in EXPORT_SECTIONS.get(section, ())
+
+
+# ------------------------------------------------------------
+# Sources: rollup documents, one at a time
+# ------------------------------------------------------------
+def memory_docs(tile_id: str, city: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    The in-memory records behind the tile (live SLA state, like the tile counts).
+    Only the fields a record keeps: route, order items and IDoc type stay empty.
+    """
+    for r in iter_rollups(tile_id, city):
+        doc = r.to_doc()
+        doc["overall"] = STATUS_NAMES[r.overall]
+        doc["sla"]["state"] = SLA_NAMES[live_sla_code(r)]
+        yield doc
+
+
+def store_docs(tile_id: str, city: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Every stored rollup behind the tile (not capped at LIMIT) from the storage backend;
+    SLA state as stored.
+    """
+    for doc in get_storage().iter_tile_docs(tile_id, city):
+        doc["overall"] = worst_overall(doc)
+        yield doc
+
+
+# ------------------------------------------------------------
+# Flask route (mounted on the Dash server)
+# ------------------------------------------------------------
+def register_export_routes(server: Flask) -> None:
+
+    @server.route("/export/<tile_id>", methods=["GET"])
+    def export_tile(tile_id: str):
+        fmt = request.args.get("format", "csv").lower()
+        source = request.args.get("source", "memory").lower()
+        city = request.args.get("city") or None
+        if not valid_tile(tile_id):
+            return jsonify({"error": f"unknown tile: {tile_id}"}), 400
+        if fmt not in CONTENT_TYPES:
+            return jsonify({"error": f"unknown format: {fmt} (csv, parquet)"}), 400
+        if source not in SOURCES:
+            return jsonify({"error": f"unknown source: {source} (memory, store)"}), 400
+
+        docs = memory_docs(tile_id, city) if source == "memory" else store_docs(tile_id, city)
+        if fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401  (fail before the download starts)
+            except ImportError:
+                return jsonify({"error": "Parquet export needs pyarrow on the server"}), 501
+            body = stream_parquet(docs, EXPORT_COLUMNS)
+        else:
+            body = (chunk.encode("utf-8") for chunk in stream_csv(docs, EXPORT_COLUMNS))
+
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        prefix = f"{city}_" if city else ""
+        return Response(
+            body,
+            mimetype=CONTENT_TYPES[fmt],
+            headers={
+                "Content-Disposition": f'attachment; filename="{prefix}{tile_id}_{stamp}.{fmt}"',
+                "Cache-Control"      : "no-store",
+                "X-Accel-Buffering"  : "no",  # let a fronting nginx pass chunks through
+            },
+        )
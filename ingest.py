@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
+
+from flask import Flask, request, jsonify
+from pymongo.errors import (
+    AutoReconnect,
+    BulkWriteError,
+    NetworkTimeout,
+    PyMongoError,
+    ServerSelectionTimeoutError,
+)
+
+from data_store import (
+    BUSINESS_EVENTS_COLLECTION,
+    DB_NAME,
+    PARTITION_BY_DAY,
+    TECH_EVENTS_COLLECTION,
+    TIME_FIELDS,
+    get_client,
+    track_close,
+    track_open,
+)
+from latency import LATENCY
+from partitions import group_by_partition, invalidate
+
+# ------------------------------------------------------------
+# Ingestion configuration
+# ------------------------------------------------------------
+MAX_BATCH_EVENTS = 5000  # per POST
+BUFFER_MAX_EVENTS = 50000  # above this producers get 429
+FLUSH_BATCH = 1000  # events per bulk write
+FLUSH_INTERVAL_SEC = 0.5
+RETRY_AFTER_SEC = 1
+MAX_WRITE_ATTEMPTS = 8  # consecutive failed flushes before the pending events are dropped
+RECENT_REJECTS = 20  # rejected events kept for /ingest/metrics
+
+# Retried with backoff; any other write error rejects the events it hit
+TRANSIENT_WRITE_ERRORS = (AutoReconnect, ServerSelectionTimeoutError, NetworkTimeout)
+
+COLLECTION_BY_LAYER = {
+    "TECH"    : TECH_EVENTS_COLLECTION,
+    "BUSINESS": BUSINESS_EVENTS_COLLECTION,
+}
+
+
+# ------------------------------------------------------------
+# Validation (shapes of make_tech_events / make_business_event)
+# ------------------------------------------------------------
+def validate_event(e: Any) -> Optional[str]:
+    """
+    Returns an error message, or None when the event is acceptable.
+    """
+    if not isinstance(e, dict):
+        return "event is not an object"
+    if not isinstance(e.get("correlation_id"), str) or not e["correlation_id"]:
+        return "missing correlation_id"
+    if not isinstance(e.get("status"), str):
+        return "missing status"
+
+    layer = e.get("layer")
+    ts = e.get("timestamps")
+    if not isinstance(ts, dict):
+        return "missing timestamps"
+
+    if layer == "TECH":
+        if not isinstance(e.get("checkpoint"), str):
+            return "missing checkpoint"
+        if not ts.get("event_utc"):
+            return "missing timestamps.event_utc"
+        return None
+
+    if layer == "BUSINESS":
+        sla = e.get("sla")
+        if not isinstance(sla, dict) or "response_due_seconds" not in sla:
+            return "missing sla.response_due_seconds"
+        if not ts.get("order_sent_utc"):
+            return "missing timestamps.order_sent_utc"
+        return None
+
+    return f"unknown layer: {layer!r}"
+
+
+def parse_batch(body: bytes) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    NDJSON body -> (events, errors). Errors carry the 1-based line number.
+    """
+    events: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    for n, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            e = json.loads(line)
+        except ValueError as exc:
+            errors.append(f"line {n}: invalid JSON ({exc})")
+            continue
+        err = validate_event(e)
+        if err:
+            errors.append(f"line {n}: {err}")
+        else:
+            events.append(e)
+    return events, errors
+
+
+# ------------------------------------------------------------
+# In-memory buffer + background bulk writer
+# ------------------------------------------------------------
+class IngestBuffer:
+    def __init__(
+        self,
+        max_events: int = BUFFER_MAX_EVENTS,
+        flush_batch: int = FLUSH_BATCH,
+        flush_interval: float = FLUSH_INTERVAL_SEC,
+    ):
+        self.max_events = max_events
+        self.flush_batch = flush_batch
+        self.flush_interval = flush_interval
+
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+
+        self._started_at = time.monotonic()
+        self._rate = 0.0  # EWMA of written events/sec
+        self._metrics: Dict[str, Any] = {
+            "accepted_events"  : 0,
+            "rejected_batches" : 0,
+            "throttled_batches": 0,
+            "written_events"   : 0,
+            "rejected_events"  : 0,
+            "write_errors"     : 0,
+            "flushes"          : 0,
+            "last_flush_ms"    : 0.0,
+        }
+        self._rejects: deque = deque(maxlen=RECENT_REJECTS)
+
+    # --------------------------------------------------------
+    # Producer side
+    # --------------------------------------------------------
+    def offer(self, events: List[Dict[str, Any]]) -> bool:
+        """
+        All-or-nothing enqueue. False means the buffer is full (backpressure).
+        """
+        with self._cond:
+            if len(self._queue) + len(events) > self.max_events:
+                self._metrics["throttled_batches"] += 1
+                return False
+            self._queue.extend(events)
+            self._metrics["accepted_events"] += len(events)
+            if len(self._queue) >= self.flush_batch:
+                self._cond.notify()
+        return True
+
+    def reject(self) -> None:
+        with self._cond:
+            self._metrics["rejected_batches"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            m = dict(self._metrics)
+            m["queue_depth"] = len(self._queue)
+            m["queue_capacity"] = self.max_events
+            m["recent_rejects"] = list(self._rejects)
+        m["write_rate_eps"] = round(self._rate, 1)
+        m["uptime_sec"] = round(time.monotonic() - self._started_at, 1)
+        return m
+
+    # --------------------------------------------------------
+    # Writer side
+    # --------------------------------------------------------
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _take(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            if len(self._queue) < self.flush_batch and not self._stop:
+                self._cond.wait(self.flush_interval)
+            n = min(len(self._queue), self.flush_batch)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _requeue(self, batch: List[Dict[str, Any]]) -> None:
+        with self._cond:
+            self._queue.extendleft(reversed(batch))
+
+    def _reject(self, rejected: List[Tuple[Dict[str, Any], str]]) -> None:
+        with self._cond:
+            self._metrics["rejected_events"] += len(rejected)
+            for e, error in rejected:
+                self._rejects.append(
+                    {"correlation_id": e.get("correlation_id"), "error": error[:200]}
+                )
+
+    def _run(self) -> None:
+        backoff = 0.5
+        attempts = 0
+        while True:
+            batch = self._take()
+            if not batch:
+                if self._stop:
+                    return
+                continue
+
+            t0 = time.monotonic()
+            written, rejected, pending = write_events(batch)
+            elapsed = time.monotonic() - t0
+            if rejected:
+                self._reject(rejected)
+            with self._cond:
+                self._metrics["written_events"] += written
+                self._metrics["flushes"] += 1
+                self._metrics["last_flush_ms"] = round(elapsed * 1000, 1)
+            inst = written / max(elapsed, 1e-6)
+            self._rate = inst if self._rate == 0 else 0.8 * self._rate + 0.2 * inst
+
+            if not pending:
+                attempts = 0
+                backoff = 0.5
+                continue
+            attempts += 1
+            with self._cond:
+                self._metrics["write_errors"] += 1
+            if attempts >= MAX_WRITE_ATTEMPTS:
+                self._reject([(e, f"not written after {attempts} attempts") for e in pending])
+                attempts = 0
+                backoff = 0.5
+                continue
+            for e in pending:
+                e.pop("_id", None)  # stamped by the failed insert_many
+            self._requeue(pending)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 10.0)
+
+
+def write_events(
+    events: List[Dict[str, Any]],
+    partitioned: bool = PARTITION_BY_DAY,
+) -> Tuple[int, List[Tuple[Dict[str, Any], str]], List[Dict[str, Any]]]:
+    """
+    One unordered bulk insert per target collection (per day partition when partitioned).
+    Returns (written, rejected, pending): rejected are (event, error) pairs the server
+    refused (duplicate / invalid documents, non-transient errors), pending the events of
+    the collections a transient error left unwritten, to be retried.
+    """
+    db = get_client()[DB_NAME]
+    by_layer: Dict[str, List[Dict[str, Any]]] = {}
+    for e in events:
+        by_layer.setdefault(e["layer"], []).append(e)
+
+    groups: List[Tuple[str, List[Dict[str, Any]]]] = []
+    for layer, docs in by_layer.items():
+        base = COLLECTION_BY_LAYER[layer]
+        if partitioned:
+            groups.extend(group_by_partition(docs, base, TIME_FIELDS[base]).items())
+        else:
+            groups.append((base, docs))
+
+    written = 0
+    rejected: List[Tuple[Dict[str, Any], str]] = []
+    try:
+        for i, (name, docs) in enumerate(groups):
+            try:
+                written += len(db[name].insert_many(docs, ordered=False).inserted_ids)
+            except BulkWriteError as exc:
+                # unordered: everything but the listed documents went in
+                written += exc.details.get("nInserted", 0)
+                rejected.extend(
+                    (docs[err["index"]], err.get("errmsg", ""))
+                    for err in exc.details.get("writeErrors", [])
+                )
+            except TRANSIENT_WRITE_ERRORS:
+                return written, rejected, [e for _, group in groups[i:] for e in group]
+            except PyMongoError as exc:
+                rejected.extend((e, str(exc)) for e in docs)
+        return written, rejected, []
+    finally:
+        if partitioned:
+            for layer in by_layer:
+                invalidate(COLLECTION_BY_LAYER[layer])  # a new day may have started
+
+
+def track_sla(events: List[Dict[str, Any]]) -> None:
+    """
+    Business events drive their city's live SLA tracker: no response yet -> open, response -> close.
+    """
+    for e in events:
+        if e.get("layer") != "BUSINESS":
+            continue
+        sla = e.get("sla") or {}
+        if sla.get("actual_response_seconds") is None and not sla.get("breach"):
+            track_open(
+                e.get("city"),
+                e["correlation_id"],
+                e["timestamps"].get("order_sent_utc"),
+                sla.get("response_due_seconds") or 0,
+            )
+        else:
+            track_close(e.get("city"), e["correlation_id"])
+
+
+INGEST_BUFFER = IngestBuffer()
+
+
+# ------------------------------------------------------------
+# Flask routes (mounted on the Dash server)
+# ------------------------------------------------------------
+def register_ingest_routes(server: Flask, buffer: IngestBuffer = INGEST_BUFFER) -> None:
+
+    @server.route("/ingest/events", methods=["POST"])
+    def ingest_events():
+        events, errors = parse_batch(request.get_data())
+        if errors:
+            buffer.reject()
+            return jsonify({"accepted": 0, "errors": errors[:50]}), 400
+        if len(events) > MAX_BATCH_EVENTS:
+            buffer.reject()
+            error = f"batch larger than {MAX_BATCH_EVENTS} events"
+            return jsonify({"accepted": 0, "errors": [error]}), 413
+        if not buffer.offer(events):
+            resp = jsonify({"accepted": 0, "errors": ["ingest buffer full, retry later"]})
+            resp.headers["Retry-After"] = str(RETRY_AFTER_SEC)
+            return resp, 429
+        track_sla(events)
+        LATENCY.add_events(events)
+        return jsonify({"accepted": len(events)}), 202
+
+    @server.route("/ingest/metrics", methods=["GET"])
+    def ingest_metrics():
+        return jsonify(buffer.metrics())
+
+    buffer.start()
@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from data_store import DEFAULT_CITY, STORAGE_ERRORS, get_storage
+from sla_tracker import parse_utc
+
+# ------------------------------------------------------------
+# Per-hop latency along SAP -> PO -> FW -> SCX -> WMS
+#   A hop is the time between two checkpoints of the same flow (first
+#   occurrence of each). Durations go into mergeable quantile sketches keyed
+#   by (city, plant, UTC hour of the hop start, hop), so p50/p95/p99 for any
+#   filter is a merge of a few sketches instead of a rescan of the events.
+# ------------------------------------------------------------
+HOPS: List[Tuple[str, str]] = [
+    ("SAP_IDOC_CREATED", "SAP_PO_RECEIVED"),          # SAP -> PO
+    ("SAP_PO_RECEIVED", "PO_SENT_HTTP"),              # PO mapping
+    ("PO_SENT_HTTP", "FW_EGRESS_ALLOWED"),            # firewall
+    ("PO_SENT_HTTP", "SCXCONNECT_RECEIVED"),          # PO -> SCX
+    ("SCXCONNECT_RECEIVED", "SCXCONNECT_HTTP_ACK"),   # SCX ack
+    ("SCXCONNECT_HTTP_ACK", "WMS_INGESTED"),          # SCX -> WMS
+    ("SAP_IDOC_CREATED", "WMS_INGESTED"),             # end to end
+]
+HTTP_ACK_HOP = "SCXCONNECT_HTTP_ACK (http)"  # http.latency_ms as reported on the ack
+HOP_NAMES: List[str] = [f"{a}→{b}" for a, b in HOPS] + [HTTP_ACK_HOP]
+
+QUANTILES = (0.5, 0.95, 0.99)
+RELATIVE_ACCURACY = 0.01
+MAX_OPEN_FLOWS = 100_000  # flows waiting for more checkpoints (oldest dropped first)
+LOAD_BATCH_SIZE = 5000
+
+HOUR_FORMAT = "%Y-%m-%dT%H"
+
+_HOPS_BY_CHECKPOINT: Dict[str, List[Tuple[int, str, str]]] = {}
+for _i, (_a, _b) in enumerate(HOPS):
+    _HOPS_BY_CHECKPOINT.setdefault(_a, []).append((_i, _a, _b))
+    _HOPS_BY_CHECKPOINT.setdefault(_b, []).append((_i, _a, _b))
+
+
+# ------------------------------------------------------------
+# Quantile sketch
+# ------------------------------------------------------------
+class QuantileSketch:
+    """
+    Log-bucketed sketch (DDSketch style): value v > 0 is counted in bucket
+    ceil(log_gamma(v)), so every quantile is within RELATIVE_ACCURACY of the true
+    value. Sketches merge by adding bucket counts.
+    """
+
+    __slots__ = ("bins", "zeros", "count", "total", "min", "max")
+
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+
+    def __init__(self):
+        self.bins: Dict[int, int] = {}
+        self.zeros = 0  # values <= 0 (checkpoints logged in the same second)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, n: int = 1) -> None:
+        if value <= 0:
+            self.zeros += n
+        else:
+            k = math.ceil(math.log(value) / self.LOG_GAMMA)
+            self.bins[k] = self.bins.get(k, 0) + n
+        self.count += n
+        self.total += value * n
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for k, n in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return max(self.min, 0.0)
+        seen = self.zeros
+        for k in sorted(self.bins):
+            seen += self.bins[k]
+            if seen > rank:
+                value = 2 * self.GAMMA ** k / (self.GAMMA + 1)  # middle of (gamma^(k-1), gamma^k]
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bins" : {str(k): n for k, n in self.bins.items()},
+            "zeros": self.zeros,
+            "count": self.count,
+            "total": self.total,
+            "min"  : self.min if self.count else None,
+            "max"  : self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "QuantileSketch":
+        s = cls()
+        s.bins = {int(k): int(n) for k, n in d.get("bins", {}).items()}
+        s.zeros = int(d.get("zeros", 0))
+        s.count = int(d.get("count", 0))
+        s.total = float(d.get("total", 0.0))
+        if s.count:
+            s.min = float(d["min"])
+            s.max = float(d["max"])
+        return s
+
+
+# ------------------------------------------------------------
+# Streaming hop index
+# ------------------------------------------------------------
+SketchKey = Tuple[str, str, str, str]  # (city, plant, hour, hop)
+
+
+class LatencyIndex:
+    def __init__(self, max_open_flows: int = MAX_OPEN_FLOWS):
+        self.max_open_flows = max_open_flows
+        # correlation_id -> (city, plant, {checkpoint: event ts})
+        self._flows: "OrderedDict[str, Tuple[str, str, Dict[str, float]]]" = OrderedDict()
+        self._sketches: Dict[SketchKey, QuantileSketch] = {}
+        self._lock = threading.Lock()
+        self.events = 0
+        self.hops = 0
+
+    def __len__(self) -> int:
+        return len(self._sketches)
+
+    def _record(self, city: str, plant: str, start_ts: float, hop: str, value_ms: float) -> None:
+        hour = time.strftime(HOUR_FORMAT, time.gmtime(start_ts))
+        key = (city, plant, hour, hop)
+        sketch = self._sketches.get(key)
+        if sketch is None:
+            sketch = self._sketches[key] = QuantileSketch()
+        sketch.add(value_ms)
+        self.hops += 1
+
+    def add_event(self, e: Dict[str, Any]) -> None:
+        """
+        One tech event (any order within a flow; repeated checkpoints keep their first time).
+        """
+        cid = e.get("correlation_id")
+        checkpoint = e.get("checkpoint")
+        sent = parse_utc((e.get("timestamps") or {}).get("event_utc"))
+        if not cid or not checkpoint or sent is None:
+            return
+        ts = sent.timestamp()
+
+        with self._lock:
+            self.events += 1
+            flow = self._flows.get(cid)
+            if flow is None:
+                plant = (e.get("sap_idoc") or {}).get("plant") or ""
+                flow = self._flows[cid] = (e.get("city") or DEFAULT_CITY, plant, {})
+                if len(self._flows) > self.max_open_flows:
+                    self._flows.popitem(last=False)
+            else:
+                self._flows.move_to_end(cid)
+            city, plant, seen = flow
+            if checkpoint in seen:
+                return
+            seen[checkpoint] = ts
+
+            for i, a, b in _HOPS_BY_CHECKPOINT.get(checkpoint, ()):
+                if a in seen and b in seen and seen[b] >= seen[a]:
+                    self._record(city, plant, seen[a], HOP_NAMES[i], (seen[b] - seen[a]) * 1000.0)
+
+            latency_ms = (e.get("http") or {}).get("latency_ms")
+            if checkpoint == "SCXCONNECT_HTTP_ACK" and latency_ms is not None:
+                self._record(city, plant, ts, HTTP_ACK_HOP, float(latency_ms))
+
+            # the flow is complete once both ends of the route are in
+            if "SAP_IDOC_CREATED" in seen and "WMS_INGESTED" in seen:
+                del self._flows[cid]
+
+    def add_events(self, events: Iterable[Dict[str, Any]]) -> None:
+        for e in events:
+            if e.get("layer", "TECH") == "TECH":
+                self.add_event(e)
+
+    # --------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------
+    def _matching(
+        self,
+        city: Optional[str],
+        plant: Optional[str],
+        since_hour: Optional[str],
+    ) -> List[Tuple[SketchKey, QuantileSketch]]:
+        with self._lock:
+            items = list(self._sketches.items())
+        return [
+            (key, s) for key, s in items
+            if (not city or key[0] == city)
+            and (not plant or key[1] == plant)
+            and (not since_hour or key[2] >= since_hour)
+        ]
+
+    def summary(
+        self,
+        city: Optional[str] = None,
+        plant: Optional[str] = None,
+        since_hour: Optional[str] = None,
+        quantiles: Tuple[float, ...] = QUANTILES,
+    ) -> List[Dict[str, Any]]:
+        """
+        One row per hop: count, mean, p50/p95/p99 (ms) over the matching sketches.
+        """
+        merged: Dict[str, QuantileSketch] = {hop: QuantileSketch() for hop in HOP_NAMES}
+        for (_, _, _, hop), s in self._matching(city, plant, since_hour):
+            merged[hop].merge(s)
+        return [_row(hop, s, quantiles) for hop, s in merged.items()]
+
+    def series(
+        self,
+        hop: str,
+        city: Optional[str] = None,
+        plant: Optional[str] = None,
+        since_hour: Optional[str] = None,
+        quantiles: Tuple[float, ...] = QUANTILES,
+    ) -> List[Dict[str, Any]]:
+        """
+        Per-hour quantiles of one hop, oldest hour first.
+        """
+        by_hour: Dict[str, QuantileSketch] = {}
+        for (_, _, hour, h), s in self._matching(city, plant, since_hour):
+            if h == hop:
+                by_hour.setdefault(hour, QuantileSketch()).merge(s)
+        return [dict(_row(hop, by_hour[hour], quantiles), hour=hour) for hour in sorted(by_hour)]
+
+    def dimensions(self) -> Dict[str, List[str]]:
+        with self._lock:
+            keys = list(self._sketches)
+        return {
+            "cities": sorted({k[0] for k in keys}),
+            "plants": sorted({k[1] for k in keys if k[1]}),
+            "hours" : sorted({k[2] for k in keys}),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Sketches as JSON-ready dicts (another worker merges them with merge_dict).
+        """
+        with self._lock:
+            return {"|".join(key): s.to_dict() for key, s in self._sketches.items()}
+
+    def merge_dict(self, data: Dict[str, Any]) -> None:
+        with self._lock:
+            for key_str, d in data.items():
+                key = tuple(key_str.split("|", 3))
+                sketch = self._sketches.get(key)
+                if sketch is None:
+                    sketch = self._sketches[key] = QuantileSketch()
+                sketch.merge(QuantileSketch.from_dict(d))
+
+
+def _row(hop: str, s: QuantileSketch, quantiles: Tuple[float, ...]) -> Dict[str, Any]:
+    row: Dict[str, Any] = {"hop": hop, "count": s.count, "mean_ms": _round(s.mean())}
+    for q in quantiles:
+        row[f"p{round(q * 100):g}_ms"] = _round(s.quantile(q))
+    row["max_ms"] = _round(s.max if s.count else None)
+    return row
+
+
+def _round(v: Optional[float]) -> Optional[float]:
+    return None if v is None else round(v, 1)
+
+
+LATENCY = LatencyIndex()
+
+
+# ------------------------------------------------------------
+# Initial load: tech events of the rollup window, streamed in batches
+# (new events arrive through ingest.track_latency afterwards)
+# ------------------------------------------------------------
+LATENCY_PROJECTION: Dict[str, int] = {
+    "_id"                 : 0,
+    "correlation_id"      : 1,
+    "city"                : 1,
+    "checkpoint"          : 1,
+    "sap_idoc.plant"      : 1,
+    "http.latency_ms"     : 1,
+    "timestamps.event_utc": 1,
+}
+
+
+def load_latency(index: LatencyIndex = LATENCY, batch_size: int = LOAD_BATCH_SIZE) -> int:
+    """
+    Feeds the tech events of the last ROLLUP_WINDOW_DAYS into index. Returns the event count.
+    """
+    n = 0
+    for e in get_storage().iter_tech_events(batch_size, LATENCY_PROJECTION):
+        index.add_event(e)
+        n += 1
+    return n
+
+
+_LOADER: Optional[threading.Thread] = None
+
+
+def start_latency_loader() -> None:
+    global _LOADER
+    if _LOADER is not None:
+        return
+
+    def run() -> None:
+        started = time.monotonic()
+        try:
+            n = load_latency()
+        except STORAGE_ERRORS as exc:
+            print(f"[latency] load failed: {exc}", file=sys.stderr)
+            return
+        print(
+            f"[latency] {n} tech events -> {LATENCY.hops} hops in {len(LATENCY)} sketches "
+            f"({time.monotonic() - started:.1f}s)",
+            file=sys.stderr,
+        )
+
+    _LOADER = threading.Thread(target=run, name="latency-load", daemon=True)
+    _LOADER.start()
@@ -0,0 +1,322 @@
+# loadtest_callbacks.py
+# ------------------------------------------------------------
+# Concurrent-user load test for the dashboard callbacks.
+#
+# Every simulated operator repeats the real click path over HTTP:
+#   select_tile -> update_grid -> (think) -> go_detail -> detail page -> (think)
+# Each scenario runs N users for a fixed duration and reports p50/p95/p99
+# latency per callback, throughput and the server's resident memory.
+#
+# Run (app started locally on synthetic data, e.g. `python app.py`):
+#   python loadtest_callbacks.py --users 1,5,10,25 --duration 60 --server-pid <pid>
+# ------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Any, Optional
+
+TILES = [
+    "overall_GREEN", "overall_AMBER", "overall_RED",
+    "tech_RED", "business_RED", "sla_BREACH",
+]
+
+ALL_CITIES = "ALL"  # the dashboard's city selector value for the combined view
+
+CALLBACKS = ("select_tile", "update_grid", "go_detail", "detail_page")
+
+
+# ------------------------------------------------------------
+# Dash callback payloads (same shapes the browser sends)
+# ------------------------------------------------------------
+def _tile_prop_id(tile_id: str) -> str:
+    return json.dumps({"id": tile_id, "type": "tile"}, separators=(",", ":")) + ".n_clicks"
+
+
+def select_tile_payload(tile_id: str, clicks: int) -> Dict[str, Any]:
+    return {
+        "output"        : "selected_tile.data",
+        "outputs"       : {"id": "selected_tile", "property": "data"},
+        "inputs"        : [
+            [
+                {
+                    "id"      : {"id": t, "type": "tile"},
+                    "property": "n_clicks",
+                    "value"   : clicks if t == tile_id else 0,
+                }
+                for t in TILES
+            ],
+        ],
+        "changedPropIds": [_tile_prop_id(tile_id)],
+        "state"         : [],
+    }
+
+
+def update_grid_payload(tile_id: str, city: str = ALL_CITIES) -> Dict[str, Any]:
+    return {
+        "output"        : "..grid.rowData...active_filter.children..",
+        "outputs"       : [
+            {"id": "grid", "property": "rowData"},
+            {"id": "active_filter", "property": "children"},
+        ],
+        "inputs"        : [
+            {"id": "selected_tile", "property": "data", "value": tile_id},
+            {"id": "city", "property": "value", "value": city},
+        ],
+        "changedPropIds": ["selected_tile.data"],
+        "state"         : [],
+    }
+
+
+def go_detail_payload(row: Dict[str, Any]) -> Dict[str, Any]:
+    # rowId as the dashboard grid's getRowId builds it
+    row_id = f"{row['node_type']}:{row.get('correlation_id') or row['sap_order']}"
+    return {
+        "output"        : "_pages_location.pathname",
+        "outputs"       : {"id": "_pages_location", "property": "pathname"},
+        "inputs"        : [
+            {"id": "grid", "property": "cellClicked", "value": {"rowId": row_id, "colId": "value"}},
+        ],
+        "changedPropIds": ["grid.cellClicked"],
+        "state"         : [
+            {"id": "_pages_location", "property": "pathname", "value": "/"},
+        ],
+    }
+
+
+def page_payload(pathname: str) -> Dict[str, Any]:
+    return {
+        "output"        : ".._pages_content.children..._pages_store.data..",
+        "outputs"       : [
+            {"id": "_pages_content", "property": "children"},
+            {"id": "_pages_store", "property": "data"},
+        ],
+        "inputs"        : [
+            {"id": "_pages_location", "property": "pathname", "value": pathname},
+            {"id": "_pages_location", "property": "search", "value": ""},
+        ],
+        "changedPropIds": ["_pages_location.pathname"],
+        "state"         : [],
+    }
+
+
+# ------------------------------------------------------------
+# Measurements
+# ------------------------------------------------------------
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+def server_rss_mb(pid: Optional[int]) -> Optional[float]:
+    """
+    Resident set size of the app process from /proc (Linux only).
+    """
+    if not pid:
+        return None
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        return None
+    return None
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {name: [] for name in CALLBACKS}
+        self.errors: Dict[str, int] = {name: 0 for name in CALLBACKS}
+
+    def ok(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.latencies[name].append(seconds)
+
+    def fail(self, name: str) -> None:
+        with self._lock:
+            self.errors[name] += 1
+
+
+class MemorySampler(threading.Thread):
+    def __init__(self, pid: Optional[int], every: float = 0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.every = every
+        self.peak_mb = server_rss_mb(pid)
+        self._stop_evt = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_evt.wait(self.every):
+            rss = server_rss_mb(self.pid)
+            if rss is not None:
+                self.peak_mb = max(self.peak_mb or 0.0, rss)
+
+    def stop(self) -> None:
+        self._stop_evt.set()
+
+
+# ------------------------------------------------------------
+# Simulated operator
+# ------------------------------------------------------------
+def post_callback(base_url: str, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    req = urllib.request.Request(
+        base_url.rstrip("/") + "/_dash-update-component",
+        data=json.dumps(payload).encode("utf-8"),
+        method="POST",
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        body = resp.read()
+    return json.loads(body) if body else {}
+
+
+def think(mean_sec: float) -> None:
+    if mean_sec > 0:
+        time.sleep(min(random.expovariate(1.0 / mean_sec), mean_sec * 5))
+
+
+def user_loop(
+    base_url: str, rec: Recorder, stop_at: float, think_sec: float, timeout: float,
+) -> None:
+    clicks = 0
+    while time.monotonic() < stop_at:
+        tile_id = random.choice(TILES)
+        clicks += 1
+
+        def timed(name: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            t0 = time.perf_counter()
+            try:
+                out = post_callback(base_url, payload, timeout)
+            except (urllib.error.URLError, OSError, ValueError):
+                rec.fail(name)
+                return None
+            rec.ok(name, time.perf_counter() - t0)
+            return out
+
+        if timed("select_tile", select_tile_payload(tile_id, clicks)) is None:
+            think(think_sec)
+            continue
+
+        out = timed("update_grid", update_grid_payload(tile_id))
+        rows = (((out or {}).get("response") or {}).get("grid") or {}).get("rowData") or []
+        think(think_sec)
+
+        flows = [r for r in rows if r.get("node_type") == "FLOW"]
+        if not flows or time.monotonic() >= stop_at:
+            continue
+
+        out = timed("go_detail", go_detail_payload(random.choice(flows)))
+        path = (((out or {}).get("response") or {}).get("_pages_location") or {}).get("pathname")
+        if path:
+            timed("detail_page", page_payload(path))
+        think(think_sec)
+
+
+def run_scenario(
+    base_url: str,
+    users: int,
+    duration: float,
+    think_sec: float,
+    timeout: float,
+    pid: Optional[int],
+) -> Dict[str, Any]:
+    rec = Recorder()
+    sampler = MemorySampler(pid)
+    rss_before = server_rss_mb(pid)
+    sampler.start()
+
+    stop_at = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=user_loop, args=(base_url, rec, stop_at, think_sec, timeout), daemon=True,
+        )
+        for _ in range(users)
+    ]
+    t0 = time.monotonic()
+    for t in threads:
+        t.start()
+        time.sleep(min(0.05, think_sec / max(users, 1)))  # ramp up, avoid a thundering start
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - t0
+    sampler.stop()
+
+    report: Dict[str, Any] = {
+        "users"        : users,
+        "elapsed_sec"  : round(elapsed, 1),
+        "requests"     : sum(len(v) for v in rec.latencies.values()),
+        "errors"       : sum(rec.errors.values()),
+        "rss_before_mb": rss_before,
+        "rss_after_mb" : server_rss_mb(pid),
+        "rss_peak_mb"  : sampler.peak_mb,
+        "callbacks"    : {},
+    }
+    report["throughput_rps"] = round(report["requests"] / max(elapsed, 1e-9), 1)
+    for name in CALLBACKS:
+        lat = sorted(rec.latencies[name])
+        report["callbacks"][name] = {
+            "count" : len(lat),
+            "errors": rec.errors[name],
+            "p50_ms": round(percentile(lat, 50) * 1000, 1),
+            "p95_ms": round(percentile(lat, 95) * 1000, 1),
+            "p99_ms": round(percentile(lat, 99) * 1000, 1),
+        }
+    return report
+
+
+def print_report(r: Dict[str, Any]) -> None:
+    rss = "n/a"
+    if r["rss_peak_mb"] is not None:
+        rss = (
+            f"{r['rss_before_mb']:.0f} -> {r['rss_after_mb']:.0f} MB "
+            f"(peak {r['rss_peak_mb']:.0f})"
+        )
+    print(f"\n== {r['users']} users, {r['elapsed_sec']}s: {r['throughput_rps']} req/s, "
+          f"{r['errors']} errors, server RSS {rss}")
+    print(f"   {'callback':<12} {'count':>7} {'err':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, c in r["callbacks"].items():
+        print(f"   {name:<12} {c['count']:>7} {c['errors']:>5} "
+              f"{c['p50_ms']:>9} {c['p95_ms']:>9} {c['p99_ms']:>9}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(
+        description="Drive the dashboard callbacks with N simulated operators.",
+    )
+    ap.add_argument("--url", default="http://127.0.0.1:8050")
+    ap.add_argument(
+        "--users", default="1,5,10,25", help="comma separated user counts, one scenario each",
+    )
+    ap.add_argument("--duration", type=float, default=60.0, help="seconds per scenario")
+    ap.add_argument(
+        "--think", type=float, default=2.0, help="mean think time between clicks (seconds)",
+    )
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--server-pid", type=int, default=None, help="app process id, for RSS sampling")
+    ap.add_argument("--json", action="store_true", help="print the reports as JSON")
+    args = ap.parse_args(argv)
+
+    reports = []
+    for users in [int(u) for u in args.users.split(",") if u.strip()]:
+        r = run_scenario(args.url, users, args.duration, args.think, args.timeout, args.server_pid)
+        reports.append(r)
+        if not args.json:
+            print_report(r)
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+from typing import Dict, Any, List, Optional
+
+import dash
+from dash import html, dcc, Input, Output, State, callback, callback_context
+from dash.exceptions import PreventUpdate
+import dash_ag_grid as dag
+import dash_bootstrap_components as dbc
+from pymongo.errors import PyMongoError
+
+from actions import ACTION_MAX_FLOWS, ACTION_NAMES, ACTION_QUEUE, ACTIONS, ITEM_STATE_NAMES
+from data_store import city_names, iter_rollups
+
+dash.register_page(__name__, path="/actions", name="פעולות מרוכזות")
+
+ALL = "ALL"
+SELECTIONS = {
+    "tech_RED"      : "כשל טכני (אדום)",
+    "business_RED"  : "כשל עסקי (אדום)",
+    "business_AMBER": "חריגה עסקית (כתום)",
+    "sla_BREACH"    : "הפרת SLA",
+    "overall_RED"   : "כל התהליכים האדומים",
+}
+CONFIRM_OVER = 100  # jobs larger than this (and every DELETE) are confirmed first
+
+
+def selected(value: Optional[str]) -> Optional[str]:
+    return None if not value or value == ALL else value
+
+
+def selection(
+    tile_id: str, city: Optional[str], plant: Optional[str], reason: Optional[str],
+) -> List[str]:
+    """
+    correlation_ids of the loaded flows behind the tile, narrowed by plant / reason code.
+    """
+    cids: List[str] = []
+    for r in iter_rollups(tile_id, selected(city)):
+        if plant and plant != ALL and r.plant != plant:
+            continue
+        if reason and reason != ALL and reason not in (r.tech_reason, r.biz_reason):
+            continue
+        cids.append(r.correlation_id)
+    return cids
+
+
+def facet_options(tile_id: str, city: Optional[str]) -> Dict[str, List[Dict[str, str]]]:
+    plants, reasons = set(), set()
+    for r in iter_rollups(tile_id, selected(city)):
+        plants.add(r.plant)
+        reasons.update(x for x in (r.tech_reason, r.biz_reason) if x)
+    return {
+        "plants" : [{"label": "כל המפעלים", "value": ALL}]
+                   + [{"label": p, "value": p} for p in sorted(plants) if p],
+        "reasons": [{"label": "כל קודי התקלה", "value": ALL}]
+                   + [{"label": x, "value": x} for x in sorted(reasons)],
+    }
+
+
+def submit_job(action: str, cids: List[str]) -> html.Span:
+    try:
+        job = ACTION_QUEUE.submit(action, cids, requested_by="dashboard")
+    except PyMongoError as exc:
+        return html.Span(f"העבודה לא נשמרה: {exc}", className="text-danger")
+    return html.Span(
+        f"עבודה {job['job_id']} נוצרה: {ACTION_NAMES[action]} ל-{job['total']} תהליכים",
+        className="text-success",
+    )
+
+
+# ------------------------------------------------------------
+# Layout
+# ------------------------------------------------------------
+jobs_grid = dag.AgGrid(
+    id="action_jobs_grid",
+    columnDefs=[
+        {"field": "job_id", "headerName": "מזהה", "width": 140},
+        {"field": "action", "headerName": "פעולה", "width": 130},
+        {"field": "created_utc", "headerName": "נוצר (UTC)", "width": 190},
+        {"field": "total", "headerName": "תהליכים", "width": 110},
+        {"field": "done", "headerName": "בוצעו", "width": 100},
+        {"field": "failed", "headerName": "נכשלו", "width": 100},
+        {"field": "progress", "headerName": "התקדמות", "width": 120},
+        {"field": "state", "headerName": "מצב", "width": 110},
+    ],
+    rowData=[],
+    defaultColDef={"resizable": True, "sortable": True, "headerClass": "center-header"},
+    dashGridOptions={"domLayout": "autoHeight", "enableRtl": True},
+    style={"width": "100%"},
+)
+
+layout = dbc.Container(
+    [
+        dcc.Interval(id="actions_tick", interval=2000),
+        
+        dbc.Row(
+            dbc.Col(html.H2("פעולות מרוכזות על תהליכים כושלים"), width=12),
+            class_name="my-3 text-center",
+        ),
+        
+        dbc.Row(
+            [
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="actions_tile",
+                        options=[{"label": label, "value": v} for v, label in SELECTIONS.items()],
+                        value="tech_RED",
+                        clearable=False,
+                    ),
+                    md=3,
+                ),
+                dbc.Col(dcc.Dropdown(id="actions_city", value=ALL, clearable=False), md=2),
+                dbc.Col(dcc.Dropdown(id="actions_plant", value=ALL, clearable=False), md=2),
+                dbc.Col(dcc.Dropdown(id="actions_reason", value=ALL, clearable=False), md=3),
+                dbc.Col(dcc.Link("חזרה לדשבורד", href="/"), md=2, className="text-start"),
+            ],
+            className="align-items-center mb-3",
+        ),
+        
+        dbc.Row(
+            [
+                dbc.Col(
+                    dbc.RadioItems(
+                        id="actions_action",
+                        options=[{"label": ACTION_NAMES[a], "value": a} for a in ACTIONS],
+                        value="RESEND",
+                        inline=True,
+                    ),
+                    md=4,
+                ),
+                dbc.Col(html.Div(id="actions_preview", className="fw-bold"), md=4),
+                dbc.Col(dbc.Button("הוסף לתור", id="actions_submit", color="primary"), md=2),
+            ],
+            className="align-items-center mb-2",
+        ),
+        html.Div(id="actions_submitted", className="small text-end mb-3"),
+        dcc.ConfirmDialog(id="actions_confirm"),
+        
+        html.H5("עבודות", className="mt-3"),
+        jobs_grid,
+        html.Div(id="actions_metrics", className="text-muted small text-end mt-2"),
+    ],
+    fluid=True,
+    style={"direction": "rtl"},
+)
+
+
+# ------------------------------------------------------------
+# Callbacks
+# ------------------------------------------------------------
+@callback(
+    Output("actions_city", "options"),
+    Output("actions_plant", "options"),
+    Output("actions_reason", "options"),
+    Input("actions_tile", "value"),
+    Input("actions_city", "value"),
+)
+def update_facets(tile_id: str, city: Optional[str]):
+    facets = facet_options(tile_id, city)
+    cities = [{"label": "כל האתרים", "value": ALL}]
+    cities += [{"label": c, "value": c} for c in city_names()]
+    return cities, facets["plants"], facets["reasons"]
+
+
+@callback(
+    Output("actions_preview", "children"),
+    Input("actions_tile", "value"),
+    Input("actions_city", "value"),
+    Input("actions_plant", "value"),
+    Input("actions_reason", "value"),
+    Input("actions_action", "value"),
+)
+def update_preview(
+    tile_id: str, city: Optional[str], plant: Optional[str], reason: Optional[str], action: str,
+):
+    n = len(selection(tile_id, city, plant, reason))
+    over = f" (עד {ACTION_MAX_FLOWS} בעבודה אחת)" if n > ACTION_MAX_FLOWS else ""
+    return f"{ACTION_NAMES[action]}: {n} תהליכים נבחרו{over}"
+
+
+@callback(
+    Output("actions_submitted", "children"),
+    Output("actions_confirm", "displayed"),
+    Output("actions_confirm", "message"),
+    Input("actions_submit", "n_clicks"),
+    Input("actions_confirm", "submit_n_clicks"),
+    State("actions_tile", "value"),
+    State("actions_city", "value"),
+    State("actions_plant", "value"),
+    State("actions_reason", "value"),
+    State("actions_action", "value"),
+    prevent_initial_call=True,
+)
+def submit(
+    _n,
+    _confirmed,
+    tile_id: str,
+    city: Optional[str],
+    plant: Optional[str],
+    reason: Optional[str],
+    action: str,
+):
+    cids = selection(tile_id, city, plant, reason)[:ACTION_MAX_FLOWS]
+    if not cids:
+        raise PreventUpdate
+    confirm = action == "DELETE" or len(cids) > CONFIRM_OVER
+    if callback_context.triggered_id == "actions_submit" and confirm:
+        return dash.no_update, True, f"{ACTION_NAMES[action]} של {len(cids)} תהליכים. להמשיך?"
+    return submit_job(action, cids), False, dash.no_update
+
+
+@callback(
+    Output("action_jobs_grid", "rowData"),
+    Output("actions_metrics", "children"),
+    Input("actions_tick", "n_intervals"),
+)
+def update_jobs(_n):
+    try:
+        jobs = ACTION_QUEUE.jobs()
+    except PyMongoError:
+        jobs = []
+    rows: List[Dict[str, Any]] = []
+    for job in jobs:
+        finished = job["done"] + job["failed"]
+        rows.append(
+            {
+                **job,
+                "action"  : ACTION_NAMES.get(job["action"], job["action"]),
+                "progress": f"{finished / job['total']:.0%}" if job["total"] else "—",
+                "state"   : ITEM_STATE_NAMES.get(job["state"], job["state"]),
+            },
+        )
+    m = ACTION_QUEUE.metrics()
+    metrics = (
+        f"בתור: {m['queue_depth']} | בוצעו: {m['done']} | נכשלו: {m['failed']}"
+        f" | ניסיונות חוזרים: {m['retries']}"
+        f" | {m['workers']} עובדים, עד {m['rate_per_sec']:g} בשנייה"
+    )
+    return rows, metrics
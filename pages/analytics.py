@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from typing import Dict, Any, List, Optional
+
+import dash
+from dash import html, dcc, Input, Output, callback
+import dash_ag_grid as dag
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+
+from analytics import REPORT_NAMES, REPORTS, run_report
+from data_store import city_names
+
+dash.register_page(__name__, path="/analytics", name="דוחות ניתוח")
+
+ALL = "ALL"
+WINDOWS_DAYS = {
+    "1" : "יום אחרון",
+    "7" : "7 ימים",
+    "30": "30 ימים",
+    ALL : "כל הקבצים",
+}
+MAX_TRACES = 20  # series per chart (the biggest ones)
+
+
+def selected(value: Optional[str]) -> Optional[str]:
+    return None if not value or value == ALL else value
+
+
+def report_figure(name: str, rows: List[Dict[str, Any]]) -> go.Figure:
+    """
+    The report's chart spec: one trace per y column, or per value of the color column.
+    """
+    chart = REPORTS[name]["chart"]
+    x, color = chart["x"], chart.get("color")
+    ys = chart["y"] if isinstance(chart["y"], list) else [chart["y"]]
+    
+    series: Dict[str, Dict[str, List[Any]]] = {}
+    for r in rows:
+        for y in ys:
+            key = str(r[color]) if color else y
+            s = series.setdefault(key, {"x": [], "y": []})
+            s["x"].append(r[x])
+            s["y"].append(r[y])
+    biggest = sorted(series, key=lambda k: -sum(v or 0 for v in series[k]["y"]))[:MAX_TRACES]
+    
+    fig = go.Figure()
+    for key in biggest:
+        s = series[key]
+        if chart["kind"] == "line":
+            fig.add_trace(go.Scatter(x=s["x"], y=s["y"], mode="lines+markers", name=key))
+        else:
+            fig.add_trace(go.Bar(x=s["x"], y=s["y"], name=key))
+    fig.update_layout(
+        title=REPORT_NAMES[name],
+        barmode="stack" if color else "group",
+        margin={"l": 40, "r": 20, "t": 50, "b": 40},
+        legend={"orientation": "h"},
+    )
+    return fig
+
+
+# ------------------------------------------------------------
+# Layout
+# ------------------------------------------------------------
+report_grid = dag.AgGrid(
+    id="analytics_grid",
+    columnDefs=[],
+    rowData=[],
+    defaultColDef={
+        "resizable"  : True,
+        "sortable"   : True,
+        "filter"     : True,
+        "headerClass": "center-header",
+    },
+    dashGridOptions={"pagination": True, "paginationPageSize": 50, "enableRtl": True},
+    style={"width": "100%", "height": "520px"},
+)
+
+layout = dbc.Container(
+    [
+        dbc.Row(
+            dbc.Col(html.H2("דוחות ניתוח על קבצי האירועים"), width=12),
+            class_name="my-3 text-center",
+        ),
+        
+        dbc.Row(
+            [
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="analytics_report",
+                        options=[{"label": label, "value": v} for v, label in REPORT_NAMES.items()],
+                        value=next(iter(REPORT_NAMES)),
+                        clearable=False,
+                    ),
+                    md=4,
+                ),
+                dbc.Col(dcc.Dropdown(id="analytics_city", value=ALL, clearable=False), md=2),
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="analytics_days",
+                        options=[{"label": label, "value": v} for v, label in WINDOWS_DAYS.items()],
+                        value="7",
+                        clearable=False,
+                    ),
+                    md=2,
+                ),
+                dbc.Col(dbc.Button("רענן", id="analytics_run", color="primary"), md=2),
+                dbc.Col(dcc.Link("חזרה לדשבורד", href="/"), md=2, className="text-start"),
+            ],
+            className="align-items-center mb-3",
+        ),
+        
+        dcc.Loading(
+            [
+                html.Div(id="analytics_status", className="text-muted small text-end mb-2"),
+                dcc.Graph(id="analytics_chart"),
+                report_grid,
+            ],
+        ),
+    ],
+    fluid=True,
+    style={"direction": "rtl"},
+)
+
+
+# ------------------------------------------------------------
+# Callbacks
+# ------------------------------------------------------------
+@callback(
+    Output("analytics_city", "options"),
+    Input("analytics_report", "value"),
+)
+def update_cities(_report):
+    return [{"label": "כל האתרים", "value": ALL}] + [{"label": c, "value": c} for c in city_names()]
+
+
+@callback(
+    Output("analytics_grid", "columnDefs"),
+    Output("analytics_grid", "rowData"),
+    Output("analytics_chart", "figure"),
+    Output("analytics_status", "children"),
+    Input("analytics_report", "value"),
+    Input("analytics_city", "value"),
+    Input("analytics_days", "value"),
+    Input("analytics_run", "n_clicks"),
+)
+def update_report(name: str, city: Optional[str], days: Optional[str], _n):
+    window = selected(days)
+    try:
+        result = run_report(name, selected(city), int(window) if window else None)
+    except RuntimeError as exc:
+        return [], [], go.Figure(), html.Span(f"הדוח לא הופק: {exc}", className="text-danger")
+    
+    columns = [{"field": c, "headerName": c, "minWidth": 120} for c in result["columns"]]
+    status = (
+        f"{len(result['rows'])} שורות מ-{result['files']} קבצים"
+        + (" (מהמטמון)" if result["cached"] else f" ב-{result['seconds']:.2f} שניות")
+    )
+    return columns, result["rows"], report_figure(name, result["rows"]), status
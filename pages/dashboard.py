@@ -2,15 +2,18 @@ from __future__ import annotations
 
 import ast
 from typing import Dict, Any, List, Optional
+from urllib.parse import quote
 
 import dash
 from dash import html, dcc, Input, Output, State, callback_context, ALL, callback, no_update
+from dash.exceptions import PreventUpdate
 import dash_ag_grid as dag
 import dash_bootstrap_components as dbc
+from anomaly import DETECTOR
 from data_store import (
-    ROLLUPS,
-    compute_counts,
+    city_names,
     filter_rollups,
+    tile_counts,
     to_grouped_rows,
 )
 
@@ -23,7 +26,18 @@ dash.register_page(
     name="Dashboard",
 )
 
-COUNTS = compute_counts()
+
+ALL_CITIES = "ALL"  # city selector value for the combined view
+MAX_ANOMALIES_SHOWN = 5
+
+
+def selected_city(value: Optional[str]) -> Optional[str]:
+    return None if not value or value == ALL_CITIES else value
+
+
+def city_options() -> List[Dict[str, str]]:
+    options = [{"label": "כל האתרים", "value": ALL_CITIES}]
+    return options + [{"label": c, "value": c} for c in city_names()]
 
 
 # ------------------------------------------------------------
@@ -34,7 +48,12 @@ def tile(label: str, tile_id: str, color: str, subtitle: str = "") -> dbc.Col:
         dbc.CardBody(
             [
                 html.Div(label, className="fw-bold"),
-                html.Div(str(COUNTS.get(tile_id, 0)), className="display-6 fw-bold"),
+                # filled by refresh_tiles when the page mounts, then on every data version change
+                html.Div(
+                    "…",
+                    id={"type": "tile_count", "id": tile_id},
+                    className="display-6 fw-bold",
+                ),
                 html.Div(subtitle, className="text-muted small") if subtitle else html.Div(),
             ],
         ),
@@ -171,6 +190,9 @@ grid = dag.AgGrid(
     },
     enableEnterpriseModules=True,
     dangerously_allow_code=True,
+    # unique per row (leaf rows of a flow share its correlation_id): go_detail reads it
+    # from cellClicked, since rowIndex is the displayed position in the grouped tree
+    getRowId="params.data.node_type + ':' + (params.data.correlation_id || params.data.sap_order)",
     dashGridOptions={
         "treeData"            : True,
         "animateRows"         : True,
@@ -203,6 +225,8 @@ grid = dag.AgGrid(
 layout = dbc.Container(
     [
         dcc.Store(id="selected_tile", data="overall_RED"),
+        dcc.Store(id="counts_version"),
+        dcc.Interval(id="tiles_tick", interval=5000),
         
         dbc.Row(
             dbc.Col(html.H2("דשבורד ממשקים מתוכלל"), width=12),
@@ -210,11 +234,50 @@ layout = dbc.Container(
         ),
         
         dbc.Alert(
-            f"הועלו {len(ROLLUPS)} מסמכים מתוכללים מתוך מאגר הנתונים",
+            "",
+            id="rollups_loaded",
             color="info",
             className="mb-3 text-center",
         ),
         
+        # failure-rate bursts (anomaly.DETECTOR), hidden while there are none
+        dcc.Store(id="anomaly_version"),
+        dbc.Alert(
+            "",
+            id="anomaly_banner",
+            color="danger",
+            is_open=False,
+            className="mb-3 text-end",
+        ),
+        
+        dbc.Row(
+            [
+                dbc.Col(html.Div("אתר", className="fw-bold text-end"), width="auto"),
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="city",
+                        options=city_options(),
+                        value=ALL_CITIES,
+                        clearable=False,
+                    ),
+                    md=3,
+                ),
+                dbc.Col(
+                    [
+                        dcc.Link("השהיות לפי מקטע (p50/p95/p99)", href="/latency"),
+                        html.Span(" | "),
+                        dcc.Link("ניתוח רב-ממדי", href="/pivot"),
+                        html.Span(" | "),
+                        dcc.Link("פעולות מרוכזות", href="/actions"),
+                        html.Span(" | "),
+                        dcc.Link("דוחות ניתוח", href="/analytics"),
+                    ],
+                    className="text-start",
+                ),
+            ],
+            className="align-items-center mb-3",
+        ),
+        
         dbc.Row(
             dbc.Col(
                 html.Div("לסינון הרשימה לחץ על הקוביה", className="fw-bold text-end"),
@@ -232,10 +295,23 @@ layout = dbc.Container(
                         [
                             dbc.Col(html.H4("טבלה מתכללת"), md=8),
                             dbc.Col(
-                                html.Div(
-                                    id="active_filter",
-                                    className="text-muted small text-end",
-                                ),
+                                [
+                                    html.Div(
+                                        id="active_filter",
+                                        className="text-muted small text-end",
+                                    ),
+                                    # full result set of the selected tile (the grid stops at 600)
+                                    html.Div(
+                                        [
+                                            html.A(
+                                                "ייצוא CSV", id="export_csv", href="",
+                                                className="me-3",
+                                            ),
+                                            html.A("ייצוא Parquet", id="export_parquet", href=""),
+                                        ],
+                                        className="small text-end",
+                                    ),
+                                ],
                                 md=4,
                             ),
                         ],
@@ -275,42 +351,110 @@ def select_tile(_clicks):
     return tile_obj.get("id", "overall_RED")
 
 
+@callback(
+    Output({"type": "tile_count", "id": ALL}, "children"),
+    Output("rollups_loaded", "children"),
+    Output("counts_version", "data"),
+    Input("tiles_tick", "n_intervals"),
+    Input("city", "value"),
+    State("counts_version", "data"),
+)
+def refresh_tiles(_n, city: Optional[str], seen_version: Optional[str]):
+    # Counts are cached per data version; nothing is sent back while the version is unchanged
+    version, counts = tile_counts(selected_city(city))
+    if version == seen_version:
+        raise PreventUpdate
+    
+    return (
+        [str(counts.get(o["id"]["id"], 0)) for o in callback_context.outputs_list[0]],
+        (
+            f"טוען נתונים... הועלו {counts['loaded']} מסמכים עד כה"
+            if counts["loading"]
+            else f"הועלו {counts['loaded']} מסמכים מתוכללים מתוך מאגר הנתונים"
+        ),
+        version,
+    )
+
+
+@callback(
+    Output("anomaly_banner", "children"),
+    Output("anomaly_banner", "is_open"),
+    Output("anomaly_version", "data"),
+    Input("tiles_tick", "n_intervals"),
+    Input("city", "value"),
+    State("anomaly_version", "data"),
+)
+def refresh_anomalies(_n, city: Optional[str], seen_version: Optional[str]):
+    anomalies = DETECTOR.anomalies(selected_city(city))[:MAX_ANOMALIES_SHOWN]
+    version = "|".join(
+        f"{a['city']}/{a['plant']}/{a['reason_code']}/{a['bucket']}/{a['failures']}"
+        for a in anomalies
+    )
+    if version == seen_version:
+        raise PreventUpdate
+    
+    lines = [
+        html.Div(
+            f"⚠ {a['reason_code']} @ {a['checkpoint']} · {a['plant']} ({a['city']}): "
+            f"{a['failures']} כשלים מתוך {a['flows']} ({a['rate']:.0%}) "
+            f"לעומת בסיס {a['baseline']:.1%} · z={a['z']} · {a['bucket_utc']}",
+        )
+        for a in anomalies
+    ]
+    header = html.Div("זוהתה עלייה חריגה בשיעור הכשלים", className="fw-bold mb-1")
+    return [header] + lines, bool(anomalies), version
+
+
 @callback(
     Output("grid", "rowData"),
     Output("active_filter", "children"),
     Input("selected_tile", "data"),
+    Input("city", "value"),
 )
-def update_grid(tile_id: str):
-    flows = filter_rollups(tile_id)[:600]
+def update_grid(tile_id: str, city: Optional[str]):
+    flows = filter_rollups(tile_id, selected_city(city))[:600]
     rows = to_grouped_rows(flows)
     return rows, f"{len(flows)} תוצאות | פילטר נבחר: {tile_id}"
 
 
+@callback(
+    Output("export_csv", "href"),
+    Output("export_parquet", "href"),
+    Input("selected_tile", "data"),
+    Input("city", "value"),
+)
+def update_export_links(tile_id: str, city: Optional[str]):
+    city = selected_city(city)
+    suffix = f"&city={quote(city)}" if city else ""
+    return f"/export/{tile_id}?format=csv{suffix}", f"/export/{tile_id}?format=parquet{suffix}"
+
+
+@callback(
+    Output("city", "options"),
+    Input("tiles_tick", "n_intervals"),
+    State("city", "options"),
+)
+def update_city_options(_n, current: Optional[List[Dict[str, str]]]):
+    # Cities appear as the loader discovers them
+    options = city_options()
+    if options == current:
+        raise PreventUpdate
+    return options
+
+
 @callback(
     Output("_pages_location", "pathname"),
     Input("grid", "cellClicked"),
-    State("grid", "rowData"),
     State("_pages_location", "pathname"),
     prevent_initial_call=True,
 )
-def go_detail(
-    cell_clicked: Optional[Dict[str, Any]],
-    row_data: Optional[List[Dict[str, Any]]],
-    current_path: str,
-):
-    if not cell_clicked or not row_data:
-        return no_update
-    
-    row_index = cell_clicked.get("rowIndex")
-    if row_index is None or row_index >= len(row_data):
-        return no_update
-    
-    row = row_data[row_index]
-    if row.get("node_type") != "FLOW":
+def go_detail(cell_clicked: Optional[Dict[str, Any]], current_path: str):
+    if not cell_clicked:
         return no_update
     
-    cid = row.get("correlation_id")
-    if not cid:
+    # getRowId: "<node_type>:<correlation_id>" (ORDER rows: "ORDER:<sap_order>")
+    node_type, _, cid = str(cell_clicked.get("rowId") or "").partition(":")
+    if node_type != "FLOW" or not cid:
         return no_update
     
     new_path = f"/detail/{cid}"
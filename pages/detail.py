@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+from typing import Dict, Any, List, Optional
+
 import dash
-from dash import html
+from dash import html, dcc, Input, Output, State, callback, callback_context
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-from data_store import ROLLUP_BY_CID, worst_overall
+from pymongo.errors import PyMongoError
+
+from actions import ACTION_NAMES, ACTION_QUEUE, DONE, FAILED, ITEM_STATE_NAMES, PENDING, RUNNING
+from data_store import fetch_flow_detail, worst_overall
 
 dash.register_page(__name__, path_template="/detail/<correlation_id>", name="פרטי תהליך")
 
@@ -17,8 +23,115 @@ def badge_for(overall: str) -> dbc.Badge:
     return dbc.Badge(overall, color=m.get(overall, "secondary"), className="ms-2")
 
 
+def missing_section(title: str) -> html.Div:
+    """
+    Placeholder for a section whose query did not return within its time budget.
+    """
+    return html.Div(
+        [
+            html.H5(title, className="mb-3"),
+            dbc.Alert(
+                "הנתונים לא התקבלו בזמן — נסה לרענן את הדף", color="warning", className="mb-0",
+            ),
+        ],
+    )
+
+
+def timeline_section(tech_events: Optional[List[Dict[str, Any]]], missing: bool) -> html.Div:
+    if missing:
+        return missing_section("ציר זמן של עיבוד")
+    
+    if not tech_events:
+        return html.Div(
+            [
+                html.H5("ציר זמן של עיבוד", className="mb-3"),
+                html.Ul(
+                    [
+                        html.Li("1. יצירת iDoc ב-SAP (סטטוס 03)"),
+                        html.Li("2. המרה ל-JSON במתווך (PO)"),
+                        html.Li("3. ולידציה עסקית / ניתוב"),
+                        html.Li("4. מעבר Firewall יוצא → נכנס"),
+                        html.Li("5. עיבוד במערכת WMS"),
+                    ],
+                    className="text-muted",
+                ),
+                html.Div("העיבוד נעצר בשלב הכשל במידה וקיים.", className="text-muted small"),
+            ],
+        )
+    
+    items = []
+    for i, e in enumerate(tech_events, start=1):
+        ts = (e.get("timestamps") or {}).get("event_utc", "")
+        failed = e.get("status") != "OK"
+        items.append(
+            html.Li(
+                [
+                    html.Span(f"{i}. {e.get('checkpoint', '')}", className="fw-bold"),
+                    html.Span(f"  ·  {e.get('status', '')} / {e.get('reason_code', '')}  ·  {ts}"),
+                    html.Div(e.get("detail"), className="small")
+                    if e.get("detail") else html.Span(),
+                ],
+                className="text-danger" if failed else "text-muted",
+            ),
+        )
+    
+    return html.Div(
+        [
+            html.H5("ציר זמן של עיבוד", className="mb-3"),
+            html.Ul(items, className="list-unstyled"),
+        ],
+    )
+
+
+def business_section(biz_evt: Optional[Dict[str, Any]], missing: bool) -> html.Div:
+    if missing:
+        return missing_section("אירוע עסקי (WMS)")
+    
+    if not biz_evt:
+        return html.Div(
+            [
+                html.H5("אירוע עסקי (WMS)", className="mb-3"),
+                html.Div("לא נמצא אירוע עסקי לתהליך.", className="text-muted"),
+            ],
+        )
+    
+    wms = biz_evt.get("wms_response") or {}
+    ts = biz_evt.get("timestamps") or {}
+    return html.Div(
+        [
+            html.H5("אירוע עסקי (WMS)", className="mb-3"),
+            html.Div(
+                f"• סטטוס: {biz_evt.get('status')} / {biz_evt.get('reason_code')}",
+                className="text-muted",
+            ),
+            html.Div(
+                f"• תגובת WMS: {wms.get('status')} {wms.get('detail') or ''}",
+                className="text-muted",
+            ),
+            html.Div(f"• נשלח: {ts.get('order_sent_utc', '')}", className="text-muted"),
+            html.Div(f"• נענה: {ts.get('wms_responded_utc', '—')}", className="text-muted"),
+        ],
+    )
+
+
+def action_status(item: Optional[Dict[str, Any]]) -> List[Any]:
+    if not item:
+        return [html.Span("לא בוצע", className="text-muted")]
+    color = {DONE: "text-success", FAILED: "text-danger"}.get(item["state"], "text-primary")
+    return [
+        html.Span(f"{ACTION_NAMES.get(item['action'], item['action'])}: ", className="fw-bold"),
+        html.Span(ITEM_STATE_NAMES.get(item["state"], item["state"]), className=color),
+        html.Div(
+            f"{item.get('detail') or ''} · {item.get('updated_utc', '')}",
+            className="text-muted small",
+        ),
+    ]
+
+
 def layout(correlation_id: str = ""):
-    r = ROLLUP_BY_CID.get(correlation_id)
+    detail = fetch_flow_detail(correlation_id)
+    r = detail["rollup"]
+    missing = detail["missing"]
     
     if not r:
         return dbc.Container(
@@ -35,7 +148,15 @@ def layout(correlation_id: str = ""):
                     ),
                     class_name="mt-3",
                 ),
-                dbc.Alert(f"מספר תהליך לא נמצא: {correlation_id}", color="danger", className="mt-3"),
+                dbc.Alert(
+                    f"שליפת התהליך לא הסתיימה בזמן: {correlation_id}",
+                    color="warning",
+                    className="mt-3",
+                )
+                if "rollup" in missing
+                else dbc.Alert(
+                    f"מספר תהליך לא נמצא: {correlation_id}", color="danger", className="mt-3",
+                ),
             ],
             fluid=True,
             style={"direction": "rtl"},
@@ -116,20 +237,7 @@ def layout(correlation_id: str = ""):
                     dbc.Col(
                         dbc.Card(
                             dbc.CardBody(
-                                [
-                                    html.H5("ציר זמן של עיבוד", className="mb-3"),
-                                    html.Ul(
-                                        [
-                                            html.Li("1. יצירת iDoc ב-SAP (סטטוס 03)"),
-                                            html.Li("2. המרה ל-JSON במתווך (PO)"),
-                                            html.Li("3. ולידציה עסקית / ניתוב"),
-                                            html.Li("4. מעבר Firewall יוצא → נכנס"),
-                                            html.Li("5. עיבוד במערכת WMS"),
-                                        ],
-                                        className="text-muted",
-                                    ),
-                                    html.Div("העיבוד נעצר בשלב הכשל במידה וקיים.", className="text-muted small"),
-                                ],
+                                timeline_section(detail["tech_events"], "tech_events" in missing),
                             ),
                         ),
                         md=7,
@@ -175,6 +283,13 @@ def layout(correlation_id: str = ""):
                 className="g-3",
             ),
             
+            dbc.Card(
+                dbc.CardBody(
+                    business_section(detail["business_event"], "business_event" in missing),
+                ),
+                className="mt-3",
+            ),
+            
             dbc.Row(
                 [
                     dbc.Col(
@@ -230,18 +345,32 @@ def layout(correlation_id: str = ""):
                         html.H5("פעולות", className="mb-3"),
                         dbc.Row(
                             [
-                                dbc.Col(dbc.Button("שליחה מחדש", color="primary", className="w-100"), md=2),
-                                dbc.Col(dbc.Button("תיקון", color="info", outline=True, className="w-100"), md=2),
-                                dbc.Col(dbc.Button("מחיקה", color="danger", outline=True, className="w-100"), md=2),
+                                dbc.Col(
+                                    dbc.Button(
+                                        "שליחה מחדש", id="detail_resend", color="primary",
+                                        className="w-100",
+                                    ),
+                                    md=2,
+                                ),
+                                dbc.Col(
+                                    dbc.Button(
+                                        "תיקון", id="detail_repair", color="info", outline=True,
+                                        className="w-100",
+                                    ),
+                                    md=2,
+                                ),
+                                dbc.Col(
+                                    dbc.Button(
+                                        "מחיקה", id="detail_delete", color="danger", outline=True,
+                                        className="w-100",
+                                    ),
+                                    md=2,
+                                ),
                                 dbc.Col(
                                     html.Div(
                                         [
                                             html.Div("סטטוס פעולה: ", className="fw-bold d-inline"),
-                                            html.Span("לא בוצע", className="text-muted"),
-                                            html.Div(
-                                                "(יעודכן ל: ״בשליחה״, ״תוקן״, ״נמחק״ וכו׳)",
-                                                className="text-muted small",
-                                            ),
+                                            html.Span(id="detail_action_status"),
                                         ],
                                     ),
                                     md=6,
@@ -249,6 +378,16 @@ def layout(correlation_id: str = ""):
                             ],
                             className="g-2",
                         ),
+                        dcc.Store(id="detail_cid", data=correlation_id),
+                        dcc.ConfirmDialog(
+                            id="detail_delete_confirm",
+                            message=(
+                                f"למחוק את התהליך {correlation_id}? "
+                                "הוא יוסתר מהדשבורד ומהייצוא."
+                            ),
+                        ),
+                        # polls the flow's action only while one is pending (see run_action)
+                        dcc.Interval(id="detail_action_tick", interval=2000, disabled=True),
                     ],
                 ),
                 className="mt-3 mb-4",
@@ -257,3 +396,44 @@ def layout(correlation_id: str = ""):
         fluid=True,
         style={"direction": "rtl"},
     )
+
+
+# ------------------------------------------------------------
+# Actions (single-flow jobs on the bulk action queue)
+# ------------------------------------------------------------
+DETAIL_ACTION_BUTTONS = {
+    "detail_resend"        : "RESEND",
+    "detail_repair"        : "REPAIR",
+    "detail_delete_confirm": "DELETE",  # the delete button only opens the confirmation
+}
+
+
+@callback(
+    Output("detail_delete_confirm", "displayed"),
+    Input("detail_delete", "n_clicks"),
+    prevent_initial_call=True,
+)
+def confirm_delete(_n):
+    return True
+
+
+@callback(
+    Output("detail_action_status", "children"),
+    Output("detail_action_tick", "disabled"),
+    Input("detail_resend", "n_clicks"),
+    Input("detail_repair", "n_clicks"),
+    Input("detail_delete_confirm", "submit_n_clicks"),
+    Input("detail_action_tick", "n_intervals"),
+    State("detail_cid", "data"),
+)
+def run_action(_resend, _repair, _delete, _n, correlation_id: str):
+    if not correlation_id:
+        raise PreventUpdate
+    try:
+        action = DETAIL_ACTION_BUTTONS.get(callback_context.triggered_id)
+        if action:
+            ACTION_QUEUE.submit(action, [correlation_id], requested_by="detail")
+        item = ACTION_QUEUE.flow_state(correlation_id)
+    except PyMongoError as exc:
+        return html.Span(f"הפעולה לא נשמרה: {exc}", className="text-danger"), True
+    return action_status(item), not (item and item.get("state") in (PENDING, RUNNING))
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+import dash
+from dash import html, dcc, Input, Output, callback
+import dash_ag_grid as dag
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+
+from latency import HOP_NAMES, HOUR_FORMAT, LATENCY, QUANTILES
+
+dash.register_page(__name__, path="/latency", name="השהיות לפי מקטע")
+
+ALL = "ALL"
+WINDOWS_HOURS = {
+    "1"  : "שעה אחרונה",
+    "6"  : "6 שעות",
+    "24" : "24 שעות",
+    "168": "7 ימים",
+    ALL  : "כל החלון",
+}
+
+
+def since_hour(window: Optional[str], hours: List[str]) -> Optional[str]:
+    """
+    First hour bucket of the window, counted back from the newest bucket with data.
+    """
+    if not window or window == ALL or not hours:
+        return None
+    newest = datetime.strptime(hours[-1], HOUR_FORMAT)
+    return (newest - timedelta(hours=int(window) - 1)).strftime(HOUR_FORMAT)
+
+
+def options(values: List[str], all_label: str) -> List[Dict[str, str]]:
+    return [{"label": all_label, "value": ALL}] + [{"label": v, "value": v} for v in values]
+
+
+def selected(value: Optional[str]) -> Optional[str]:
+    return None if not value or value == ALL else value
+
+
+def fmt_sec(ms: Optional[float]) -> str:
+    return "—" if ms is None else f"{ms / 1000:.2f}"
+
+
+# ------------------------------------------------------------
+# Layout
+# ------------------------------------------------------------
+quantile_columns = [
+    {
+        "field"      : f"p{round(q * 100):g}",
+        "headerName" : f"p{round(q * 100):g} (שניות)",
+        "width"      : 130,
+        "headerClass": "center-header",
+    }
+    for q in QUANTILES
+]
+
+hop_grid = dag.AgGrid(
+    id="latency_grid",
+    columnDefs=[
+        {"field": "hop", "headerName": "מקטע", "minWidth": 360, "headerClass": "center-header"},
+        {"field": "count", "headerName": "מדידות", "width": 120, "headerClass": "center-header"},
+        {
+            "field"      : "mean",
+            "headerName" : "ממוצע (שניות)",
+            "width"      : 140,
+            "headerClass": "center-header",
+        },
+        *quantile_columns,
+        {
+            "field"      : "max",
+            "headerName" : "מקסימום (שניות)",
+            "width"      : 150,
+            "headerClass": "center-header",
+        },
+    ],
+    rowData=[],
+    defaultColDef={"resizable": True, "sortable": True},
+    dashGridOptions={"rowSelection": "single", "domLayout": "autoHeight"},
+    style={"width": "100%"},
+)
+
+layout = dbc.Container(
+    [
+        dcc.Interval(id="latency_tick", interval=10000),
+        
+        dbc.Row(
+            dbc.Col(html.H2("השהיות לפי מקטע במסלול SAP → PO → FW → SCX → WMS"), width=12),
+            class_name="my-3 text-center",
+        ),
+        
+        dbc.Row(
+            [
+                dbc.Col(dcc.Dropdown(id="latency_city", value=ALL, clearable=False), md=3),
+                dbc.Col(dcc.Dropdown(id="latency_plant", value=ALL, clearable=False), md=3),
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="latency_window",
+                        options=[
+                            {"label": label, "value": v} for v, label in WINDOWS_HOURS.items()
+                        ],
+                        value="24",
+                        clearable=False,
+                    ),
+                    md=3,
+                ),
+                dbc.Col(dcc.Link("חזרה לדשבורד", href="/"), md=3, className="text-start"),
+            ],
+            className="align-items-center mb-3",
+        ),
+        
+        html.Div(id="latency_status", className="text-muted small text-end mb-2"),
+        hop_grid,
+        
+        dbc.Row(
+            [
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="latency_hop",
+                        options=[{"label": h, "value": h} for h in HOP_NAMES],
+                        value=HOP_NAMES[-2],  # end to end
+                        clearable=False,
+                    ),
+                    md=6,
+                ),
+            ],
+            className="mt-4 mb-2",
+        ),
+        dcc.Graph(id="latency_series"),
+    ],
+    fluid=True,
+    style={"direction": "rtl"},
+)
+
+
+# ------------------------------------------------------------
+# Callbacks
+# ------------------------------------------------------------
+@callback(
+    Output("latency_city", "options"),
+    Output("latency_plant", "options"),
+    Input("latency_tick", "n_intervals"),
+)
+def update_filters(_n):
+    dims = LATENCY.dimensions()
+    return options(dims["cities"], "כל האתרים"), options(dims["plants"], "כל המפעלים")
+
+
+@callback(
+    Output("latency_grid", "rowData"),
+    Output("latency_status", "children"),
+    Input("latency_tick", "n_intervals"),
+    Input("latency_city", "value"),
+    Input("latency_plant", "value"),
+    Input("latency_window", "value"),
+)
+def update_summary(_n, city: Optional[str], plant: Optional[str], window: Optional[str]):
+    hours = LATENCY.dimensions()["hours"]
+    since = since_hour(window, hours)
+    rows: List[Dict[str, Any]] = []
+    for r in LATENCY.summary(selected(city), selected(plant), since):
+        row = {
+            "hop"  : r["hop"],
+            "count": r["count"],
+            "mean" : fmt_sec(r["mean_ms"]),
+            "max"  : fmt_sec(r["max_ms"]),
+        }
+        for q in QUANTILES:
+            name = f"p{round(q * 100):g}"
+            row[name] = fmt_sec(r[f"{name}_ms"])
+        rows.append(row)
+    
+    status = (
+        f"{LATENCY.hops} מדידות מקטע מתוך {LATENCY.events} אירועים טכניים"
+        + (f" | מ-{since}:00Z" if since else "")
+    )
+    return rows, status
+
+
+@callback(
+    Output("latency_series", "figure"),
+    Input("latency_tick", "n_intervals"),
+    Input("latency_hop", "value"),
+    Input("latency_city", "value"),
+    Input("latency_plant", "value"),
+    Input("latency_window", "value"),
+)
+def update_series(_n, hop: str, city: Optional[str], plant: Optional[str], window: Optional[str]):
+    since = since_hour(window, LATENCY.dimensions()["hours"])
+    points = LATENCY.series(hop, selected(city), selected(plant), since)
+    
+    fig = go.Figure()
+    for q in QUANTILES:
+        name = f"p{round(q * 100):g}"
+        fig.add_trace(
+            go.Scatter(
+                x=[p["hour"] + ":00Z" for p in points],
+                y=[None if p[f"{name}_ms"] is None else p[f"{name}_ms"] / 1000 for p in points],
+                mode="lines+markers",
+                name=name,
+            ),
+        )
+    fig.update_layout(
+        title=f"{hop} לפי שעה",
+        yaxis_title="שניות",
+        margin={"l": 40, "r": 20, "t": 50, "b": 40},
+        legend={"orientation": "h"},
+    )
+    return fig
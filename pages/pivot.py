@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+from typing import Dict, Any, List, Optional
+
+import dash
+from dash import html, dcc, Input, Output, State, callback, callback_context, no_update
+from dash.exceptions import PreventUpdate
+import dash_ag_grid as dag
+import dash_bootstrap_components as dbc
+
+from cube import CUBE, DIMENSION_NAMES, DIMENSIONS
+
+dash.register_page(__name__, path="/pivot", name="ניתוח רב-ממדי")
+
+MAX_COLUMNS = 30  # column values beyond the largest ones are summed into OTHER
+OTHER = "אחר"
+TOTAL = "סה\"כ"
+ROW_FIELD = "_row"
+TOTAL_FIELD = "_total"
+
+
+def dimension_options(exclude: List[str]) -> List[Dict[str, str]]:
+    return [{"label": DIMENSION_NAMES[d], "value": d} for d in DIMENSIONS if d not in exclude]
+
+
+def path_where(path: List[List[str]]) -> Dict[str, str]:
+    return {dim: value for dim, value in path}
+
+
+def next_dimension(path: List[List[str]], columns: str) -> Optional[str]:
+    used = {dim for dim, _ in path} | {columns}
+    return next((d for d in DIMENSIONS if d not in used), None)
+
+
+def pivot_table(rows: str, columns: str, path: List[List[str]]) -> Dict[str, Any]:
+    """
+    Grid columns + rows of the pivot: one row per `rows` value (largest total first),
+    one column per `columns` value (largest MAX_COLUMNS), with totals.
+    """
+    table = CUBE.pivot(rows, columns, path_where(path))
+    column_totals: Dict[str, int] = {}
+    for counts in table.values():
+        for c, n in counts.items():
+            column_totals[c] = column_totals.get(c, 0) + n
+    ordered = sorted(column_totals, key=lambda c: (-column_totals[c], c))
+    if columns == "hour":
+        ordered = sorted(ordered)
+    shown = ordered[:MAX_COLUMNS]
+    hidden = set(ordered[MAX_COLUMNS:])
+    
+    column_defs = [
+        {
+            "field"     : ROW_FIELD,
+            "headerName": DIMENSION_NAMES[rows],
+            "pinned"    : "right",
+            "minWidth"  : 200,
+        },
+        {"field": TOTAL_FIELD, "headerName": TOTAL, "width": 110},
+    ] + [{"field": f"c{i}", "headerName": c, "width": 120} for i, c in enumerate(shown)]
+    if hidden:
+        column_defs.append({"field": "_other", "headerName": OTHER, "width": 110})
+    
+    row_data: List[Dict[str, Any]] = []
+    for r, counts in table.items():
+        row: Dict[str, Any] = {ROW_FIELD: r, TOTAL_FIELD: sum(counts.values())}
+        for i, c in enumerate(shown):
+            row[f"c{i}"] = counts.get(c, 0)
+        if hidden:
+            row["_other"] = sum(n for c, n in counts.items() if c in hidden)
+        row_data.append(row)
+    row_data.sort(key=lambda row: (-row[TOTAL_FIELD], row[ROW_FIELD]))
+    return {"columnDefs": column_defs, "rowData": row_data, "columns": shown}
+
+
+# ------------------------------------------------------------
+# Layout
+# ------------------------------------------------------------
+pivot_grid = dag.AgGrid(
+    id="pivot_grid",
+    columnDefs=[],
+    rowData=[],
+    defaultColDef={"resizable": True, "sortable": True, "headerClass": "center-header"},
+    dashGridOptions={"domLayout": "autoHeight", "enableRtl": True},
+    style={"width": "100%"},
+)
+
+layout = dbc.Container(
+    [
+        dcc.Interval(id="pivot_tick", interval=10000),
+        dcc.Store(id="pivot_path", data=[]),  # drill path: [[dimension, value], ...]
+        dcc.Store(id="pivot_columns_shown", data=[]),
+        
+        dbc.Row(
+            dbc.Col(html.H2("ניתוח רב-ממדי של התהליכים"), width=12),
+            class_name="my-3 text-center",
+        ),
+        
+        dbc.Row(
+            [
+                dbc.Col(html.Div("שורות", className="fw-bold text-end"), width="auto"),
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="pivot_rows", options=dimension_options([]), value="plant",
+                        clearable=False,
+                    ),
+                    md=3,
+                ),
+                dbc.Col(html.Div("עמודות", className="fw-bold text-end"), width="auto"),
+                dbc.Col(
+                    dcc.Dropdown(
+                        id="pivot_columns", options=dimension_options([]), value="overall",
+                        clearable=False,
+                    ),
+                    md=3,
+                ),
+                dbc.Col(
+                    dbc.Button("איפוס סינון", id="pivot_reset", color="secondary", size="sm"),
+                    width="auto",
+                ),
+                dbc.Col(dcc.Link("חזרה לדשבורד", href="/"), className="text-start"),
+            ],
+            className="align-items-center mb-3",
+        ),
+        
+        html.Div(id="pivot_breadcrumb", className="mb-2 text-end"),
+        html.Div(
+            "לחיצה על תא מסננת לפיו וממשיכה לממד הבא", className="text-muted small text-end mb-2",
+        ),
+        pivot_grid,
+        html.Div(id="pivot_status", className="text-muted small text-end mt-2"),
+    ],
+    fluid=True,
+    style={"direction": "rtl"},
+)
+
+
+# ------------------------------------------------------------
+# Callbacks
+# ------------------------------------------------------------
+@callback(
+    Output("pivot_grid", "columnDefs"),
+    Output("pivot_grid", "rowData"),
+    Output("pivot_columns_shown", "data"),
+    Output("pivot_breadcrumb", "children"),
+    Output("pivot_status", "children"),
+    Input("pivot_tick", "n_intervals"),
+    Input("pivot_rows", "value"),
+    Input("pivot_columns", "value"),
+    Input("pivot_path", "data"),
+)
+def update_pivot(_n, rows: str, columns: str, path: List[List[str]]):
+    path = path or []
+    table = pivot_table(rows, columns, path)
+    crumbs = [f"{DIMENSION_NAMES[dim]} = {value}" for dim, value in path]
+    breadcrumb = "סינון: " + " › ".join(crumbs) if crumbs else "סינון: כל התהליכים"
+    status = f"{CUBE.total(path_where(path))} תהליכים | {len(CUBE)} תאים בקובייה"
+    return table["columnDefs"], table["rowData"], table["columns"], breadcrumb, status
+
+
+@callback(
+    Output("pivot_path", "data"),
+    Output("pivot_rows", "value"),
+    Input("pivot_grid", "cellClicked"),
+    Input("pivot_reset", "n_clicks"),
+    State("pivot_path", "data"),
+    State("pivot_rows", "value"),
+    State("pivot_columns", "value"),
+    State("pivot_columns_shown", "data"),
+    State("pivot_grid", "rowData"),
+    prevent_initial_call=True,
+)
+def drill(
+    cell_clicked: Optional[Dict[str, Any]],
+    _reset,
+    path: List[List[str]],
+    rows: str,
+    columns: str,
+    columns_shown: List[str],
+    row_data: Optional[List[Dict[str, Any]]],
+):
+    if callback_context.triggered_id == "pivot_reset":
+        return [], "plant"
+    if not cell_clicked or not row_data:
+        raise PreventUpdate
+    
+    row_index = cell_clicked.get("rowIndex")
+    if row_index is None or row_index >= len(row_data):
+        raise PreventUpdate
+    
+    path = list(path or [])
+    path.append([rows, row_data[row_index][ROW_FIELD]])
+    col_id = cell_clicked.get("colId") or ""
+    if col_id.startswith("c") and col_id[1:].isdigit() and int(col_id[1:]) < len(columns_shown):
+        path.append([columns, columns_shown[int(col_id[1:])]])
+    
+    nxt = next_dimension(path, columns)
+    return path, nxt if nxt else no_update
+
+
+@callback(
+    Output("pivot_rows", "options"),
+    Output("pivot_columns", "options"),
+    Input("pivot_rows", "value"),
+    Input("pivot_columns", "value"),
+)
+def update_dimension_options(rows: str, columns: str):
+    return dimension_options([columns]), dimension_options([rows])
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+from pymongo.database import Database
+
+# ------------------------------------------------------------
+# Day partitions
+#   <base>_YYYYMMDD holds the documents whose time field falls on that UTC day
+#   (rollups / business events: order_sent_utc, tech events: event_utc).
+#   The unsuffixed base collection stays readable for unpartitioned data.
+# ------------------------------------------------------------
+DAY_FORMAT = "%Y%m%d"
+CATALOG_TTL_SEC = 30.0
+
+
+def partition_name(base: str, day: date) -> str:
+    return f"{base}_{day.strftime(DAY_FORMAT)}"
+
+
+def day_of(value: Any) -> Optional[date]:
+    """
+    ISO timestamp string ("2025-12-16T18:14:47Z") or datetime -> UTC day.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def doc_time(doc: Dict[str, Any], time_field: str) -> Any:
+    v: Any = doc
+    for key in time_field.split("."):
+        if not isinstance(v, dict):
+            return None
+        v = v.get(key)
+    return v
+
+
+def group_by_partition(
+    docs: Iterable[Dict[str, Any]],
+    base: str,
+    time_field: str,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    -> {collection name: docs}. Documents without a usable time stay in the base collection.
+    """
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for d in docs:
+        day = day_of(doc_time(d, time_field))
+        out.setdefault(partition_name(base, day) if day else base, []).append(d)
+    return out
+
+
+# ------------------------------------------------------------
+# Catalog (list_collection_names, cached briefly per base)
+# ------------------------------------------------------------
+_CATALOG_LOCK = threading.Lock()
+_CATALOG: Dict[Tuple[str, str], Tuple[float, List[Tuple[date, str]], bool]] = {}
+
+
+def _scan(db: Database, base: str) -> Tuple[List[Tuple[date, str]], bool]:
+    pattern = re.compile(rf"^{re.escape(base)}_(\d{{8}})$")
+    parts: List[Tuple[date, str]] = []
+    has_base = False
+    for name in db.list_collection_names():
+        if name == base:
+            has_base = True
+            continue
+        m = pattern.match(name)
+        if m:
+            parts.append((datetime.strptime(m.group(1), DAY_FORMAT).date(), name))
+    parts.sort()
+    return parts, has_base
+
+
+def list_partitions(db: Database, base: str, fresh: bool = False) -> List[Tuple[date, str]]:
+    """
+    [(day, collection name)] oldest first.
+    """
+    return _catalog(db, base, fresh)[0]
+
+
+def _catalog(db: Database, base: str, fresh: bool = False) -> Tuple[List[Tuple[date, str]], bool]:
+    key = (db.name, base)
+    now = time.monotonic()
+    with _CATALOG_LOCK:
+        hit = _CATALOG.get(key)
+        if hit and not fresh and hit[0] > now:
+            return hit[1], hit[2]
+    parts, has_base = _scan(db, base)
+    with _CATALOG_LOCK:
+        _CATALOG[key] = (now + CATALOG_TTL_SEC, parts, has_base)
+    return parts, has_base
+
+
+def invalidate(base: Optional[str] = None) -> None:
+    with _CATALOG_LOCK:
+        for key in list(_CATALOG):
+            if base is None or key[1] == base:
+                del _CATALOG[key]
+
+
+# ------------------------------------------------------------
+# Query routing
+# ------------------------------------------------------------
+def route(
+    db: Database,
+    base: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[str]:
+    """
+    Collections a [start, end] day window needs, newest partition first, then the
+    base collection (when it exists) for data written before partitioning.
+    """
+    parts, has_base = _catalog(db, base)
+    names = [
+        name for day, name in reversed(parts)
+        if (start is None or day >= start) and (end is None or day <= end)
+    ]
+    if has_base:
+        names.append(base)
+    return names
+
+
+def route_flow(db: Database, base: str, sent_day: Optional[date]) -> List[str]:
+    """
+    Collections that can hold a flow's documents: its send day and the next one
+    (events of a flow sent just before midnight), or everything when the day is unknown.
+    """
+    if sent_day is None:
+        return route(db, base)
+    return route(db, base, sent_day, sent_day + timedelta(days=1))
+
+
+def newest_time(
+    db: Database,
+    base: str,
+    names: List[str],
+    time_field: str,
+    query: Optional[Dict[str, Any]] = None,
+) -> Optional[str]:
+    """
+    Largest time_field value over the routed collections (of the documents matching query).
+    Partitions come newest first, so the first non-empty one decides; the base collection
+    is always checked.
+    """
+    newest: Optional[str] = None
+    for name in names:
+        if name != base and newest is not None:
+            continue  # an older partition cannot hold anything newer
+        doc = db[name].find_one(
+            {**(query or {}), time_field: {"$exists": True}},
+            {"_id": 0, time_field: 1},
+            sort=[(time_field, -1)],
+        )
+        value = doc_time(doc, time_field) if doc else None
+        if value and (newest is None or value > newest):
+            newest = value
+    return newest
@@ -0,0 +1,250 @@
+# replay_events.py
+# ------------------------------------------------------------
+# Replays the JSONL files written by data_manufacturing.write_jsonl in
+# event-time order, at a chosen speed-up, into the ingestion endpoint
+# or straight into Mongo. Reports achieved events/sec, lag and errors.
+#
+# Run:
+#   python replay_events.py dream_city_tech_events.jsonl dream_city_business_events.jsonl \
+#       --speed 10 --target http://127.0.0.1:8050/ingest/events
+#   python replay_events.py /mnt/data/*.jsonl --speed max --target mongo
+# ------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from dataset_writers import iter_jsonl
+
+MONGO_URI = "mongodb://localhost:27017"
+DB_NAME = "SAP_Monitor"
+# a batch the endpoint keeps answering 429 for is counted as failed after this
+MAX_THROTTLED_SEC = 60.0
+
+COLLECTION_BY_KIND = {
+    "TECH"    : "tech_events",
+    "BUSINESS": "business_events",
+    "ROLLUP"  : "rollup_flows",
+}
+
+
+# ------------------------------------------------------------
+# Reading / ordering
+# ------------------------------------------------------------
+def event_kind(e: Dict[str, Any]) -> str:
+    if e.get("layer") in ("TECH", "BUSINESS"):
+        return e["layer"]
+    return "ROLLUP"
+
+
+def event_time(e: Dict[str, Any]) -> Optional[float]:
+    """
+    Event time used for ordering: checkpoint time for tech events,
+    WMS response (or send) time for business events, send time for rollups.
+    """
+    ts = e.get("timestamps") or {}
+    value = ts.get("event_utc") or ts.get("wms_responded_utc") or ts.get("order_sent_utc")
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def load_timeline(paths: List[str]) -> Tuple[List[Tuple[float, str, str]], int]:
+    """
+    -> ([(event_ts, kind, raw_line)] sorted by time, n_skipped).
+    Raw lines are kept so the HTTP path never re-serializes. .gz / .zst files are read as-is.
+    """
+    timeline: List[Tuple[float, str, str]] = []
+    skipped = 0
+    for path in paths:
+        for line in iter_jsonl(path):
+            e = json.loads(line)
+            ts = event_time(e)
+            if ts is None:
+                skipped += 1
+                continue
+            timeline.append((ts, event_kind(e), line))
+    timeline.sort(key=lambda t: t[0])
+    return timeline, skipped
+
+
+# ------------------------------------------------------------
+# Sinks
+# ------------------------------------------------------------
+class HttpSink:
+    def __init__(self, url: str, timeout: float = 10.0, max_throttled: float = MAX_THROTTLED_SEC):
+        self.url = url
+        self.timeout = timeout
+        self.max_throttled = max_throttled
+        self.throttled = 0
+        self.skipped = 0  # rollups: the endpoint only takes events
+
+    def send(self, batch: List[Tuple[float, str, str]]) -> int:
+        """
+        Returns the number of events that failed. Retries while the server applies
+        backpressure, for at most max_throttled seconds.
+        """
+        lines = [line for _, kind, line in batch if kind != "ROLLUP"]
+        self.skipped += len(batch) - len(lines)
+        if not lines:
+            return 0
+        body = ("\n".join(lines) + "\n").encode("utf-8")
+        deadline = time.monotonic() + self.max_throttled
+        while True:
+            req = urllib.request.Request(
+                self.url,
+                data=body,
+                method="POST",
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+            try:
+                with urllib.request.urlopen(req, timeout=self.timeout):
+                    return 0
+            except urllib.error.HTTPError as exc:
+                wait = float(exc.headers.get("Retry-After") or 1)
+                if exc.code == 429 and time.monotonic() + wait <= deadline:
+                    self.throttled += 1
+                    time.sleep(wait)
+                    continue
+                return len(lines)
+            except (urllib.error.URLError, OSError):
+                return len(lines)
+
+
+class MongoSink:
+    def __init__(self, uri: str, db_name: str):
+        from pymongo import MongoClient
+        self.db = MongoClient(uri, serverSelectionTimeoutMS=3000)[db_name]
+        self.throttled = 0
+        self.skipped = 0
+
+    def send(self, batch: List[Tuple[float, str, str]]) -> int:
+        from pymongo.errors import PyMongoError
+        by_kind: Dict[str, List[Dict[str, Any]]] = {}
+        for _, kind, line in batch:
+            by_kind.setdefault(kind, []).append(json.loads(line))
+        failed = 0
+        for kind, docs in by_kind.items():
+            try:
+                self.db[COLLECTION_BY_KIND[kind]].insert_many(docs, ordered=False)
+            except PyMongoError:
+                failed += len(docs)
+        return failed
+
+
+# ------------------------------------------------------------
+# Replay loop
+# ------------------------------------------------------------
+def replay(
+    timeline: List[Tuple[float, str, str]],
+    sink,
+    speed: Optional[float],
+    batch_size: int = 500,
+    report_every: float = 5.0,
+) -> Dict[str, Any]:
+    """
+    speed=None replays as fast as the sink accepts ("max").
+    Lag is how far behind its scheduled wall-clock time a batch was sent.
+    Events the sink does not take (rollups over HTTP) are reported as skipped,
+    not sent, so events_per_sec is what reached the sink.
+    """
+    if not timeline:
+        return {"events": 0}
+
+    first_ts = timeline[0][0]
+    wall_start = time.monotonic()
+    next_report = wall_start + report_every
+
+    sent = errors = 0
+    max_lag = last_lag = 0.0
+    i = 0
+    n = len(timeline)
+    while i < n:
+        now = time.monotonic()
+        if speed is None:
+            j = min(i + batch_size, n)
+        else:
+            due = wall_start + (timeline[i][0] - first_ts) / speed
+            if due > now:
+                time.sleep(min(due - now, 1.0))
+                continue
+            # everything whose scheduled time has passed, up to batch_size
+            horizon = first_ts + (now - wall_start) * speed
+            j = i
+            while j < n and j - i < batch_size and timeline[j][0] <= horizon:
+                j += 1
+            last_lag = now - (wall_start + (timeline[i][0] - first_ts) / speed)
+            max_lag = max(max_lag, last_lag)
+
+        batch = timeline[i:j]
+        skipped = sink.skipped
+        errors += sink.send(batch)
+        sent += len(batch) - (sink.skipped - skipped)
+        i = j
+
+        now = time.monotonic()
+        if now >= next_report:
+            elapsed = now - wall_start
+            print(
+                f"[replay] {i}/{n} replayed  {sent / elapsed:,.0f} ev/s  "
+                f"lag={last_lag:.2f}s (max {max_lag:.2f}s)  errors={errors}  "
+                f"skipped={sink.skipped}  throttled={sink.throttled}",
+                file=sys.stderr,
+            )
+            next_report = now + report_every
+
+    elapsed = time.monotonic() - wall_start
+    return {
+        "events"        : sent,
+        "errors"        : errors,
+        "skipped"       : sink.skipped,
+        "throttled"     : sink.throttled,
+        "elapsed_sec"   : round(elapsed, 2),
+        "events_per_sec": round(sent / max(elapsed, 1e-9), 1),
+        "max_lag_sec"   : round(max_lag, 3),
+        "event_span_sec": round(timeline[-1][0] - first_ts, 1),
+    }
+
+
+def parse_speed(value: str) -> Optional[float]:
+    if value.lower() == "max":
+        return None
+    v = float(value.lower().rstrip("x"))
+    if v <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return v
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Replay generated JSONL events in event-time order.")
+    ap.add_argument("files", nargs="+",
+                    help="JSONL files (optionally .gz / .zst) written by data_manufacturing")
+    ap.add_argument("--speed", type=parse_speed, default=1.0,
+                    help="speed-up factor (1, 10, 3600...) or 'max'")
+    ap.add_argument("--target", default="http://127.0.0.1:8050/ingest/events",
+                    help="ingestion URL, or 'mongo' to insert directly")
+    ap.add_argument("--mongo-uri", default=MONGO_URI)
+    ap.add_argument("--db", default=DB_NAME)
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--report-every", type=float, default=5.0,
+                    help="seconds between progress lines")
+    args = ap.parse_args(argv)
+
+    timeline, skipped = load_timeline(args.files)
+    print(f"[replay] loaded {len(timeline)} events ({skipped} without timestamp skipped)",
+          file=sys.stderr)
+
+    sink = MongoSink(args.mongo_uri, args.db) if args.target == "mongo" else HttpSink(args.target)
+    summary = replay(timeline, sink, args.speed, args.batch_size, args.report_every)
+    print(json.dumps(summary, indent=2))
+    return 0 if not summary.get("errors") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
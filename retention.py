@@ -0,0 +1,301 @@
+# retention.py
+# ------------------------------------------------------------
+# Day partitions and archiving for rollup_flows / tech_events / business_events.
+#
+#   list            partitions per collection with document counts
+#   partition       move the documents of the unsuffixed collections into
+#                   <collection>_YYYYMMDD day partitions (batch by batch)
+#   ensure-indexes  correlation_id + time field on every partition (+ city, time on rollups)
+#   archive         write partitions older than --keep-days to compressed JSONL
+#                   under --archive-dir, verify the line count, then delete the
+#                   archived documents (late arrivals stay for the next run)
+#   restore         load an archived file back into its partition
+#
+# Readers (data_store.load_rollups, the detail page, the Mongo export) route
+# through partitions.route, so after `partition` they only touch the days a
+# window needs; after `archive` the hot set is the kept days.
+#
+# In the app, schedule_retention() runs ensure-indexes (and archive, when
+# RETENTION_KEEP_DAYS is set) on the scheduler leader only.
+#
+# Run:
+#   python retention.py partition
+#   python retention.py archive --keep-days 30 --archive-dir /mnt/archive --compression zstd
+#   python retention.py restore /mnt/archive/SAP_Monitor/tech_events_20251209.jsonl.zst
+# ------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional
+
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.database import Database
+from pymongo.errors import BulkWriteError
+
+import dataset_writers
+from partitions import group_by_partition, invalidate, list_partitions
+
+MONGO_URI = "mongodb://localhost:27017"
+DB_NAME = "SAP_Monitor"
+
+# same collections / time fields as data_store.TIME_FIELDS
+TIME_FIELDS = {
+    "rollup_flows"   : "timestamps.order_sent_utc",
+    "tech_events"    : "timestamps.event_utc",
+    "business_events": "timestamps.order_sent_utc",
+}
+BATCH = 5000
+DUPLICATE_KEY = 11000
+
+# Scheduled in the app (leader only, see scheduler.py); 0 disables
+INDEX_INTERVAL_SEC = 6 * 3600
+RETENTION_INTERVAL_SEC = 24 * 3600
+RETENTION_KEEP_DAYS = 0  # >0: archive partitions older than this many days
+RETENTION_ARCHIVE_DIR = "archive"
+RETENTION_COMPRESSION = "gzip"
+
+
+def _collections(arg: str) -> List[str]:
+    return list(TIME_FIELDS) if arg == "all" else [arg]
+
+
+# ------------------------------------------------------------
+# Commands
+# ------------------------------------------------------------
+def cmd_list(db: Database, collections: List[str]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for base in collections:
+        parts = list_partitions(db, base, fresh=True)
+        out[base] = {
+            "unpartitioned": db[base].estimated_document_count()
+                             if base in db.list_collection_names() else 0,
+            "partitions"   : {name: db[name].estimated_document_count() for _, name in parts},
+        }
+    return out
+
+
+def cmd_partition(db: Database, collections: List[str], batch: int = BATCH) -> Dict[str, int]:
+    """
+    Moves documents base -> day partition. Each batch is inserted before it is deleted,
+    so an interrupted run leaves duplicates at worst, never gaps; rerunning skips the
+    copies already in the partition (same _id) and deletes them from the base.
+    """
+    moved: Dict[str, int] = {}
+    for base in collections:
+        field = TIME_FIELDS[base]
+        n = 0
+        last_id = None
+        while True:
+            query = {} if last_id is None else {"_id": {"$gt": last_id}}
+            docs = list(db[base].find(query).sort("_id", ASCENDING).limit(batch))
+            if not docs:
+                break
+            last_id = docs[-1]["_id"]
+            for name, part in group_by_partition(docs, base, field).items():
+                if name == base:
+                    continue  # no usable time: stays where it is
+                try:
+                    db[name].insert_many(part, ordered=False)
+                except BulkWriteError as exc:
+                    errors = exc.details.get("writeErrors", [])
+                    if any(e.get("code") != DUPLICATE_KEY for e in errors):
+                        raise
+                db[base].delete_many({"_id": {"$in": [d["_id"] for d in part]}})
+                n += len(part)
+            print(f"[partition] {base}: {n} moved", file=sys.stderr)
+        moved[base] = n
+        invalidate(base)
+    return moved
+
+
+def cmd_ensure_indexes(db: Database, collections: List[str]) -> int:
+    n = 0
+    for base in collections:
+        names = [name for _, name in list_partitions(db, base, fresh=True)] + [base]
+        for name in names:
+            db[name].create_index([("correlation_id", ASCENDING)])
+            db[name].create_index([(TIME_FIELDS[base], ASCENDING)])
+            if base == "rollup_flows":
+                # per-city shard loads: newest first within a city
+                db[name].create_index([("city", ASCENDING), (TIME_FIELDS[base], DESCENDING)])
+            n += 1
+    return n
+
+
+def archive_path(archive_dir: str, db_name: str, name: str, compression: str) -> str:
+    """
+    <name>.jsonl for the first archive of a partition, <name>.<n>.jsonl for the late
+    documents a later run picks up, so an earlier file is never overwritten.
+    """
+    base = os.path.join(archive_dir, db_name, name)
+    path = dataset_writers.jsonl_path(base + ".jsonl", compression)
+    n = 1
+    while os.path.exists(path):
+        path = dataset_writers.jsonl_path(f"{base}.{n}.jsonl", compression)
+        n += 1
+    return path
+
+
+def cmd_archive(
+    db: Database,
+    collections: List[str],
+    keep_days: int,
+    archive_dir: str,
+    compression: str,
+    today: date,
+    dry_run: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Partitions older than today - keep_days -> <archive_dir>/<db>/<name>.jsonl[.gz|.zst].
+    Only the documents written to a complete file are deleted, and the partition is dropped
+    once it is empty: events ingest routes to the day while the file is written are kept
+    for the next run instead of being dropped unarchived.
+    """
+    cutoff = today - timedelta(days=keep_days)
+    os.makedirs(os.path.join(archive_dir, db.name), exist_ok=True)
+    done: List[Dict[str, Any]] = []
+    for base in collections:
+        for day, name in list_partitions(db, base, fresh=True):
+            if day >= cutoff:
+                continue
+            path = archive_path(archive_dir, db.name, name, compression)
+            expected = db[name].count_documents({})
+            entry = {"collection": name, "documents": expected, "file": path}
+            if dry_run:
+                done.append(entry)
+                continue
+
+            # hidden temp name with the same suffix, so the codec matches the final file
+            tmp = os.path.join(os.path.dirname(path), "." + os.path.basename(path))
+            docs = db[name].find({}, batch_size=BATCH)
+            archived: List[Any] = []
+            with dataset_writers.open_text(tmp, "w") as f:
+                for d in docs:
+                    archived.append(d.pop("_id"))
+                    f.write(json.dumps(d, ensure_ascii=False) + "\n")
+            written = len(archived)
+            if written < expected:
+                os.remove(tmp)
+                raise RuntimeError(
+                    f"{name}: archived {written} of {expected} documents, partition kept"
+                )
+            os.replace(tmp, path)
+            for i in range(0, written, BATCH):
+                db[name].delete_many({"_id": {"$in": archived[i:i + BATCH]}})
+            late = db[name].count_documents({})
+            if not late:
+                db.drop_collection(name)
+            entry.update(documents=written, bytes=os.path.getsize(path), late=late)
+            done.append(entry)
+            print(f"[archive] {name}: {written} docs -> {path}, {late} late kept", file=sys.stderr)
+        invalidate(base)
+    return done
+
+
+def cmd_restore(db: Database, path: str, batch: int = BATCH) -> Dict[str, Any]:
+    # <name>.jsonl or <name>.<n>.jsonl (late documents), see archive_path
+    name = os.path.basename(path).split(".jsonl")[0].split(".")[0]
+    buf: List[Dict[str, Any]] = []
+    n = 0
+    for line in dataset_writers.iter_jsonl(path):
+        buf.append(json.loads(line))
+        if len(buf) >= batch:
+            db[name].insert_many(buf, ordered=False)
+            n += len(buf)
+            buf = []
+    if buf:
+        db[name].insert_many(buf, ordered=False)
+        n += len(buf)
+    invalidate()
+    return {"collection": name, "documents": n}
+
+
+# ------------------------------------------------------------
+# Scheduled runs (in the app)
+# ------------------------------------------------------------
+def _app_db() -> Database:
+    from data_store import DB_NAME as APP_DB_NAME, get_client  # the app's client, not this CLI's
+    return get_client()[APP_DB_NAME]
+
+
+def scheduled_ensure_indexes() -> None:
+    cmd_ensure_indexes(_app_db(), list(TIME_FIELDS))
+
+
+def scheduled_archive() -> None:
+    today = datetime.now(timezone.utc).date()
+    cmd_archive(
+        _app_db(), list(TIME_FIELDS), RETENTION_KEEP_DAYS, RETENTION_ARCHIVE_DIR,
+        RETENTION_COMPRESSION, today,
+    )
+
+
+def schedule_retention(scheduler=None) -> None:
+    """
+    Leader-only jobs: one process of the deployment maintains indexes / archives.
+    """
+    from scheduler import SCHEDULER
+    scheduler = scheduler or SCHEDULER
+    scheduler.add(
+        "ensure-indexes", scheduled_ensure_indexes, INDEX_INTERVAL_SEC,
+        leader_only=True, initial_delay=60,
+    )
+    if RETENTION_KEEP_DAYS > 0:
+        scheduler.add(
+            "archive", scheduled_archive, RETENTION_INTERVAL_SEC,
+            leader_only=True, initial_delay=300,
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(
+        description="Day partitions, archiving and restore for the SAP monitor collections.",
+    )
+    ap.add_argument("--mongo-uri", default=MONGO_URI)
+    ap.add_argument("--db", default=DB_NAME)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    for cmd in ("list", "partition", "ensure-indexes", "archive"):
+        p = sub.add_parser(cmd)
+        p.add_argument("--collection", default="all", choices=["all"] + list(TIME_FIELDS))
+        if cmd == "partition":
+            p.add_argument("--batch", type=int, default=BATCH)
+        if cmd == "archive":
+            p.add_argument("--keep-days", type=int, required=True,
+                           help="partitions older than this are archived")
+            p.add_argument("--archive-dir", default="archive")
+            p.add_argument("--compression", choices=["gzip", "zstd"], default="gzip")
+            p.add_argument("--today", type=date.fromisoformat, default=None,
+                           help="reference day (YYYY-MM-DD), default today UTC")
+            p.add_argument("--dry-run", action="store_true")
+    p = sub.add_parser("restore")
+    p.add_argument("file", help="archived <collection>_YYYYMMDD.jsonl[.gz|.zst]")
+
+    args = ap.parse_args(argv)
+    db = MongoClient(args.mongo_uri, serverSelectionTimeoutMS=3000)[args.db]
+
+    if args.command == "list":
+        result: Any = cmd_list(db, _collections(args.collection))
+    elif args.command == "partition":
+        result = cmd_partition(db, _collections(args.collection), args.batch)
+    elif args.command == "ensure-indexes":
+        result = {"indexed_collections": cmd_ensure_indexes(db, _collections(args.collection))}
+    elif args.command == "archive":
+        today = args.today or datetime.now(timezone.utc).date()
+        result = cmd_archive(
+            db, _collections(args.collection), args.keep_days, args.archive_dir, args.compression,
+            today, args.dry_run,
+        )
+    else:
+        result = cmd_restore(db, args.file)
+
+    print(json.dumps(result, indent=2, default=str))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Scenario profiles for data_manufacturing: incident-shaped load instead of constant rates.
+
+A profile is a plain dict (built in below, or a JSON file with the same shape):
+
+    {
+      "description": "...",
+      "hourly":  [24 traffic weights by UTC hour of day],          # optional, default flat
+      "bursts":  [{"at": 0.30, "minutes": 30, "x": 6}],            # traffic multiplier
+      "rates":   {"p_late": 0.01},                                 # base overrides
+      "windows": [{"at": 0.62, "minutes": 90, "rates": {"p_late": 0.08}, "ramp": "linear"}],
+      "outages": [{"at": 0.45, "minutes": 40, "reason": "FIREWALL_DROP",
+                   "plants": ["DC02"], "share": 1.0, "ramp": "step"}]
+    }
+
+`at` is a fraction of the generation window, so a profile fits any --start/--end;
+`minutes` are absolute. Window rates are the values reached inside the window
+("linear" ramps up from the surrounding rate to them, "step" applies them at once).
+An outage fails `share` of the flows to its plants (all plants when omitted) with
+`reason`, at the checkpoint data_manufacturing.reason_transport assigns to it.
+"""
+import json
+import os
+import random
+from datetime import timedelta
+
+import data_manufacturing as dm
+
+RATE_NAMES = dm.RATE_NAMES
+REASON_CHECKPOINT = dict(dm.reason_transport)
+RAMPS = ("step", "linear")
+
+# UTC hour-of-day traffic shape of the Dream-City plants (night shift is quiet)
+DIURNAL = [
+    0.2, 0.15, 0.1, 0.1, 0.15, 0.3, 0.6, 1.0, 1.4, 1.6, 1.7, 1.6,
+    1.4, 1.5, 1.6, 1.6, 1.4, 1.2, 1.0, 0.8, 0.6, 0.5, 0.4, 0.3,
+]
+
+PROFILES = {
+    "baseline": {
+        "description": "Constant rates, uniform traffic (the generator's default behaviour).",
+    },
+    "diurnal": {
+        "description": "Day/night traffic curve, constant failure rates.",
+        "hourly": DIURNAL,
+    },
+    "fw_outage": {
+        "description": "Firewall drops every flow to DC02 for 40 minutes mid-window.",
+        "hourly": DIURNAL,
+        "outages": [
+            {
+                "at"     : 0.45,
+                "minutes": 40,
+                "reason" : "FIREWALL_DROP",
+                "plants" : ["DC02"],
+                "share"  : 1.0,
+            },
+        ],
+    },
+    "po_backlog": {
+        "description": "PO adapter queue backs up over 90 minutes, "
+                       "then WMS answers late while it drains.",
+        "hourly": DIURNAL,
+        "outages": [
+            {
+                "at"     : 0.60,
+                "minutes": 90,
+                "reason" : "PO_QUEUE_BACKLOG",
+                "share"  : 0.7,
+                "ramp"   : "linear",
+            },
+        ],
+        "windows": [
+            {
+                "at"     : 0.60,
+                "minutes": 180,
+                "rates"  : {"p_late": 0.25, "p_no_response": 0.01},
+                "ramp"   : "linear",
+            },
+        ],
+    },
+    "peak_burst": {
+        "description": "Order bursts (x6 for 30 minutes, x3 for 2 hours) with more late responses.",
+        "hourly": DIURNAL,
+        "bursts": [
+            {"at": 0.30, "minutes": 30, "x": 6},
+            {"at": 0.75, "minutes": 120, "x": 3},
+        ],
+        "windows": [
+            {"at": 0.30, "minutes": 30, "rates": {"p_late": 0.05}},
+            {"at": 0.75, "minutes": 120, "rates": {"p_late": 0.03}},
+        ],
+    },
+    "incident_day": {
+        "description": "Everything at once: cert expiry on DC01, firewall outage on DC03, "
+                       "a PO backlog and a burst.",
+        "hourly": DIURNAL,
+        "bursts": [
+            {"at": 0.50, "minutes": 60, "x": 4},
+        ],
+        "outages": [
+            {
+                "at"     : 0.20,
+                "minutes": 25,
+                "reason" : "TLS_CERT_EXPIRED",
+                "plants" : ["DC01"],
+                "share"  : 1.0,
+            },
+            {
+                "at"     : 0.45,
+                "minutes": 40,
+                "reason" : "FIREWALL_DROP",
+                "plants" : ["DC03"],
+                "share"  : 1.0,
+            },
+            {
+                "at"     : 0.70,
+                "minutes": 90,
+                "reason" : "PO_QUEUE_BACKLOG",
+                "share"  : 0.5,
+                "ramp"   : "linear",
+            },
+        ],
+        "windows": [
+            {"at": 0.50, "minutes": 60, "rates": {"p_late": 0.05}},
+            {"at": 0.70, "minutes": 150, "rates": {"p_late": 0.2}, "ramp": "linear"},
+        ],
+    },
+}
+
+
+# ------------------------------------------------------------
+# Compiled profile
+# ------------------------------------------------------------
+class _Span:
+    """
+    [start, end) in seconds after the window start, with an optional linear ramp.
+    factor() works on ints and on numpy arrays alike.
+    """
+
+    def __init__(self, spec, span_sec):
+        self.start = int(float(spec["at"]) * span_sec)
+        self.end = self.start + int(float(spec["minutes"]) * 60)
+        self.ramp = spec.get("ramp", "step")
+        if self.ramp not in RAMPS:
+            raise ValueError(f"unknown ramp {self.ramp!r} (expected one of {RAMPS})")
+
+    def factor(self, t):
+        inside = (t >= self.start) & (t < self.end)
+        if self.ramp == "linear":
+            return inside * ((t - self.start) / max(self.end - self.start, 1))
+        return inside * 1.0
+
+
+class ScenarioProfile:
+    def __init__(self, name, spec, start=dm.start_utc, end=dm.end_utc):
+        self.name = name
+        self.description = spec.get("description", "")
+        self.start = start
+        # same send window as the default generator
+        self.span_sec = int((end - timedelta(minutes=10) - start).total_seconds())
+
+        unknown = set(spec) - {"description", "hourly", "bursts", "rates", "windows", "outages"}
+        if unknown:
+            raise ValueError(f"profile {name!r}: unknown keys {sorted(unknown)}")
+
+        self.base = dm.base_rates()
+        self.base.update(_check_rates(name, spec.get("rates", {})))
+        self.windows = [
+            (_Span(w, self.span_sec), _check_rates(name, w["rates"]))
+            for w in spec.get("windows", [])
+        ]
+
+        self.outages = []
+        for o in spec.get("outages", []):
+            if o["reason"] not in REASON_CHECKPOINT:
+                raise ValueError(f"profile {name!r}: unknown outage reason {o['reason']!r}")
+            plants = o.get("plants") or list(dm.plants)
+            bad = set(plants) - set(dm.plants)
+            if bad:
+                raise ValueError(f"profile {name!r}: unknown plants {sorted(bad)}")
+            share = float(o.get("share", 1.0))
+            self.outages.append((_Span(o, self.span_sec), o["reason"], set(plants), share))
+
+        # per-minute traffic weights -> cumulative weights for sampling send times
+        hourly = spec.get("hourly") or [1.0] * 24
+        if len(hourly) != 24:
+            raise ValueError(f"profile {name!r}: 'hourly' needs 24 weights")
+        self.bursts = bursts = [
+            (_Span(b, self.span_sec), float(b["x"])) for b in spec.get("bursts", [])
+        ]
+        start_hour = start.hour + start.minute / 60.0
+        self.minute_weights = []
+        for m in range(self.span_sec // 60 + 1):
+            w = float(hourly[int(start_hour + m / 60.0) % 24])
+            for s, x in bursts:
+                if s.factor(m * 60):
+                    w *= x
+            self.minute_weights.append(w)
+        self._minutes = range(len(self.minute_weights))
+        self._cum = []
+        total = 0.0
+        for w in self.minute_weights:
+            total += w
+            self._cum.append(total)
+
+    # --------------------------------------------------------
+    # python backend (one flow at a time, `random` module)
+    # --------------------------------------------------------
+    def rand_send(self):
+        m = random.choices(self._minutes, cum_weights=self._cum)[0]
+        return self.start + timedelta(seconds=min(m * 60 + random.randint(0, 59), self.span_sec))
+
+    def offset_of(self, sent):
+        return int((sent - self.start).total_seconds())
+
+    def rates_at(self, offset):
+        rates = dict(self.base)
+        for span, target in self.windows:
+            f = span.factor(offset)
+            if f:
+                for k, v in target.items():
+                    rates[k] += (v - rates[k]) * f
+        return rates
+
+    def outage_at(self, offset, plant):
+        """
+        -> (reason, checkpoint) when this flow is caught by an outage, else None.
+        """
+        for span, reason, plants, share in self.outages:
+            if plant in plants:
+                f = span.factor(offset)
+                if f and random.random() < share * f:
+                    return reason, REASON_CHECKPOINT[reason]
+        return None
+
+    # --------------------------------------------------------
+    # numpy backend (all flows at once, numpy Generator)
+    # --------------------------------------------------------
+    def send_offsets_np(self, rng, n):
+        total = self._cum[-1]
+        minute = rng.choice(len(self.minute_weights), n, p=[w / total for w in self.minute_weights])
+        return (minute * 60 + rng.integers(0, 60, n)).clip(0, self.span_sec)
+
+    def rate_arrays_np(self, offsets):
+        rates = {k: offsets * 0.0 + v for k, v in self.base.items()}
+        for span, target in self.windows:
+            f = span.factor(offsets)
+            for k, v in target.items():
+                rates[k] = rates[k] + (v - rates[k]) * f
+        return rates
+
+    def outages_np(self, rng, offsets, plant_idx):
+        """
+        -> per-flow outage reason (None when not hit), later outages win on overlap.
+        """
+        reasons = [None] * len(offsets)
+        for span, reason, plants, share in self.outages:
+            in_plant = sum(plant_idx == dm.plants.index(p) for p in plants)
+            hit = rng.random(len(offsets)) < share * span.factor(offsets) * in_plant
+            for k in hit.nonzero()[0].tolist():
+                reasons[k] = reason
+        return reasons
+
+    def summary(self):
+        lines = [f"{self.name}: {self.description}"]
+        for span, x in self.bursts:
+            lines.append(f"  burst   x{x:g} traffic  {_at(self.start, span)}")
+        for span, reason, plants, share in self.outages:
+            lines.append(
+                f"  outage  {reason:<18} plants={','.join(sorted(plants))} share={share:g} "
+                f"{_at(self.start, span)}"
+            )
+        for span, target in self.windows:
+            rates = ", ".join(f"{k}={v:g}" for k, v in target.items())
+            lines.append(f"  rates   {rates}  {_at(self.start, span)}")
+        return "\n".join(lines)
+
+
+def _at(start, span):
+    t0 = start + timedelta(seconds=span.start)
+    return f"{t0:%Y-%m-%d %H:%M}Z +{(span.end - span.start) // 60}min ({span.ramp})"
+
+
+def _check_rates(name, rates):
+    unknown = set(rates) - set(RATE_NAMES)
+    if unknown:
+        raise ValueError(
+            f"profile {name!r}: unknown rates {sorted(unknown)} (expected {RATE_NAMES})"
+        )
+    return {k: float(v) for k, v in rates.items()}
+
+
+def load_profile(name_or_path, start=dm.start_utc, end=dm.end_utc):
+    """
+    Built-in profile name, or path to a JSON file with the same shape.
+    """
+    if name_or_path in PROFILES:
+        return ScenarioProfile(name_or_path, PROFILES[name_or_path], start, end)
+    if os.path.exists(name_or_path):
+        with open(name_or_path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        name = os.path.splitext(os.path.basename(name_or_path))[0]
+        return ScenarioProfile(name, spec, start, end)
+    raise ValueError(f"unknown profile {name_or_path!r} (built-in: {', '.join(PROFILES)})")
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Any, Optional
+
+from flask import Flask, jsonify
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+# ------------------------------------------------------------
+# In-app scheduler for periodic data tasks
+#   Every worker process runs one Scheduler. Jobs come in two kinds:
+#     local        in every process (e.g. the rollup reload: each worker
+#                  has its own in-memory store), spread out by jitter
+#     leader_only  only in the process holding the leader lock, so the
+#                  deployment runs them once per interval (retention,
+#                  index maintenance, anything writing shared state)
+#   The leader lock is a lease document in Mongo (SCHEDULER_LOCK="mongo",
+#   any host) or an flock on a local file (="file", one host); "none" makes
+#   every process its own leader. A job never overlaps itself: a run that is
+#   due while the previous one is still going is skipped and counted.
+# ------------------------------------------------------------
+SCHEDULER_LOCK = "mongo"  # "mongo", "file" or "none"
+LOCK_COLLECTION = "scheduler_locks"
+LOCK_NAME = "sap-monitor-scheduler"
+LOCK_TTL_SEC = 30  # a leader that stops renewing loses the lease after this
+LOCK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".scheduler.lock")
+TICK_SEC = 1.0
+JOB_WORKERS = 4
+
+OWNER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+# ------------------------------------------------------------
+# Leader locks: try_acquire() -> True while this process is the leader
+# ------------------------------------------------------------
+class MongoLeaderLock:
+    """
+    Lease in {_id: name, owner, expires_at}: taken when free or expired, renewed by its owner.
+    """
+    def __init__(self, get_db: Callable[[], Any], name: str = LOCK_NAME, ttl: float = LOCK_TTL_SEC):
+        self.get_db = get_db
+        self.name = name
+        self.ttl = ttl
+
+    def try_acquire(self) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            self.get_db()[LOCK_COLLECTION].find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": OWNER_ID}, {"expires_at": {"$lt": now}}]},
+                {"$set": {
+                    "owner"     : OWNER_ID,
+                    "expires_at": now + timedelta(seconds=self.ttl),
+                    "renewed_at": now,
+                }},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False  # held by another live owner (the upsert collided with its document)
+        except PyMongoError as exc:
+            print(f"[scheduler] leader lock unavailable: {exc}", file=sys.stderr)
+            return False
+        return True  # matched our own / an expired lease, or created the first one
+
+    def release(self) -> None:
+        try:
+            self.get_db()[LOCK_COLLECTION].delete_one({"_id": self.name, "owner": OWNER_ID})
+        except PyMongoError:
+            pass
+
+
+class FileLeaderLock:
+    """
+    Exclusive flock on LOCK_FILE, held for the life of the process (released by the OS on exit).
+    """
+    def __init__(self, path: str = LOCK_FILE):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def try_acquire(self) -> bool:
+        if self._fd is not None:
+            return True
+        import fcntl  # POSIX only
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, OWNER_ID.encode())
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class NoLeaderLock:
+    def try_acquire(self) -> bool:
+        return True
+
+    def release(self) -> None:
+        pass
+
+
+def make_leader_lock(kind: str = SCHEDULER_LOCK):
+    if kind == "mongo":
+        from data_store import DB_NAME, STORAGE_BACKEND, get_client
+        if STORAGE_BACKEND != "mongo":
+            return FileLeaderLock()  # no Mongo to hold the lease: one host, one leader
+        return MongoLeaderLock(lambda: get_client()[DB_NAME])
+    if kind == "file":
+        return FileLeaderLock()
+    if kind == "none":
+        return NoLeaderLock()
+    raise ValueError(f"unknown scheduler lock: {kind} (mongo, file, none)")
+
+
+# ------------------------------------------------------------
+# Jobs
+# ------------------------------------------------------------
+class Job:
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        interval: float,
+        jitter: float = 0.1,
+        leader_only: bool = False,
+        initial_delay: Optional[float] = None,
+    ):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter  # fraction of the interval added at random to every wait
+        self.leader_only = leader_only
+        self.running = False
+        delay = interval if initial_delay is None else initial_delay
+        self.next_run = time.monotonic() + delay * (1 + random.uniform(0, jitter))
+        self.metrics: Dict[str, Any] = {
+            "runs"            : 0,
+            "failures"        : 0,
+            "skipped_overlap" : 0,
+            "skipped_follower": 0,
+            "last_started_utc": None,
+            "last_ms"         : None,
+            "avg_ms"          : None,
+            "max_ms"          : 0.0,
+            "last_error"      : None,
+        }
+
+    def _jitter(self) -> float:
+        return random.uniform(0, self.jitter * self.interval)
+
+    def schedule_next(self, now: float) -> None:
+        self.next_run = now + self.interval + self._jitter()
+
+    def run(self) -> None:
+        started = time.monotonic()
+        self.metrics["last_started_utc"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        try:
+            self.fn()
+            self.metrics["last_error"] = None
+        except Exception as exc:  # a failing job must not stop the scheduler
+            self.metrics["failures"] += 1
+            self.metrics["last_error"] = f"{type(exc).__name__}: {exc}"
+            print(f"[scheduler] {self.name} failed: {exc}", file=sys.stderr)
+        finally:
+            ms = round((time.monotonic() - started) * 1000, 1)
+            m = self.metrics
+            m["runs"] += 1
+            m["last_ms"] = ms
+            m["avg_ms"] = ms if m["avg_ms"] is None else round(0.8 * m["avg_ms"] + 0.2 * ms, 1)
+            m["max_ms"] = max(m["max_ms"], ms)
+            self.running = False
+
+
+class Scheduler:
+    def __init__(self, lock=None, tick: float = TICK_SEC, workers: int = JOB_WORKERS):
+        self.lock = lock  # leader lock; make_leader_lock() on start when None
+        self.tick = tick
+        self.jobs: Dict[str, Job] = {}
+        self.is_leader = False
+        self._mutex = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scheduler-job")
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._next_renew = 0.0
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        interval: float,
+        jitter: float = 0.1,
+        leader_only: bool = False,
+        initial_delay: Optional[float] = None,
+    ) -> Optional[Job]:
+        """
+        Registers (or replaces) a periodic job; interval <= 0 leaves it out.
+        """
+        if interval <= 0:
+            return None
+        job = Job(name, fn, interval, jitter, leader_only, initial_delay)
+        with self._mutex:
+            self.jobs[name] = job
+        return job
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        if self.lock is None:
+            self.lock = make_leader_lock()
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.lock is not None and self.is_leader:
+            self.lock.release()
+            self.is_leader = False
+
+    def _renew_leadership(self, now: float) -> None:
+        if now < self._next_renew:
+            return
+        leader = self.lock.try_acquire()
+        if leader != self.is_leader:
+            state = "is now" if leader else "is no longer"
+            print(f"[scheduler] {OWNER_ID} {state} the leader", file=sys.stderr)
+        self.is_leader = leader
+        # renew well inside the lease; followers poll as often to take over quickly
+        self._next_renew = now + LOCK_TTL_SEC / 3
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            now = time.monotonic()
+            self._renew_leadership(now)
+            with self._mutex:
+                due = [job for job in self.jobs.values() if job.next_run <= now]
+            for job in due:
+                job.schedule_next(now)
+                if job.leader_only and not self.is_leader:
+                    job.metrics["skipped_follower"] += 1
+                    continue
+                if job.running:
+                    job.metrics["skipped_overlap"] += 1
+                    continue
+                job.running = True
+                self._pool.submit(job.run)
+            self._stop.wait(self.tick)
+
+    def run_now(self, name: str) -> bool:
+        """
+        Runs a job outside its schedule (unless it is already running).
+        """
+        job = self.jobs.get(name)
+        if job is None or job.running:
+            return False
+        job.running = True
+        self._pool.submit(job.run)
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._mutex:
+            jobs = list(self.jobs.values())
+        return {
+            "owner" : OWNER_ID,
+            "leader": self.is_leader,
+            "lock"  : type(self.lock).__name__ if self.lock else None,
+            "jobs"  : {
+                job.name: {
+                    **job.metrics,
+                    "interval_sec": job.interval,
+                    "leader_only" : job.leader_only,
+                    "running"     : job.running,
+                    "next_in_sec" : round(max(0.0, job.next_run - now), 1),
+                }
+                for job in jobs
+            },
+        }
+
+
+SCHEDULER = Scheduler()
+
+
+def start_scheduler() -> None:
+    SCHEDULER.start()
+
+
+def register_scheduler_routes(server: Flask, scheduler: Scheduler = SCHEDULER) -> None:
+
+    @server.route("/scheduler/metrics", methods=["GET"])
+    def scheduler_metrics():
+        return jsonify(scheduler.metrics())
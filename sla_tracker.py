@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple, Optional, Any, Iterable
+
+# ------------------------------------------------------------
+# Real-time SLA deadline tracking for in-flight flows
+#
+# Every open flow sits in a min-heap keyed by its next deadline:
+#   OK      -> AT_RISK at order_sent_utc + response_due_seconds * AT_RISK_RATIO
+#   AT_RISK -> BREACH  at order_sent_utc + response_due_seconds
+# open()/close() are O(log n) / O(1); tick() only pops what expired.
+# Closed flows leave a stale heap entry behind (lazy deletion by seq).
+# ------------------------------------------------------------
+AT_RISK_RATIO = 0.8  # same threshold make_rollup uses for AT_RISK
+
+SLA_STATES = ("OK", "AT_RISK", "BREACH")
+
+
+def parse_utc(value: Any) -> Optional[datetime]:
+    """
+    ISO string ("...Z" or "+00:00") or datetime -> aware UTC datetime.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class SlaDeadlineTracker:
+    def __init__(self, at_risk_ratio: float = AT_RISK_RATIO):
+        self.at_risk_ratio = at_risk_ratio
+        # (deadline_ts, seq, correlation_id, state_when_expired)
+        self._heap: List[Tuple[float, int, str, str]] = []
+        # correlation_id -> [seq, state, sent_ts, due_seconds]
+        self._flows: Dict[str, List[Any]] = {}
+        self._counts: Dict[str, int] = {s: 0 for s in SLA_STATES}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._flows)
+
+    # --------------------------------------------------------
+    # Events
+    # --------------------------------------------------------
+    def open(self, correlation_id: str, order_sent_utc: Any, response_due_seconds: float) -> bool:
+        sent = parse_utc(order_sent_utc)
+        if not correlation_id or sent is None or not response_due_seconds:
+            return False
+
+        with self._lock:
+            if correlation_id in self._flows:
+                self._drop(correlation_id)
+            sent_ts = sent.timestamp()
+            self._flows[correlation_id] = [None, "OK", sent_ts, float(response_due_seconds)]
+            self._counts["OK"] += 1
+            at_risk_ts = sent_ts + response_due_seconds * self.at_risk_ratio
+            self._push(correlation_id, at_risk_ts, "AT_RISK")
+        return True
+
+    def close(self, correlation_id: str) -> Optional[str]:
+        """
+        Flow got its response (or was cancelled). Returns the state it had.
+        """
+        with self._lock:
+            if correlation_id not in self._flows:
+                return None
+            return self._drop(correlation_id)
+
+    def tick(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Promote every flow whose deadline passed. Returns current counts per state.
+        """
+        now_ts = (now or datetime.now(timezone.utc)).timestamp()
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now_ts:
+                _, seq, cid, new_state = heapq.heappop(heap)
+                flow = self._flows.get(cid)
+                if flow is None or flow[0] != seq:
+                    continue  # stale entry of a closed / re-opened flow
+                self._counts[flow[1]] -= 1
+                self._counts[new_state] += 1
+                flow[1] = new_state
+                if new_state == "AT_RISK":
+                    self._push(cid, flow[2] + flow[3], "BREACH")
+
+            # Keep lazy deletion from growing the heap without bound
+            if len(heap) > 2 * len(self._flows) + 64:
+                flows = self._flows
+                self._heap = [e for e in heap if e[2] in flows and flows[e[2]][0] == e[1]]
+                heapq.heapify(self._heap)
+
+            return dict(self._counts)
+
+    # --------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------
+    def state_of(self, correlation_id: str) -> Optional[str]:
+        flow = self._flows.get(correlation_id)
+        return flow[1] if flow else None
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self._counts)
+
+    def in_state(self, state: str) -> List[str]:
+        return [cid for cid, flow in self._flows.items() if flow[1] == state]
+
+    # --------------------------------------------------------
+    # Seeding
+    # --------------------------------------------------------
+    def load_rollups(self, rollups: Iterable[Dict[str, Any]]) -> int:
+        """
+        Open every rollup that has no business response yet and is not already breached.
+        """
+        n = 0
+        for r in rollups:
+            sla = r.get("sla", {})
+            if sla.get("breach") or sla.get("actual_response_seconds") is not None:
+                continue
+            n += self.open(
+                r.get("correlation_id", ""),
+                r.get("timestamps", {}).get("order_sent_utc"),
+                sla.get("response_due_seconds") or 0,
+            )
+        return n
+
+    # --------------------------------------------------------
+    # Internals (caller holds the lock)
+    # --------------------------------------------------------
+    def _push(self, correlation_id: str, deadline_ts: float, new_state: str) -> None:
+        self._seq += 1
+        self._flows[correlation_id][0] = self._seq
+        heapq.heappush(self._heap, (deadline_ts, self._seq, correlation_id, new_state))
+
+    def _drop(self, correlation_id: str) -> str:
+        flow = self._flows.pop(correlation_id)
+        self._counts[flow[1]] -= 1
+        return flow[1]
@@ -0,0 +1,341 @@
+# snapshot.py
+# ------------------------------------------------------------
+# Shared rollup snapshot for multi-worker deployments
+#   Without it every server worker loads its own copy of the records from
+#   storage. With SAP_MONITOR_SNAPSHOT set (see data_store):
+#
+#     publish  this process loads from storage as usual and, after every
+#              load, writes all city shards into SNAPSHOT_PATH (run one:
+#              `python snapshot.py publish`, or one app instance)
+#     map      the workers mmap the file read-only instead of loading; the
+#              page cache holds it once for all of them, and records are
+#              built on access. A newer file (os.replace, so a new inode)
+#              is remapped on the next poll; readers of the old mapping
+#              keep it until they drop their references.
+#
+#   File layout (little endian, sections 8-byte aligned):
+#     b"SAPSNAP1" | u32 header length | JSON header | sections
+#   The header holds the generation, the per-city row ranges, the string
+#   dictionary and {section: [offset, bytes, typecode]}. Sections are columns
+#   over all rows, cities contiguous:
+#     u8   tech, biz, sla, overall                   status / SLA codes
+#     u16  city, plant, last_checkpoint, ...         ids into the string dictionary
+#     i32  sla_due, sla_actual                       NO_INT for None
+#     u32  <text>_offsets + <text>_blob              correlation_id, sap_order, idoc, order_sent_utc
+#     u32  cid_index                                 rows of each city sorted by correlation_id
+#
+# Run:
+#   python snapshot.py publish --interval 60
+#   python snapshot.py info
+# ------------------------------------------------------------
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Any, Optional, Sequence, Tuple
+
+SNAPSHOT_ENV = "SAP_MONITOR_SNAPSHOT"  # off / publish / map
+SNAPSHOT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rollups.snapshot")
+MAGIC = b"SAPSNAP1"
+FORMAT_VERSION = 1
+ALIGN = 8
+NO_INT = -2 ** 31
+MAX_STRINGS = 0xFFFF + 1  # u16 dictionary ids
+
+CODE_COLUMNS = ("tech", "biz", "sla", "overall")
+STRING_COLUMNS = (
+    "city", "plant", "last_checkpoint", "last_status", "tech_reason", "biz_status", "biz_reason",
+)
+INT_COLUMNS = ("sla_due", "sla_actual")
+TEXT_COLUMNS = ("correlation_id", "sap_order", "idoc", "order_sent_utc")
+
+
+def _pad(n: int) -> int:
+    return -n % ALIGN
+
+
+# ------------------------------------------------------------
+# Writing (the publisher)
+# ------------------------------------------------------------
+def write_snapshot(path: str, cities: Dict[str, Sequence[Any]]) -> Dict[str, Any]:
+    """
+    Writes the records of every city ({city: FlowRecords}) beside path and swaps
+    the file in atomically. Returns the header.
+    """
+    rows: List[Any] = []
+    ranges: Dict[str, List[int]] = {}
+    for city in sorted(cities):
+        start = len(rows)
+        rows.extend(cities[city])
+        ranges[city] = [start, len(rows)]
+
+    strings: List[str] = [""]
+    string_ids: Dict[str, int] = {"": 0}
+
+    def string_id(value: Optional[str]) -> int:
+        value = value or ""
+        sid = string_ids.get(value)
+        if sid is None:
+            if len(strings) >= MAX_STRINGS:
+                raise ValueError(
+                    f"more than {MAX_STRINGS} distinct strings, the u16 dictionary is full"
+                )
+            sid = string_ids[value] = len(strings)
+            strings.append(value)
+        return sid
+
+    sections: Dict[str, array] = {}
+    try:
+        for name in CODE_COLUMNS:
+            sections[name] = array("B", (getattr(r, name) for r in rows))
+        for name in STRING_COLUMNS:
+            sections[name] = array("H", (string_id(getattr(r, name)) for r in rows))
+        for name in INT_COLUMNS:
+            values = (getattr(r, name) for r in rows)
+            sections[name] = array("i", (NO_INT if v is None else int(v) for v in values))
+        for name in TEXT_COLUMNS:
+            offsets = array("I", [0])
+            blob = bytearray()
+            for r in rows:
+                blob += (getattr(r, name) or "").encode("utf-8")
+                offsets.append(len(blob))
+            sections[f"{name}_offsets"] = offsets
+            sections[f"{name}_blob"] = array("B", blob)
+    except OverflowError as exc:  # an i32 value / u32 text offset out of range
+        raise ValueError(f"records do not fit the snapshot format: {exc}") from exc
+    cid_index = array("I")
+    for start, end in ranges.values():
+        cid_index.extend(
+            sorted(range(start, end), key=lambda i: rows[i].correlation_id.encode("utf-8"))
+        )
+    sections["cid_index"] = cid_index
+
+    layout: Dict[str, List[Any]] = {}
+    offset = 0
+    for name, arr in sections.items():
+        nbytes = len(arr) * arr.itemsize
+        layout[name] = [offset, nbytes, arr.typecode]
+        offset += nbytes + _pad(nbytes)
+    header = {
+        "version"    : FORMAT_VERSION,
+        "generation" : time.time_ns(),
+        "created_utc": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "records"    : len(rows),
+        "cities"     : ranges,
+        "strings"    : strings,
+        "sections"   : layout,
+    }
+    head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(head)) + head)
+        f.write(b"\0" * _pad(len(MAGIC) + 4 + len(head)))
+        for arr in sections.values():
+            arr.tofile(f)
+            f.write(b"\0" * _pad(len(arr) * arr.itemsize))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return header
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a rollup snapshot")
+        (length,) = struct.unpack("<I", f.read(4))
+        return json.loads(f.read(length))
+
+
+# ------------------------------------------------------------
+# Reading (the workers)
+# ------------------------------------------------------------
+class Snapshot:
+    """
+    A published file mapped read-only. Columns are memoryviews into the mapping;
+    the mapping is released when the last view of it is gone.
+    """
+    def __init__(self, path: str, record_type: type):
+        self.path = path
+        self.record_type = record_type  # data_store.FlowRecord
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.inode = st.st_ino
+        self.mtime_ns = st.st_mtime_ns
+        buf = memoryview(mm)
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a rollup snapshot")
+        (length,) = struct.unpack_from("<I", buf, len(MAGIC))
+        start = len(MAGIC) + 4
+        header = json.loads(bytes(buf[start:start + length]))
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(
+                f"{path}: snapshot format {header['version']}, expected {FORMAT_VERSION}"
+            )
+        base = start + length + _pad(start + length)
+
+        self.generation: int = header["generation"]
+        self.created_utc: str = header["created_utc"]
+        self.records: int = header["records"]
+        self.cities: Dict[str, Tuple[int, int]] = {
+            c: (a, b) for c, (a, b) in header["cities"].items()
+        }
+        self.strings: List[str] = [sys.intern(s) for s in header["strings"]]
+        self.columns: Dict[str, memoryview] = {
+            name: buf[base + offset:base + offset + nbytes].cast(typecode)
+            for name, (offset, nbytes, typecode) in header["sections"].items()
+        }
+
+    def is_current(self) -> bool:
+        """
+        False once a newer file has been published at path (or it is gone).
+        """
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        return st.st_ino == self.inode and st.st_mtime_ns == self.mtime_ns
+
+    def text(self, name: str, row: int) -> str:
+        offsets = self.columns[f"{name}_offsets"]
+        return str(self.columns[f"{name}_blob"][offsets[row]:offsets[row + 1]], "utf-8")
+
+    def record(self, row: int) -> Any:
+        cols = self.columns
+        strings = self.strings
+        r = self.record_type()
+        for name in CODE_COLUMNS:
+            setattr(r, name, cols[name][row])
+        for name in STRING_COLUMNS:
+            setattr(r, name, strings[cols[name][row]])
+        for name in INT_COLUMNS:
+            v = cols[name][row]
+            setattr(r, name, None if v == NO_INT else v)
+        for name in TEXT_COLUMNS:
+            setattr(r, name, self.text(name, row))
+        return r
+
+    def find(self, correlation_id: str, start: int, end: int) -> Optional[int]:
+        """
+        Row of correlation_id among rows [start, end) (one city), by binary search on cid_index.
+        """
+        index = self.columns["cid_index"]
+        offsets = self.columns["correlation_id_offsets"]
+        blob = self.columns["correlation_id_blob"]
+        key = correlation_id.encode("utf-8")
+        lo, hi = start, end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = index[mid]
+            value = bytes(blob[offsets[row]:offsets[row + 1]])
+            if value < key:
+                lo = mid + 1
+            elif value > key:
+                hi = mid
+            else:
+                return row
+        return None
+
+
+class SnapshotRecords:
+    """
+    One city's rows as a read-only sequence of records (shard.records in map mode).
+    """
+    def __init__(self, snap: Snapshot, start: int, end: int):
+        self.snap = snap
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.snap.record(self.start + j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.snap.record(self.start + i)
+
+    def __iter__(self) -> Iterator[Any]:
+        record = self.snap.record
+        return (record(row) for row in range(self.start, self.end))
+
+    def where(self, column: str, code: int) -> List[Any]:
+        """
+        Records whose status / SLA code column equals code, scanning only that column.
+        """
+        values = self.snap.columns[column][self.start:self.end]
+        record = self.snap.record
+        return [record(self.start + i) for i, v in enumerate(values) if v == code]
+
+
+class SnapshotIndex:
+    """
+    correlation_id -> record for one city's rows (shard.by_cid in map mode).
+    """
+    def __init__(self, snap: Snapshot, start: int, end: int):
+        self.snap = snap
+        self.start = start
+        self.end = end
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __contains__(self, correlation_id: object) -> bool:
+        if not isinstance(correlation_id, str):
+            return False
+        return self.snap.find(correlation_id, self.start, self.end) is not None
+
+    def get(self, correlation_id: str, default: Any = None) -> Any:
+        row = self.snap.find(correlation_id, self.start, self.end)
+        return default if row is None else self.snap.record(row)
+
+    def __iter__(self) -> Iterator[str]:
+        text = self.snap.text
+        return (text("correlation_id", row) for row in range(self.start, self.end))
+
+
+# ------------------------------------------------------------
+# CLI
+# ------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Publish / inspect the shared rollup snapshot.")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("publish",
+                       help="load from storage and publish after every load (one process)")
+    p.add_argument("--interval", type=float, default=None,
+                   help="seconds between reloads (default ROLLUP_REFRESH_SEC)")
+    p = sub.add_parser("info")
+    p.add_argument("path", nargs="?", default=SNAPSHOT_FILE)
+    args = ap.parse_args(argv)
+
+    if args.command == "info":
+        header = read_header(args.path)
+        header["distinct_strings"] = len(header.pop("strings"))
+        header["bytes"] = os.path.getsize(args.path)
+        print(json.dumps(header, indent=2, ensure_ascii=False))
+        return 0
+
+    os.environ[SNAPSHOT_ENV] = "publish"  # before data_store starts its first load
+    import data_store
+    interval = args.interval or data_store.ROLLUP_REFRESH_SEC
+    while data_store.LOAD_PROGRESS["state"] in ("idle", "loading"):
+        time.sleep(0.2)
+    while True:
+        time.sleep(interval)
+        data_store.refresh_rollups()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+
+import dataset_writers
+from sla_tracker import parse_utc
+
+# ------------------------------------------------------------
+# Storage backends
+#   data_store reads through one backend object (data_store.get_storage()):
+#
+#     discover_cities()                          cities with rollups in the window
+#     iter_rollup_batches(city, batch_size)      newest rollups of the window, projected
+#     find_rollup(cid, budget)                   full rollup / None
+#     find_tech_events(cid, budget)              tech events, oldest first
+#     find_business_event(cid, budget)           business event / None
+#     count_rollups(tile_id, city)               stored rollups behind a tile
+#     iter_tile_docs(tile_id, city)              ... the documents themselves
+#     iter_tech_events(batch_size, projection)   tech events of the window
+#
+#   data_store.MongoStorage is the Mongo implementation (day partitions, the
+#   rollup projection). SqliteStorage below is embedded: it indexes the JSONL
+#   files data_manufacturing.py writes into one SQLite file, so the dashboard
+#   runs without a Mongo server (demos, tests, small sites). Writes (ingest,
+#   bulk actions, retention) stay on Mongo.
+# ------------------------------------------------------------
+SOURCE_FILES = {
+    "rollups"        : "dream_city_rollup_flows.jsonl",
+    "tech_events"    : "dream_city_tech_events.jsonl",
+    "business_events": "dream_city_business_events.jsonl",
+}
+TS_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+IMPORT_BATCH = 5000
+SCHEMA_VERSION = 1
+
+STATUS_RANK = {"GREEN": 0, "AMBER": 1, "RED": 2}
+SLA_STATUS = {"OK": "GREEN", "AT_RISK": "AMBER", "BREACH": "RED"}
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE rollups (
+    correlation_id  TEXT PRIMARY KEY,
+    city            TEXT NOT NULL,
+    sent_utc        TEXT,
+    overall         TEXT NOT NULL,
+    tech_health     TEXT NOT NULL,
+    business_health TEXT NOT NULL,
+    sla_state       TEXT NOT NULL,
+    record          TEXT NOT NULL,  -- projected document (bulk loads)
+    doc             TEXT NOT NULL   -- full document (detail / export)
+);
+CREATE TABLE tech_events (correlation_id TEXT NOT NULL, event_utc TEXT, doc TEXT NOT NULL);
+CREATE TABLE business_events (correlation_id TEXT NOT NULL, doc TEXT NOT NULL);
+"""
+INDEXES = """
+CREATE INDEX rollups_city_sent ON rollups (city, sent_utc DESC);
+CREATE INDEX rollups_sent ON rollups (sent_utc DESC);
+CREATE INDEX rollups_overall ON rollups (overall, city);
+CREATE INDEX rollups_tech ON rollups (tech_health, city);
+CREATE INDEX rollups_business ON rollups (business_health, city);
+CREATE INDEX rollups_sla ON rollups (sla_state, city);
+CREATE INDEX tech_events_cid ON tech_events (correlation_id, event_utc);
+CREATE INDEX tech_events_time ON tech_events (event_utc);
+CREATE INDEX business_events_cid ON business_events (correlation_id);
+"""
+TILE_COLUMNS = {
+    "overall" : "overall",
+    "tech"    : "tech_health",
+    "business": "business_health",
+    "sla"     : "sla_state",
+}
+
+
+def source_path(data_dir: str, name: str) -> Optional[str]:
+    """
+    The dataset file, plain or compressed (dream_city_tech_events.jsonl[.gz|.zst]).
+    """
+    for compression in dataset_writers.COMPRESSIONS:
+        path = dataset_writers.jsonl_path(os.path.join(data_dir, SOURCE_FILES[name]), compression)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def project(doc: Dict[str, Any], projection: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Mongo-style inclusion projection of dotted paths ({"_id": 0} is ignored).
+    """
+    out: Dict[str, Any] = {}
+    for path, keep in projection.items():
+        if not keep or path == "_id":
+            continue
+        keys = path.split(".")
+        src: Any = doc
+        for key in keys:
+            # a stored null is kept (as Mongo does), a missing key is not
+            if not isinstance(src, dict) or key not in src:
+                break
+            src = src[key]
+        else:
+            dst = out
+            for key in keys[:-1]:
+                dst = dst.setdefault(key, {})
+            dst[keys[-1]] = src
+    return out
+
+
+def overall_of(doc: Dict[str, Any]) -> str:
+    """
+    Worst of tech / business health and the SLA state (data_store.worst_overall).
+    """
+    statuses = [
+        ((doc.get("tech") or {}).get("health") or "GREEN").upper(),
+        ((doc.get("business") or {}).get("health") or "GREEN").upper(),
+        SLA_STATUS.get(((doc.get("sla") or {}).get("state") or "OK").upper(), "GREEN"),
+    ]
+    return max(statuses, key=lambda s: STATUS_RANK.get(s, 0))
+
+
+class SqliteStorage:
+    name = "sqlite"
+
+    def __init__(
+        self,
+        path: str,
+        data_dir: str,
+        limit: int,
+        window_days: int,
+        default_city: str,
+        projection: Dict[str, int],
+    ):
+        self.path = path
+        self.data_dir = data_dir
+        self.limit = limit
+        self.window_days = window_days
+        self.default_city = default_city
+        self.projection = projection
+        self._local = threading.local()
+        self._build_lock = threading.Lock()
+        self._generation = 0  # bumped when the file is replaced; thread connections reopen
+        self._inode: Optional[int] = None
+        self._checked = False
+
+    # --------------------------------------------------------
+    # Building the database from the JSONL files
+    # --------------------------------------------------------
+    def _signature(self) -> str:
+        files = []
+        for name in SOURCE_FILES:
+            path = source_path(self.data_dir, name)
+            if path is None:
+                raise sqlite3.OperationalError(f"{SOURCE_FILES[name]} not found in {self.data_dir}")
+            st = os.stat(path)
+            files.append([os.path.basename(path), st.st_size, int(st.st_mtime)])
+        return json.dumps(
+            {"schema": SCHEMA_VERSION, "files": files, "projection": self.projection},
+            sort_keys=True,
+        )
+
+    def _stored_signature(self) -> Optional[str]:
+        if not os.path.exists(self.path):
+            return None
+        try:
+            conn = sqlite3.connect(self.path)
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def ensure_built(self) -> None:
+        """
+        (Re)builds the database when the JSONL files changed since it was built.
+        The new file is written beside the old one and swapped in atomically, so
+        other workers keep reading the previous build meanwhile.
+        """
+        if self._checked:
+            return
+        with self._build_lock:
+            if self._checked:
+                return
+            signature = self._signature()
+            if self._stored_signature() != signature:
+                self._build(signature)
+            inode = os.stat(self.path).st_ino  # also moves when another worker rebuilt it
+            if inode != self._inode:
+                self._inode = inode
+                self._generation += 1
+            self._checked = True
+
+    def refresh(self) -> None:
+        """
+        Look at the files again on the next access (the rollup reload calls this).
+        """
+        self._checked = False
+
+    def _build(self, signature: str) -> None:
+        started = time.monotonic()
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        conn = sqlite3.connect(tmp)
+        try:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.executescript(SCHEMA)
+            counts = {
+                "rollups"        : self._import(
+                    conn, "rollups", self._rollup_row,
+                    "INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ),
+                "tech_events"    : self._import(
+                    conn, "tech_events", self._tech_row,
+                    "INSERT INTO tech_events VALUES (?, ?, ?)",
+                ),
+                "business_events": self._import(
+                    conn, "business_events", self._business_row,
+                    "INSERT INTO business_events VALUES (?, ?)",
+                ),
+            }
+            conn.executescript(INDEXES)
+            conn.execute("ANALYZE")
+            conn.execute("INSERT INTO meta VALUES ('signature', ?)", (signature,))
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp, self.path)
+        print(
+            f"[storage] built {self.path} from {self.data_dir}: {counts} "
+            f"({time.monotonic() - started:.1f}s)",
+            file=sys.stderr,
+        )
+
+    def _import(self, conn: sqlite3.Connection, name: str, to_row, sql: str) -> int:
+        n = 0
+        rows: List[Tuple[Any, ...]] = []
+        for line in dataset_writers.iter_jsonl(source_path(self.data_dir, name)):
+            rows.append(to_row(json.loads(line), line))
+            if len(rows) >= IMPORT_BATCH:
+                conn.executemany(sql, rows)
+                n += len(rows)
+                rows = []
+        if rows:
+            conn.executemany(sql, rows)
+            n += len(rows)
+        return n
+
+    def _rollup_row(self, d: Dict[str, Any], line: str) -> Tuple[Any, ...]:
+        record = project(d, self.projection)
+        return (
+            d.get("correlation_id", ""),
+            d.get("city") or self.default_city,
+            (d.get("timestamps") or {}).get("order_sent_utc"),
+            overall_of(d),
+            ((d.get("tech") or {}).get("health") or "GREEN").upper(),
+            ((d.get("business") or {}).get("health") or "GREEN").upper(),
+            ((d.get("sla") or {}).get("state") or "OK").upper(),
+            json.dumps(record, ensure_ascii=False),
+            line,
+        )
+
+    @staticmethod
+    def _tech_row(e: Dict[str, Any], line: str) -> Tuple[Any, ...]:
+        return e.get("correlation_id", ""), (e.get("timestamps") or {}).get("event_utc"), line
+
+    @staticmethod
+    def _business_row(e: Dict[str, Any], line: str) -> Tuple[Any, ...]:
+        return e.get("correlation_id", ""), line
+
+    # --------------------------------------------------------
+    # Reading
+    # --------------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        self.ensure_built()
+        local = self._local
+        if getattr(local, "generation", None) != self._generation:
+            if getattr(local, "conn", None) is not None:
+                local.conn.close()
+            local.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=30)
+            local.generation = self._generation
+        return local.conn
+
+    def _since(
+        self, table: str, column: str, where: str = "", args: Tuple[Any, ...] = (),
+    ) -> Optional[str]:
+        """
+        Start of the window_days that end at the newest row (None: no rows).
+        """
+        row = self._conn().execute(f"SELECT MAX({column}) FROM {table} {where}", args).fetchone()
+        newest = parse_utc(row[0]) if row else None
+        if newest is None:
+            return None
+        return (newest - timedelta(days=self.window_days)).strftime(TS_FORMAT)
+
+    def discover_cities(self) -> List[str]:
+        since = self._since("rollups", "sent_utc")
+        if since is None:
+            return []
+        rows = self._conn().execute(
+            "SELECT DISTINCT city FROM rollups WHERE sent_utc >= ?", (since,),
+        )
+        return sorted(r[0] for r in rows if r[0])
+
+    def iter_rollup_batches(
+        self, city: Optional[str], batch_size: int,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        where, args = ("WHERE city = ?", (city,)) if city else ("", ())
+        since = self._since("rollups", "sent_utc", where, args)
+        if since is None:
+            return
+        cond = "city = ? AND sent_utc >= ?" if city else "sent_utc >= ?"
+        cursor = self._conn().execute(
+            f"SELECT record FROM rollups WHERE {cond} ORDER BY sent_utc DESC LIMIT ?",
+            args + (since, self.limit),
+        )
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield [json.loads(r[0]) for r in rows]
+
+    def find_rollup(self, correlation_id: str, budget: float = 0.0) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT doc FROM rollups WHERE correlation_id = ?", (correlation_id,),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_tech_events(self, correlation_id: str, budget: float = 0.0) -> List[Dict[str, Any]]:
+        rows = self._conn().execute(
+            "SELECT doc FROM tech_events WHERE correlation_id = ? ORDER BY event_utc",
+            (correlation_id,),
+        )
+        return [json.loads(r[0]) for r in rows]
+
+    def find_business_event(
+        self, correlation_id: str, budget: float = 0.0,
+    ) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT doc FROM business_events WHERE correlation_id = ? LIMIT 1", (correlation_id,),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _tile_where(self, tile_id: str, city: Optional[str]) -> Tuple[str, Tuple[Any, ...]]:
+        section, _, value = tile_id.partition("_")
+        conds: List[str] = []
+        args: List[Any] = []
+        column = TILE_COLUMNS.get(section)
+        if column:
+            conds.append(f"{column} = ?")
+            args.append(value.upper())
+        if city:
+            conds.append("city = ?")
+            args.append(city)
+        return ("WHERE " + " AND ".join(conds)) if conds else "", tuple(args)
+
+    def count_rollups(self, tile_id: str, city: Optional[str] = None) -> int:
+        where, args = self._tile_where(tile_id, city)
+        return self._conn().execute(f"SELECT COUNT(*) FROM rollups {where}", args).fetchone()[0]
+
+    def iter_tile_docs(self, tile_id: str, city: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        where, args = self._tile_where(tile_id, city)
+        for row in self._conn().execute(f"SELECT doc FROM rollups {where}", args):
+            yield json.loads(row[0])
+
+    def iter_tech_events(
+        self, batch_size: int, projection: Optional[Dict[str, int]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        since = self._since("tech_events", "event_utc")
+        if since is None:
+            return
+        cursor = self._conn().execute("SELECT doc FROM tech_events WHERE event_utc >= ?", (since,))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for r in rows:
+                e = json.loads(r[0])
+                yield project(e, projection) if projection else e
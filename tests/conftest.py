@@ -0,0 +1,74 @@
+# tests/conftest.py
+# ------------------------------------------------------------
+# data_store reads Mongo from the moment it is imported (first rollup load),
+# so pymongo.MongoClient is replaced by one shared mongomock client before any
+# app module is imported. The action queue uses the stub client.
+#
+# Run (needs pytest and mongomock):
+#   python -m pytest -q tests
+# ------------------------------------------------------------
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+import pymongo  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SAP_MONITOR_ACTION_CLIENT", "stub")
+
+MOCK_CLIENT = mongomock.MongoClient(tz_aware=True)
+pymongo.MongoClient = lambda *args, **kwargs: MOCK_CLIENT
+
+import data_manufacturing as dm  # noqa: E402
+import data_store  # noqa: E402
+import partitions  # noqa: E402
+
+# the import-time first load must not read the mock while a test reseeds it
+for thread in threading.enumerate():
+    if thread.name == "rollup-load":
+        thread.join()
+# mongomock's find() edits the projection dict it is given, so shards sharing
+# ROLLUP_PROJECTION cannot load concurrently against it
+data_store.LOAD_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rollup-load")
+
+N_FLOWS = 400
+
+
+@pytest.fixture(scope="session")
+def dataset():
+    """
+    (tech_events, business_events, rollups) of a small generated dataset.
+    """
+    _flows, tech_events, business_events, rollups = dm.generate_flows(N_FLOWS, seed=7)
+    return tech_events, business_events, rollups
+
+
+def seed(tech_events, business_events, rollups):
+    """
+    Replaces the mock database with these documents and reloads the rollups.
+    """
+    MOCK_CLIENT.drop_database(data_store.DB_NAME)
+    database = MOCK_CLIENT[data_store.DB_NAME]
+    for name, docs in [
+        (data_store.COLLECTION_NAME, rollups),
+        (data_store.TECH_EVENTS_COLLECTION, tech_events),
+        (data_store.BUSINESS_EVENTS_COLLECTION, business_events),
+    ]:
+        database[name].insert_many([dict(d) for d in docs])
+    partitions.invalidate()
+    data_store.SHARDS = {}  # cities of an earlier seed must not linger
+    data_store.refresh_rollups()
+    return database
+
+
+@pytest.fixture
+def db(dataset):
+    """
+    The mock database seeded with the dataset, its rollups loaded into data_store.
+    """
+    return seed(*dataset)
@@ -0,0 +1,240 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import actions
+import data_store
+from actions import DONE, FAILED, PENDING, RUNNING, ActionQueue, StubActionClient
+from scheduler import OWNER_ID
+
+TRANSIENT = {"ok": False, "retry": True, "detail": "timeout"}
+REJECTED = {"ok": False, "retry": False, "detail": "rejected"}
+
+
+class ScriptedClient:
+    """
+    Answers with the scripted results in order (the last one repeats), like the HTTP client.
+    """
+    simulated = False
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    def perform(self, action, rollup):
+        self.calls.append((action, rollup["correlation_id"]))
+        return self.results.pop(0) if len(self.results) > 1 else self.results[0]
+
+
+def _delivered(action="RESEND"):
+    patch = {"business.health": "GREEN", "business.status": action, "business.reason_code": None}
+    rollup = {**actions.DELIVERED_PATCH, **patch}
+    return {"ok": True, "retry": False, "detail": "accepted", "rollup": rollup}
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(actions, "ACTION_RETRY_BACKOFF_SEC", 0.0)
+
+
+def _queue(client):
+    return ActionQueue(client=client, workers=0, rate=0)
+
+
+def _queued(queue):
+    items = []
+    while not queue._queue.empty():
+        items.append(queue._queue.get_nowait())
+    queue._queued.clear()
+    return items
+
+
+def _red_cid():
+    shard = data_store.shard_for(data_store.DEFAULT_CITY)
+    return next(r.correlation_id for r in shard.records if r.biz == data_store.RED)
+
+
+def _item(db, item_id):
+    return db[actions.ACTION_ITEMS_COLLECTION].find_one({"_id": item_id})
+
+
+def _job(db, job_id):
+    return db[actions.ACTION_JOBS_COLLECTION].find_one({"_id": job_id})
+
+
+def _rollup(db, cid):
+    return db[data_store.COLLECTION_NAME].find_one({"correlation_id": cid})
+
+
+# ------------------------------------------------------------
+# Submitting
+# ------------------------------------------------------------
+def test_submit_stores_the_job_and_queues_each_flow_once(db):
+    queue = _queue(ScriptedClient(_delivered()))
+    job = queue.submit("resend", ["DC-1", "DC-2", "DC-1", "", "DC-3"], requested_by="test")
+
+    assert (job["action"], job["total"], job["state"]) == ("RESEND", 3, RUNNING)
+    items = list(db[actions.ACTION_ITEMS_COLLECTION].find({"job_id": job["job_id"]}))
+    assert sorted(i["correlation_id"] for i in items) == ["DC-1", "DC-2", "DC-3"]
+    assert {i["state"] for i in items} == {PENDING}
+    assert len(_queued(queue)) == 3
+
+
+@pytest.mark.parametrize("action, cids", [("PURGE", ["DC-1"]), ("RESEND", []), ("RESEND", [""])])
+def test_submit_rejects_bad_requests(db, action, cids):
+    with pytest.raises(ValueError):
+        _queue(ScriptedClient(_delivered())).submit(action, cids)
+
+
+# ------------------------------------------------------------
+# Claim and lease
+# ------------------------------------------------------------
+def test_an_item_is_claimed_once(db):
+    queue = _queue(ScriptedClient(_delivered()))
+    queue.submit("RESEND", ["DC-1"])
+    item = _queued(queue)[0]
+
+    claimed = queue._claim(item)
+    assert (claimed["state"], claimed["owner"]) == (RUNNING, OWNER_ID)
+    assert queue._claim(item) is None
+    assert _queue(ScriptedClient(_delivered()))._claim(item) is None
+
+
+def test_an_expired_lease_is_claimed_again(db):
+    queue = _queue(ScriptedClient(_delivered()))
+    queue.submit("RESEND", ["DC-1"])
+    item = _queued(queue)[0]
+    expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+    db[actions.ACTION_ITEMS_COLLECTION].update_one(
+        {"_id": item["_id"]},
+        {"$set": {"state": RUNNING, "owner": "dead-worker", "lease_until": expired}},
+    )
+
+    claimed = queue._claim(item)
+    assert claimed is not None
+    assert claimed["owner"] == OWNER_ID
+    assert claimed["lease_until"] > datetime.now(timezone.utc)
+
+
+def test_a_lost_lease_does_not_finish_the_item(db):
+    queue = _queue(ScriptedClient(_delivered()))
+    job = queue.submit("RESEND", ["DC-1"])
+    item = queue._claim(_queued(queue)[0])
+    db[actions.ACTION_ITEMS_COLLECTION].update_one(
+        {"_id": item["_id"]}, {"$set": {"owner": "other-worker"}},
+    )
+
+    queue._finish(item, DONE, 1, "")
+
+    assert _item(db, item["_id"])["state"] == RUNNING
+    assert _job(db, job["job_id"])["done"] == 0
+
+
+def test_resume_queues_only_items_no_live_worker_owns(db):
+    now = datetime.now(timezone.utc)
+    leases = {
+        "pending" : (PENDING, None),
+        "expired" : (RUNNING, now - timedelta(seconds=5)),
+        "no-lease": (RUNNING, None),
+        "live"    : (RUNNING, now + timedelta(seconds=60)),
+        "done"    : (DONE, None),
+        "failed"  : (FAILED, None),
+    }
+    db[actions.ACTION_ITEMS_COLLECTION].insert_many([
+        {"_id": f"job:{name}", "job_id": "job", "correlation_id": name, "action": "RESEND",
+         "state": state, "attempts": 0, "lease_until": lease}
+        for name, (state, lease) in leases.items()
+    ])
+    queue = _queue(ScriptedClient(_delivered()))
+
+    assert queue.resume() == 3
+    assert queue.resume() == 0  # already queued
+    assert sorted(i["correlation_id"] for i in _queued(queue)) == ["expired", "no-lease", "pending"]
+
+
+# ------------------------------------------------------------
+# Processing and retries
+# ------------------------------------------------------------
+def test_transient_failures_are_retried_until_delivered(db):
+    cid = _red_cid()
+    client = ScriptedClient(TRANSIENT, TRANSIENT, _delivered())
+    queue = _queue(client)
+    job = queue.submit("RESEND", [cid])
+    item = _queued(queue)[0]
+
+    queue._process(item)
+
+    stored = _item(db, item["_id"])
+    assert (stored["state"], stored["attempts"]) == (DONE, 3)
+    assert len(client.calls) == 3
+    assert queue.metrics()["retries"] == 2
+    assert _job(db, job["job_id"])["done"] == 1
+    assert _rollup(db, cid)["business"]["status"] == "RESEND"
+    assert queue.apply_pending() == 1
+    assert data_store.find_record(cid).biz == data_store.GREEN
+
+
+def test_an_item_fails_after_max_attempts(db):
+    client = ScriptedClient(TRANSIENT)
+    queue = _queue(client)
+    job = queue.submit("RESEND", [_red_cid()])
+    item = _queued(queue)[0]
+
+    queue._process(item)
+
+    stored = _item(db, item["_id"])
+    assert (stored["state"], stored["attempts"], stored["detail"]) == (FAILED, 3, "timeout")
+    assert len(client.calls) == queue.max_attempts
+    assert _job(db, job["job_id"])["failed"] == 1
+    assert queue.apply_pending() == 0
+
+
+def test_a_permanent_failure_is_not_retried(db):
+    client = ScriptedClient(REJECTED)
+    queue = _queue(client)
+    queue.submit("REPAIR", [_red_cid()])
+    item = _queued(queue)[0]
+
+    queue._process(item)
+
+    assert (_item(db, item["_id"])["state"], len(client.calls)) == (FAILED, 1)
+
+
+def test_a_flow_without_rollup_fails_without_calling_the_client(db):
+    client = ScriptedClient(_delivered())
+    queue = _queue(client)
+    queue.submit("RESEND", ["DC-NO-SUCH-FLOW"])
+    item = _queued(queue)[0]
+
+    queue._process(item)
+
+    assert _item(db, item["_id"])["detail"] == "flow not found"
+    assert client.calls == []
+
+
+def test_delete_flags_the_rollup_instead_of_removing_it(db):
+    cid = _red_cid()
+    cancelled = {"ok": True, "retry": False, "detail": "cancelled", "rollup": {}}
+    queue = _queue(ScriptedClient(cancelled))
+    queue.submit("DELETE", [cid])
+    tile_count = data_store.get_storage().count_rollups("business_RED")
+
+    queue._process(_queued(queue)[0])
+
+    assert _rollup(db, cid)["deleted"] is True
+    assert data_store.get_storage().count_rollups("business_RED") == tile_count - 1
+    assert queue.apply_pending() == 1
+    assert data_store.find_record(cid) is None
+
+
+def test_simulated_results_stay_out_of_mongo(db):
+    cid = _red_cid()
+    stored = _rollup(db, cid)
+    queue = _queue(StubActionClient(latency=0, p_transient=0, p_fail=0))
+    queue.submit("RESEND", [cid])
+
+    queue._process(_queued(queue)[0])
+
+    assert _rollup(db, cid) == stored
+    assert queue.apply_pending() == 1
+    assert data_store.find_record(cid).biz == data_store.GREEN
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import scheduler
+from conftest import MOCK_CLIENT
+from scheduler import LOCK_COLLECTION, MongoLeaderLock
+
+
+@pytest.fixture
+def lock_db():
+    database = MOCK_CLIENT["scheduler_test"]
+    database[LOCK_COLLECTION].delete_many({})
+    return database
+
+
+def _lock(lock_db):
+    return MongoLeaderLock(lambda: lock_db, name="test-lock", ttl=30)
+
+
+def _as(monkeypatch, owner):
+    monkeypatch.setattr(scheduler, "OWNER_ID", owner)
+
+
+def test_a_free_lease_is_taken_and_renewed_by_its_owner(lock_db, monkeypatch):
+    _as(monkeypatch, "worker-a")
+    lock = _lock(lock_db)
+
+    assert lock.try_acquire()
+    first = lock_db[LOCK_COLLECTION].find_one({"_id": "test-lock"})
+    assert lock.try_acquire()
+    renewed = lock_db[LOCK_COLLECTION].find_one({"_id": "test-lock"})
+
+    assert first["owner"] == renewed["owner"] == "worker-a"
+    assert renewed["expires_at"] >= first["expires_at"]
+
+
+def test_a_live_lease_is_not_taken_over(lock_db, monkeypatch):
+    _as(monkeypatch, "worker-a")
+    assert _lock(lock_db).try_acquire()
+
+    _as(monkeypatch, "worker-b")
+    assert not _lock(lock_db).try_acquire()
+    assert lock_db[LOCK_COLLECTION].find_one({"_id": "test-lock"})["owner"] == "worker-a"
+
+
+def test_an_expired_lease_is_taken_over(lock_db, monkeypatch):
+    _as(monkeypatch, "worker-a")
+    assert _lock(lock_db).try_acquire()
+    expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+    lock_db[LOCK_COLLECTION].update_one({"_id": "test-lock"}, {"$set": {"expires_at": expired}})
+
+    _as(monkeypatch, "worker-b")
+    assert _lock(lock_db).try_acquire()
+    assert lock_db[LOCK_COLLECTION].find_one({"_id": "test-lock"})["owner"] == "worker-b"
+
+
+def test_release_frees_only_the_owners_lease(lock_db, monkeypatch):
+    _as(monkeypatch, "worker-a")
+    assert _lock(lock_db).try_acquire()
+
+    _as(monkeypatch, "worker-b")
+    _lock(lock_db).release()
+    assert not _lock(lock_db).try_acquire()
+
+    _as(monkeypatch, "worker-a")
+    _lock(lock_db).release()
+    _as(monkeypatch, "worker-b")
+    assert _lock(lock_db).try_acquire()
@@ -0,0 +1,89 @@
+import copy
+import json
+import os
+
+import pytest
+
+import data_store
+import dataset_writers
+from conftest import seed
+from storage import SOURCE_FILES, SqliteStorage
+
+CITIES = ("Dream-City", "Harbor-City")
+TILES = [
+    f"{section}_{value}"
+    for section in ("overall", "tech", "business")
+    for value in data_store.STATUS_NAMES
+]
+TILES += [f"sla_{state}" for state in data_store.SLA_NAMES]
+
+
+@pytest.fixture
+def stores(dataset, tmp_path):
+    """
+    (MongoStorage, SqliteStorage) over the same documents: a second city, and rollups
+    without a city field (DEFAULT_CITY's) next to ones that carry it.
+    """
+    tech_events, business_events, rollups = dataset
+    rollups = copy.deepcopy(rollups)
+    for i, d in enumerate(rollups):
+        if i % 4 == 0:
+            d["city"] = CITIES[1]
+        elif i % 3 == 0:
+            del d["city"]
+    seed(tech_events, business_events, rollups)
+
+    sources = {"rollups": rollups, "tech_events": tech_events, "business_events": business_events}
+    for name, docs in sources.items():
+        dataset_writers.write_jsonl(os.path.join(tmp_path, SOURCE_FILES[name]), docs)
+    sqlite = SqliteStorage(
+        os.path.join(tmp_path, "test.sqlite"), str(tmp_path), data_store.LIMIT,
+        data_store.ROLLUP_WINDOW_DAYS, data_store.DEFAULT_CITY, data_store.ROLLUP_PROJECTION,
+    )
+    return data_store.MongoStorage(), sqlite
+
+
+def _strip(docs):
+    # order-independent: the backends return the same documents in different orders
+    stripped = ({k: v for k, v in d.items() if k != "_id"} for d in docs)
+    return sorted(stripped, key=lambda d: json.dumps(d, sort_keys=True))
+
+
+def test_discover_cities(stores):
+    mongo, sqlite = stores
+    assert mongo.discover_cities() == sqlite.discover_cities() == sorted(CITIES)
+
+
+@pytest.mark.parametrize("city", [None, *CITIES])
+def test_iter_rollup_batches(stores, city):
+    mongo, sqlite = stores
+    from_mongo = [d for batch in mongo.iter_rollup_batches(city, 50) for d in batch]
+    from_sqlite = [d for batch in sqlite.iter_rollup_batches(city, 50) for d in batch]
+    assert from_mongo
+    assert _strip(from_mongo) == _strip(from_sqlite)
+
+
+@pytest.mark.parametrize("city", [None, *CITIES])
+def test_tiles(stores, city):
+    mongo, sqlite = stores
+    for tile_id in TILES:
+        assert mongo.count_rollups(tile_id, city) == sqlite.count_rollups(tile_id, city), tile_id
+        from_mongo = _strip(mongo.iter_tile_docs(tile_id, city))
+        assert from_mongo == _strip(sqlite.iter_tile_docs(tile_id, city)), tile_id
+
+
+def test_flow_detail(stores, dataset):
+    mongo, sqlite = stores
+    for cid in [d["correlation_id"] for d in dataset[2][::37]] + ["DC-NO-SUCH-FLOW"]:
+        assert mongo.find_rollup(cid, 1.0) == sqlite.find_rollup(cid)
+        assert mongo.find_business_event(cid, 1.0) == sqlite.find_business_event(cid)
+        tech_mongo, tech_sqlite = mongo.find_tech_events(cid, 1.0), sqlite.find_tech_events(cid)
+        assert _strip(tech_mongo) == _strip(tech_sqlite)
+        for events in (tech_mongo, tech_sqlite):
+            times = [e["timestamps"]["event_utc"] for e in events]
+            assert times == sorted(times)
+
+
+def test_iter_tech_events(stores):
+    mongo, sqlite = stores
+    assert _strip(mongo.iter_tech_events(100)) == _strip(sqlite.iter_tech_events(100))
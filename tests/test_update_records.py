@@ -0,0 +1,80 @@
+import data_store
+from data_store import (
+    AMBER, GREEN, RED, SLA_NAMES, settled_sla_counts, status_counts, update_records,
+)
+
+
+def _shard():
+    return data_store.shard_for(data_store.DEFAULT_CITY)
+
+
+def _assert_counters_match(shard):
+    # the incrementally adjusted counters equal a full recount
+    assert shard.status == status_counts(shard.records)
+    assert shard.settled == settled_sla_counts(shard.records, shard.tracker)
+    assert len(shard.by_cid) == len(shard.records)
+
+
+def test_update_moves_record_between_tiles(db):
+    shard = _shard()
+    _assert_counters_match(shard)
+    r = next(r for r in shard.records if r.tech == RED)
+    before = dict(shard.status)
+    version, _ = data_store.tile_counts()
+
+    doc = r.to_doc()
+    doc["tech"]["health"] = "GREEN"
+    doc["business"]["health"] = "GREEN"
+    doc["sla"]["state"] = "OK"
+    assert update_records([doc]) == 1
+
+    assert shard.by_cid[r.correlation_id] is r
+    assert (r.tech, r.biz, r.overall) == (GREEN, GREEN, GREEN)
+    assert shard.status["tech_RED"] == before["tech_RED"] - 1
+    assert shard.status["overall_GREEN"] == before["overall_GREEN"] + 1
+    _assert_counters_match(shard)
+    assert data_store.tile_counts()[0] != version
+
+
+def test_update_changes_settled_sla_state(db):
+    shard = _shard()
+    r = next(
+        r for r in shard.records
+        if SLA_NAMES[r.sla] == "OK" and shard.tracker.state_of(r.correlation_id) is None
+    )
+    before = dict(shard.settled)
+
+    doc = r.to_doc()
+    doc["sla"]["state"] = "AT_RISK"
+    assert update_records([doc]) == 1
+
+    assert r.overall >= AMBER
+    assert shard.settled["OK"] == before["OK"] - 1
+    assert shard.settled["AT_RISK"] == before["AT_RISK"] + 1
+    _assert_counters_match(shard)
+
+
+def test_removed_records_leave_records_and_counters(db):
+    shard = _shard()
+    n = len(shard.records)
+    gone = [r.correlation_id for r in shard.records[:3]]
+
+    assert update_records([], gone) == 3
+
+    assert len(shard.records) == n - 3
+    assert not any(cid in shard.by_cid for cid in gone)
+    assert data_store.find_record(gone[0]) is None
+    assert sum(shard.status[f"overall_{s}"] for s in ("GREEN", "AMBER", "RED")) == n - 3
+    _assert_counters_match(shard)
+
+
+def test_flows_not_loaded_are_left_to_the_reload(db):
+    shard = _shard()
+    before = dict(shard.status)
+    doc = shard.records[0].to_doc()
+    doc["correlation_id"] = "DC-NOT-LOADED"
+
+    assert update_records([doc], ["DC-ALSO-NOT-LOADED"]) == 0
+
+    assert shard.status == before
+    _assert_counters_match(shard)